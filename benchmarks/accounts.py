@@ -0,0 +1,117 @@
+"""
+Per-account query latency as the number of accounts grows.
+
+For each account count, ``utils.generate_data`` writes a year/month
+partitioned Parquet dataset with ``--monthly-count`` transactions per account
+per month, which a ``TransactionEngine`` with ``"parquet"`` storage ingests
+into its store (rows sorted by account in small row groups). The harness
+then times account-scoped ``execute`` calls, as the ``execute_sql`` tool
+makes them, each for a randomly chosen account, with the result cache off.
+An unscoped full aggregate over every account is timed alongside as the
+reference that grows with the data. Rollups are off: with one rollup row per
+account, month and category they would be about as large as the table.
+
+    uv run python -m benchmarks.accounts
+    uv run python -m benchmarks.accounts --accounts 1000 10000 100000 --years 2
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from benchmarks.common import report, summarise, time_calls
+from src.engine import TransactionEngine
+from src.sql_cache import SQLResultCache
+from utils.cache import ColumnarCache
+from utils.generate_data import generate_transactions, write_transactions
+
+END_YEAR = 2025
+SCOPED_QUERIES = {
+    "account_categories": "SELECT category, SUM(amount) AS total FROM transactions "
+    "GROUP BY category ORDER BY total",
+    "account_month": "SELECT date, description, amount FROM transactions "
+    f"WHERE year = {END_YEAR} AND month = 3 ORDER BY date",
+    "account_latest": "SELECT * FROM transactions ORDER BY date DESC LIMIT 20",
+    "account_search": "SELECT COUNT(*) FROM transactions "
+    "WHERE description ILIKE '%market%'",
+}
+UNSCOPED_QUERY = "SELECT category, AVG(amount) FROM transactions GROUP BY category"
+
+
+def run(
+    accounts: int, years: int, monthly_count: int, calls: int, tmp: Path
+) -> dict[str, Any]:
+    source = tmp / f"source-{accounts}"
+    rows = write_transactions(
+        generate_transactions(END_YEAR - years + 1, END_YEAR, monthly_count, accounts),
+        source,
+        "parquet",
+    )
+    start = time.perf_counter()
+    engine = TransactionEngine(
+        source,
+        cache=ColumnarCache(tmp / f"cache-{accounts}"),
+        storage="parquet",
+        use_rollups=False,
+    )
+    ingest_ms = (time.perf_counter() - start) * 1000
+    engine.result_cache = SQLResultCache(max_entries=0)
+
+    rng = np.random.default_rng(accounts)
+    scoped = {
+        name: summarise(
+            time_calls(
+                lambda: engine.execute(
+                    sql, account_id=int(rng.integers(1, accounts + 1))
+                ),
+                calls,
+            )
+        )
+        for name, sql in SCOPED_QUERIES.items()
+    }
+    result = {
+        "rows": rows,
+        "ingest_ms": round(ingest_ms, 3),
+        "scoped": scoped,
+        "unscoped_full_aggregate": summarise(
+            time_calls(lambda: engine.execute(UNSCOPED_QUERY), max(1, calls // 4))
+        ),
+    }
+    engine.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--accounts", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument(
+        "--monthly-count",
+        type=int,
+        default=5,
+        help="transactions per account per month",
+    )
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    results: dict[str, Any] = {
+        "years": args.years,
+        "monthly_count": args.monthly_count,
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for accounts in args.accounts:
+            results[str(accounts)] = run(
+                accounts, args.years, args.monthly_count, args.calls, Path(tmp)
+            )
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
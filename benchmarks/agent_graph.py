@@ -0,0 +1,228 @@
+"""
+Offline benchmark of the triage/financial/investment/wealth agent graph.
+
+Every agent runs on a ``ScriptedModel`` that follows the scripts in
+``benchmarks/corpus.jsonl`` (handoff, SQL, calculations, answer) with a fixed
+simulated latency, while the local tools (DuckDB, pandas) run for real. For
+each query the harness records wall-clock time, model calls, tool calls,
+handoffs and the time spent in the model vs. local tools, then reports
+latency percentiles and time shares.
+
+    uv run python -m benchmarks.agent_graph --output bench.json
+    uv run python -m benchmarks.agent_graph --compare bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any
+
+from agents import AgentHooks, Model, RunConfig
+
+from benchmarks.common import percentile
+from configs.config import ROOT
+from src.agent import OFFLINE_VECTOR_STORE_ID, agent_execution, build_agent_graph
+from src.engine import get_engine
+from src.fake_model import FakeModelProvider, ScriptedModel
+
+CORPUS_PATH = Path(__file__).parent / "corpus.jsonl"
+# tools that run a nested agent rather than local code
+AGENT_TOOLS = {"sql_query_agent_tool"}
+# metrics compared by --compare, lower is better for all of them
+COMPARED_METRICS = [
+    "latency_p50_ms",
+    "latency_p90_ms",
+    "model_calls_per_query",
+    "tool_calls_per_query",
+    "local_tool_ms_per_query",
+]
+
+
+class GraphProbe(AgentHooks):
+    """Agent hooks recording the tool calls and handoffs of one query."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.model_calls = 0
+        self.model_ms = 0.0
+        self.tool_calls: Counter[str] = Counter()
+        self.tool_ms: defaultdict[str, float] = defaultdict(float)
+        self.handoffs: list[str] = []
+        self._tool_started: defaultdict[str, list[float]] = defaultdict(list)
+
+    async def on_handoff(self, context, agent, source) -> None:
+        self.handoffs.append(f"{source.name}->{agent.name}")
+
+    async def on_tool_start(self, context, agent, tool) -> None:
+        self._tool_started[tool.name].append(time.perf_counter())
+
+    async def on_tool_end(self, context, agent, tool, result) -> None:
+        started = self._tool_started[tool.name].pop()
+        self.tool_calls[tool.name] += 1
+        self.tool_ms[tool.name] += (time.perf_counter() - started) * 1000
+
+
+class TimedModel(Model):
+    """Delegating model that adds each request's duration to a probe."""
+
+    def __init__(self, model: Model, probe: GraphProbe):
+        self.model = model
+        self.probe = probe
+
+    async def get_response(self, *args: Any, **kwargs: Any):
+        start = time.perf_counter()
+        try:
+            return await self.model.get_response(*args, **kwargs)
+        finally:
+            self.probe.model_calls += 1
+            self.probe.model_ms += (time.perf_counter() - start) * 1000
+
+    def stream_response(self, *args: Any, **kwargs: Any):
+        return self.model.stream_response(*args, **kwargs)
+
+
+def load_corpus(filepath: Path = CORPUS_PATH) -> list[dict[str, Any]]:
+    with filepath.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def run_corpus(
+    corpus: list[dict[str, Any]], model_latency: float, repeat: int
+) -> list[dict[str, Any]]:
+    probe = GraphProbe()
+    model = TimedModel(
+        ScriptedModel({q["query"]: q for q in corpus}, latency=model_latency), probe
+    )
+    graph = build_agent_graph(
+        OFFLINE_VECTOR_STORE_ID, model_provider=FakeModelProvider(model)
+    )
+    for agent in graph.agents():
+        agent.hooks = probe
+    run_config = RunConfig(tracing_disabled=True)
+
+    records = []
+    for iteration in range(repeat):
+        for query in corpus:
+            probe.reset()
+            start = time.perf_counter()
+            response = await agent_execution(
+                graph.triage_agent, query["query"], run_config=run_config
+            )
+            wall_ms = (time.perf_counter() - start) * 1000
+            local_tool_ms = sum(
+                ms for name, ms in probe.tool_ms.items() if name not in AGENT_TOOLS
+            )
+            records.append(
+                {
+                    "id": query["id"],
+                    "iteration": iteration,
+                    "route": query["route"],
+                    "final_agent": response.last_agent.name,
+                    "wall_ms": round(wall_ms, 3),
+                    "model_calls": probe.model_calls,
+                    "model_ms": round(probe.model_ms, 3),
+                    "tool_calls": dict(probe.tool_calls),
+                    "tool_ms": {k: round(v, 3) for k, v in probe.tool_ms.items()},
+                    "local_tool_ms": round(local_tool_ms, 3),
+                    "handoffs": list(probe.handoffs),
+                }
+            )
+    return records
+
+
+def summarise_records(records: list[dict[str, Any]]) -> dict[str, Any]:
+    wall = [r["wall_ms"] for r in records]
+    total_wall = sum(wall)
+    model_calls = sum(r["model_calls"] for r in records)
+    tool_calls = sum(sum(r["tool_calls"].values()) for r in records)
+    model_ms = sum(r["model_ms"] for r in records)
+    local_tool_ms = sum(r["local_tool_ms"] for r in records)
+    tool_ms: Counter[str] = Counter()
+    for r in records:
+        tool_ms.update(r["tool_ms"])
+    return {
+        "queries": len(records),
+        "misrouted": sum(r["final_agent"] != r["route"] for r in records),
+        "latency_mean_ms": round(statistics.fmean(wall), 3),
+        "latency_p50_ms": round(percentile(wall, 50), 3),
+        "latency_p90_ms": round(percentile(wall, 90), 3),
+        "latency_p99_ms": round(percentile(wall, 99), 3),
+        "model_calls_per_query": round(model_calls / len(records), 3),
+        "tool_calls_per_query": round(tool_calls / len(records), 3),
+        "tool_calls_per_model_call": round(tool_calls / model_calls, 3),
+        "handoffs_per_query": round(
+            sum(len(r["handoffs"]) for r in records) / len(records), 3
+        ),
+        "local_tool_ms_per_query": round(local_tool_ms / len(records), 3),
+        "tool_ms_total": {k: round(v, 3) for k, v in tool_ms.most_common()},
+        "share_model": round(model_ms / total_wall, 4),
+        "share_local_tools": round(local_tool_ms / total_wall, 4),
+        "share_other": round(1 - (model_ms + local_tool_ms) / total_wall, 4),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any]) -> dict[str, Any]:
+    """Relative change of the compared metrics against a baseline run."""
+    deltas = {}
+    for metric in COMPARED_METRICS:
+        old, new = baseline["summary"].get(metric), current["summary"].get(metric)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        deltas[metric] = {"baseline": old, "current": new, "change": round(change, 4)}
+    return {"baseline_commit": baseline.get("commit"), "metrics": deltas}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--model-latency", type=float, default=0.1, help="seconds per model call"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--corpus", type=Path, default=CORPUS_PATH)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument(
+        "--compare", type=Path, default=None, help="earlier --output to diff against"
+    )
+    args = parser.parse_args()
+
+    # load the data up front so the first query does not pay for it
+    get_engine()
+    corpus = load_corpus(args.corpus)
+    records = asyncio.run(run_corpus(corpus, args.model_latency, args.repeat))
+    results = {
+        "commit": git_commit(),
+        "config": {"model_latency_s": args.model_latency, "repeat": args.repeat},
+        "summary": summarise_records(records),
+        "queries": records,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    printed = {"commit": results["commit"], "summary": results["summary"]}
+    if args.compare:
+        printed["comparison"] = compare(results, json.loads(args.compare.read_text()))
+    print(json.dumps(printed, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Answer repeated data questions from the agent memo instead of the SQL agent.
+
+The corpus in ``benchmarks/corpus.jsonl`` is run through the whole graph on a
+``ScriptedModel`` with ``--model-latency`` seconds per call, with
+``sql_query_agent_tool`` memoised in a fresh ``AgentMemo``. Passes, each in
+new sessions: ``cold`` with an empty memo, ``warm`` asking the same
+questions again, ``reworded`` asking them in other casing and punctuation
+with a "please", ``other_account`` asking them for another account, which
+must miss, and ``reopened`` from a second ``AgentMemo`` on the same file, as
+another process would. Reports the latency of each pass, memo hits and
+misses, whether the answers match the cold pass, and the cost of a lookup
+and a write in a memo holding ``--entries`` answers.
+
+    uv run python -m benchmarks.agent_memo
+    uv run python -m benchmarks.agent_memo --model-latency 0.5 --entries 4096
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from agents import RunConfig
+
+from benchmarks.agent_graph import CORPUS_PATH, load_corpus
+from benchmarks.common import report, summarise, time_calls
+from src.accounts import AccountContext
+from src.agent import OFFLINE_VECTOR_STORE_ID, agent_execution, build_agent_graph
+from src.agent_memo import AgentMemo
+from src.engine import get_engine
+from src.fake_model import FakeModelProvider, ScriptedModel
+
+
+def reword(query: str) -> str:
+    return f"  {query.upper().rstrip('?')}, please!"
+
+
+async def run_pass(
+    corpus: list[dict[str, Any]],
+    model: ScriptedModel,
+    memo: AgentMemo,
+    account_id: int,
+    reworded: bool = False,
+) -> tuple[dict[str, Any], list[str]]:
+    graph = build_agent_graph(
+        OFFLINE_VECTOR_STORE_ID,
+        model_provider=FakeModelProvider(model),
+        agent_memo=memo,
+    )
+    run_config = RunConfig(tracing_disabled=True)
+    before = memo.stats()
+    latencies = []
+    answers = []
+    for query in corpus:
+        text = reword(query["query"]) if reworded else query["query"]
+        start = time.perf_counter()
+        response = await agent_execution(
+            graph.triage_agent,
+            text,
+            run_config=run_config,
+            context=AccountContext(account_id),
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        answers.append(str(response.final_output))
+    after = memo.stats()
+    result = {
+        "query_ms": summarise(latencies),
+        "memo_hits": after["hits"] - before["hits"],
+        "memo_misses": after["misses"] - before["misses"],
+    }
+    return result, answers
+
+
+def time_memo(db_path: Path, entries: int, calls: int) -> dict[str, Any]:
+    """Time lookups and writes in a memo already holding ``entries`` answers."""
+    memo = AgentMemo(db_path, max_entries=entries)
+    answer = "| month | total |\n| --- | --- |\n" + "| 3 | -412.50 |\n" * 12
+    for i in range(entries):
+        memo.put(f"key-{i}", "sql_query_agent", f"question {i}", answer)
+    written = iter(range(entries, entries + calls))
+    results = {
+        "lookup_ms": summarise(
+            time_calls(lambda: memo.get(f"key-{entries // 2}"), calls)
+        ),
+        "miss_ms": summarise(time_calls(lambda: memo.get("missing"), calls)),
+        "write_ms": summarise(
+            time_calls(
+                lambda: memo.put(
+                    f"key-{next(written)}", "sql_query_agent", "question", answer
+                ),
+                calls,
+            )
+        ),
+    }
+    results.update(memo.stats())
+    memo.close()
+    return results
+
+
+async def benchmark(
+    corpus: list[dict[str, Any]], model_latency: float, db_path: Path
+) -> dict[str, Any]:
+    scripts = {q["query"]: q for q in corpus}
+    scripts.update({reword(q["query"]): q for q in corpus})
+    model = ScriptedModel(scripts, latency=model_latency)
+    memo = AgentMemo(db_path)
+
+    results: dict[str, Any] = {}
+    results["cold"], cold = await run_pass(corpus, model, memo, 1)
+    results["warm"], warm = await run_pass(corpus, model, memo, 1)
+    results["reworded"], reworded = await run_pass(
+        corpus, model, memo, 1, reworded=True
+    )
+    results["other_account"], _ = await run_pass(corpus, model, memo, 2)
+    memo.close()
+    reopened_memo = AgentMemo(db_path)
+    results["reopened"], reopened = await run_pass(corpus, model, reopened_memo, 1)
+    results["answers_match_cold"] = warm == cold and reopened == cold
+    results["memo"] = reopened_memo.stats()
+    reopened_memo.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--model-latency", type=float, default=0.2, help="seconds per model call"
+    )
+    parser.add_argument(
+        "--entries", type=int, default=4096, help="answers in the timed memo"
+    )
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--corpus", type=Path, default=CORPUS_PATH)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    # load the data up front so the first query does not pay for it
+    get_engine()
+    with tempfile.TemporaryDirectory() as tmp:
+        results = asyncio.run(
+            benchmark(
+                load_corpus(args.corpus), args.model_latency, Path(tmp) / "memo.sqlite"
+            )
+        )
+        results["memo_ops"] = time_memo(
+            Path(tmp) / "timed.sqlite", args.entries, args.calls
+        )
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
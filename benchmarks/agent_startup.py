@@ -0,0 +1,101 @@
+"""
+Startup cost of the agent graph against a local stand-in for the OpenAI API.
+
+Reports the time and number of API requests for:
+- ``import src.agent`` in a fresh interpreter (should make no requests),
+- the old import-time behaviour (create a store and upload the PDF),
+- building the graph the first time (no manifest entry) and on a restart
+  (manifest entry reused).
+
+    uv run python -m benchmarks.agent_startup --latency 0.05
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import report
+from benchmarks.fake_openai import FakeOpenAIServer
+from configs.config import PDF_PATH, ROOT, WEALTH_STORE_NAME
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import src.agent; "
+    "print((time.perf_counter() - start) * 1000)"
+)
+
+
+def timed(server: FakeOpenAIServer, fn) -> dict:
+    before = len(server.requests)
+    start = time.perf_counter()
+    fn()
+    return {
+        "ms": round((time.perf_counter() - start) * 1000, 3),
+        "requests": len(server.requests) - before,
+    }
+
+
+def import_in_subprocess(server: FakeOpenAIServer) -> dict:
+    before = len(server.requests)
+    completed = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=ROOT,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {
+        "ms": round(float(completed.stdout.strip().splitlines()[-1]), 3),
+        "requests": len(server.requests) - before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="simulated seconds per request"
+    )
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(latency=args.latency) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-local")
+
+        # imported after the environment points at the fake server
+        from src.agent import build_agent_graph
+        from src.vector import create_vector_store, resolve_vector_store
+        from src.vector import upload_pdf_to_vector_store
+
+        def legacy_startup():
+            store = create_vector_store(store_name=WEALTH_STORE_NAME)
+            upload_pdf_to_vector_store(PDF_PATH, store["vector_store_id"])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = Path(tmp) / "vector_stores.json"
+            documents = Path(tmp) / "ingested_documents.json"
+
+            def graph_startup():
+                build_agent_graph(
+                    resolve_vector_store(
+                        WEALTH_STORE_NAME, PDF_PATH, manifest, documents
+                    )
+                )
+
+            results = {
+                "latency_s": args.latency,
+                "import_src_agent": import_in_subprocess(server),
+                "legacy_import_time_upload": timed(server, legacy_startup),
+                "graph_first_build": timed(server, graph_startup),
+                "graph_restart": timed(server, graph_startup),
+                "vector_stores_created": len(server.state.vector_stores),
+            }
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
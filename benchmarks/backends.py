@@ -0,0 +1,187 @@
+"""
+Discovery and aggregate queries on the pandas, Polars and DuckDB backends.
+
+For each ``--rows`` size, synthetic transactions over ``--accounts`` accounts
+are written, a million rows at a time, into a ``PartitionedStore``. The same
+workload then runs on:
+- ``pandas``: the whole store loaded eagerly into a DataFrame, as the tools
+  used to hold it, then pandas operations (the load is timed separately and
+  skipped above ``--pandas-max-rows``, where it would not fit in memory),
+- ``polars``: ``PolarsBackend`` lazily scanning the store, results as Arrow,
+- ``duckdb``: the engine's view over the store, results as Arrow.
+The workload covers schema discovery (distinct types and categories, date
+range), typical aggregates, a text search and an account-scoped lookup.
+
+    uv run python -m benchmarks.backends
+    uv run python -m benchmarks.backends --rows 50000000 --calls 3
+"""
+
+import argparse
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+import duckdb
+import pandas as pd
+import polars as pl
+
+from benchmarks.common import report, summarise, synthetic_transactions, time_calls
+from src.accounts import scope_to_account
+from src.polars_backend import PolarsBackend
+from src.storage import PartitionedStore
+
+CHUNK_ROWS = 1_000_000
+ACCOUNT_ID = 7
+# name -> (SQL, equivalent pandas operation, scoped to ACCOUNT_ID)
+WORKLOAD: dict[str, tuple[str, Callable[[pd.DataFrame], Any], bool]] = {
+    "distinct_types": (
+        "SELECT DISTINCT type FROM transactions",
+        lambda df: df["type"].unique(),
+        False,
+    ),
+    "distinct_categories": (
+        "SELECT DISTINCT category FROM transactions",
+        lambda df: df["category"].unique(),
+        False,
+    ),
+    "date_range": (
+        "SELECT MIN(date) AS first, MAX(date) AS last, COUNT(*) AS n FROM transactions",
+        lambda df: df["date"].agg(["min", "max", "count"]),
+        False,
+    ),
+    "month_by_category": (
+        "SELECT category, SUM(amount) AS total FROM transactions "
+        "WHERE year = 2024 AND month = 3 GROUP BY category",
+        lambda df: (
+            df[(df["year"] == 2024) & (df["month"] == 3)]
+            .groupby("category")["amount"]
+            .sum()
+        ),
+        False,
+    ),
+    "monthly_debits": (
+        "SELECT year, month, SUM(amount) AS spent FROM transactions "
+        "WHERE type = 'debit' GROUP BY year, month ORDER BY year, month",
+        lambda df: df[df["type"] == "debit"].groupby(["year", "month"])["amount"].sum(),
+        False,
+    ),
+    "category_stats": (
+        "SELECT category, AVG(amount) AS mean, COUNT(*) AS n FROM transactions "
+        "GROUP BY category",
+        lambda df: df.groupby("category")["amount"].agg(["mean", "count"]),
+        False,
+    ),
+    "text_search": (
+        "SELECT COUNT(*) AS n FROM transactions WHERE description ILIKE '%dining%'",
+        lambda df: df["description"].str.contains("dining", case=False).sum(),
+        False,
+    ),
+    "top_expenses": (
+        "SELECT date, description, amount FROM transactions "
+        "WHERE year = 2023 ORDER BY amount LIMIT 10",
+        lambda df: df[df["year"] == 2023].nsmallest(10, "amount")[
+            ["date", "description", "amount"]
+        ],
+        False,
+    ),
+    "account_latest": (
+        "SELECT date, category, amount FROM transactions ORDER BY date DESC LIMIT 20",
+        lambda df: df[df["account_id"] == ACCOUNT_ID].nlargest(20, "date")[
+            ["date", "category", "amount"]
+        ],
+        True,
+    ),
+}
+
+
+def chunks(rows: int, accounts: int) -> Iterator[pd.DataFrame]:
+    for seed, start in enumerate(range(0, rows, CHUNK_ROWS)):
+        yield synthetic_transactions(
+            min(CHUNK_ROWS, rows - start), seed=seed, accounts=accounts
+        )
+
+
+def run_duckdb(store: PartitionedStore, calls: int) -> dict[str, Any]:
+    conn = duckdb.connect()
+    conn.execute(f"CREATE VIEW transactions AS {store.scan_sql()}")
+    results = {}
+    for name, (sql, _, scoped) in WORKLOAD.items():
+        if scoped:
+            sql = scope_to_account(sql, ACCOUNT_ID, ["transactions"])
+        results[name] = summarise(time_calls(lambda: conn.execute(sql).arrow(), calls))
+    conn.close()
+    return results
+
+
+def run_polars(store: PartitionedStore, calls: int) -> dict[str, Any]:
+    backend = PolarsBackend(store.root)
+    backend.refresh()
+    return {
+        name: summarise(
+            time_calls(
+                lambda: backend.collect(sql, ACCOUNT_ID if scoped else None), calls
+            )
+        )
+        for name, (sql, _, scoped) in WORKLOAD.items()
+    }
+
+
+def run_pandas(store: PartitionedStore, calls: int) -> dict[str, Any]:
+    start = time.perf_counter()
+    with duckdb.connect() as conn:
+        df = conn.execute(store.scan_sql()).df()
+    load_ms = (time.perf_counter() - start) * 1000
+    results: dict[str, Any] = {
+        "load_ms": round(load_ms, 3),
+        "memory_mb": round(df.memory_usage(deep=True).sum() / 2**20, 1),
+    }
+    for name, (_, operation, _) in WORKLOAD.items():
+        results[name] = summarise(time_calls(lambda: operation(df), calls))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--accounts", type=int, default=1_000)
+    parser.add_argument("--calls", type=int, default=5)
+    parser.add_argument(
+        "--pandas-max-rows",
+        type=int,
+        default=5_000_000,
+        help="largest size the eager pandas baseline is run at",
+    )
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    results: dict[str, Any] = {
+        "polars_threads": pl.thread_pool_size(),
+        "duckdb_threads": duckdb.execute(
+            "SELECT current_setting('threads')"
+        ).fetchone()[0],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            store = PartitionedStore(Path(tmp) / f"store-{rows}")
+            start = time.perf_counter()
+            store.write(chunks(rows, args.accounts))
+            result: dict[str, Any] = {
+                "write_s": round(time.perf_counter() - start, 3),
+                "store_mb": round(
+                    sum(f.stat().st_size for f in store.root.rglob("*.parquet"))
+                    / 2**20,
+                    1,
+                ),
+                "duckdb": run_duckdb(store, args.calls),
+                "polars": run_polars(store, args.calls),
+            }
+            if rows <= args.pandas_max_rows:
+                result["pandas"] = run_pandas(store, args.calls)
+            results[str(rows)] = result
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
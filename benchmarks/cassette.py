@@ -0,0 +1,151 @@
+"""
+Record the agent graph's model calls to a cassette and replay them offline.
+
+The corpus in ``benchmarks/corpus.jsonl`` is run through the whole graph on a
+``ScriptedModel`` with ``--model-latency`` seconds per call, standing in for
+the live model, while a ``CassetteModelProvider`` records every response. The
+corpus is then replayed from the cassette twice with no model latency, which
+leaves only the local side of each run (tools, sessions, handoffs), and once
+with the recorded latency. Reports the wall time of each pass, cassette hits
+and misses, whether the replays ended on the same agent with the same answer
+as the recording, the cassette size and the cost of hashing a request.
+
+    uv run python -m benchmarks.cassette
+    uv run python -m benchmarks.cassette --model-latency 0.5 --repeat 3
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from agents import ModelSettings, RunConfig
+
+from benchmarks.agent_graph import CORPUS_PATH, load_corpus
+from benchmarks.common import report, summarise, time_calls
+from src.agent import OFFLINE_VECTOR_STORE_ID, agent_execution, build_agent_graph
+from src.cassette import CassetteModelProvider, request_key
+from src.engine import get_engine
+from src.fake_model import FakeModelProvider, ScriptedModel
+
+
+async def run_pass(
+    corpus: list[dict[str, Any]], provider: CassetteModelProvider, repeat: int
+) -> tuple[dict[str, Any], list[tuple[str, str]]]:
+    graph = build_agent_graph(OFFLINE_VECTOR_STORE_ID, model_provider=provider)
+    run_config = RunConfig(tracing_disabled=True)
+    latencies = []
+    answers = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in corpus:
+            query_start = time.perf_counter()
+            response = await agent_execution(
+                graph.triage_agent, query["query"], run_config=run_config
+            )
+            latencies.append((time.perf_counter() - query_start) * 1000)
+            answers.append((response.last_agent.name, str(response.final_output)))
+    result = {
+        "wall_s": round(time.perf_counter() - start, 3),
+        "query_ms": summarise(latencies),
+        **provider.stats(),
+    }
+    return result, answers
+
+
+def time_request_key(calls: int) -> dict[str, float]:
+    """Time hashing a mid-conversation request of the SQL agent."""
+    graph = build_agent_graph(OFFLINE_VECTOR_STORE_ID)
+    agent = graph.sql_query_agent
+    rows = "\n".join(
+        f"| 2024-03-{day:02d} | groceries | -42.10 |" for day in range(1, 29)
+    )
+    input = [
+        {"role": "user", "content": "How much did I spend on groceries in March?"},
+        {
+            "type": "function_call",
+            "call_id": "call_abc",
+            "name": "execute_sql",
+            "arguments": '{"sql_query": "SELECT * FROM transactions"}',
+        },
+        {"type": "function_call_output", "call_id": "call_abc", "output": rows},
+    ]
+    return summarise(
+        time_calls(
+            lambda: request_key(
+                "gpt-4o-mini",
+                "You are a SQL agent. " * 200,
+                input,
+                ModelSettings(temperature=0),
+                agent.tools,
+                None,
+                [],
+            ),
+            calls,
+        )
+    )
+
+
+async def benchmark(
+    corpus: list[dict[str, Any]],
+    cassette: Path,
+    model_latency: float,
+    repeat: int,
+) -> dict[str, Any]:
+    scripted = ScriptedModel({q["query"]: q for q in corpus}, latency=model_latency)
+
+    def provider(mode: str, latency: Optional[float] = None) -> CassetteModelProvider:
+        return CassetteModelProvider(
+            mode, cassette, provider=FakeModelProvider(scripted), latency=latency
+        )
+
+    results: dict[str, Any] = {}
+    results["record"], recorded = await run_pass(corpus, provider("record"), 1)
+    replays = []
+    for name in ("replay_no_latency", "replay_no_latency_again"):
+        results[name], answers = await run_pass(corpus, provider("replay", 0.0), repeat)
+        replays.append(answers)
+    results["replay_recorded_latency"], answers = await run_pass(
+        corpus, provider("replay"), 1
+    )
+    replays.append(answers)
+    results["replays_match_recording"] = all(
+        answers == recorded * (len(answers) // len(recorded)) for answers in replays
+    )
+    results["cassette_entries"] = results["record"]["recorded"]
+    results["cassette_kb"] = round(cassette.stat().st_size / 1024, 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--model-latency",
+        type=float,
+        default=0.2,
+        help="seconds per model call while recording",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="passes over the corpus per replay"
+    )
+    parser.add_argument("--corpus", type=Path, default=CORPUS_PATH)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    # load the data up front so the first query does not pay for it
+    get_engine()
+    corpus = load_corpus(args.corpus)
+    with tempfile.TemporaryDirectory() as tmp:
+        results = asyncio.run(
+            benchmark(
+                corpus, Path(tmp) / "cassette.jsonl", args.model_latency, args.repeat
+            )
+        )
+    results["request_key_ms"] = time_request_key(1000)
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from utils.generate_data import CATEGORIES, CATEGORY_AMOUNT_RANGES, CATEGORY_TO_TYPE
+
+
+def synthetic_transactions(
+    n_rows: int, seed: int = 42, accounts: int = 1
+) -> pd.DataFrame:
+    """Build an ``InputTransactions``-shaped DataFrame of ``n_rows`` rows over ``accounts``."""
+    rng = np.random.default_rng(seed)
+    categories = np.array(CATEGORIES)
+    picked = rng.integers(0, len(categories), n_rows)
+    low = np.array([CATEGORY_AMOUNT_RANGES[c][0] for c in CATEGORIES])[picked]
+    high = np.array([CATEGORY_AMOUNT_RANGES[c][1] for c in CATEGORIES])[picked]
+    is_debit = np.array([CATEGORY_TO_TYPE[c] == "debit" for c in CATEGORIES])[picked]
+    amount = np.round(rng.uniform(low, high), 2)
+    amount = np.where(is_debit, -amount, amount)
+
+    days = rng.integers(0, (2025 - 2020 + 1) * 365, n_rows)
+    dates = pd.Timestamp("2020-01-01") + pd.to_timedelta(np.sort(days), unit="D")
+    return pd.DataFrame(
+        {
+            "account_id": rng.integers(1, accounts + 1, n_rows),
+            "date": dates.normalize(),
+            "year": dates.year.astype("int64"),
+            "month": dates.month.astype("int64"),
+            "type": np.where(is_debit, "debit", "credit"),
+            "category": categories[picked],
+            "amount": amount,
+            "description": pd.Series(categories[picked]).str.title() + " payment",
+        }
+    )
+
+
+def write_json(data: pd.DataFrame, filepath: Path) -> Path:
+    """Write a DataFrame as a JSON array of records, the shipped data format."""
+    data.to_json(filepath, orient="records", date_format="iso")
+    return filepath
+
+
+def time_calls(fn: Callable[[], Any], calls: int) -> list[float]:
+    """Call ``fn`` ``calls`` times and return each call's latency in ms."""
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarise(timings: list[float]) -> dict[str, float]:
+    """Summarise latencies (ms) into count, mean and tail percentiles."""
+    return {
+        "calls": len(timings),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "max_ms": round(max(timings), 3),
+    }
+
+
+def report(results: dict[str, Any], output: Path | None = None) -> None:
+    """Print benchmark results and optionally save them as JSON."""
+    text = json.dumps(results, indent=2, default=str)
+    print(text)
+    if output is not None:
+        output.write_text(text)
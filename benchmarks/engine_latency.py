@@ -0,0 +1,91 @@
+"""
+Per-call latency of ``execute_sql`` before and after the transaction engine.
+
+"before" replays the old tool body (load + validate the JSON file, then query
+DuckDB's default connection) on every call; "after" serves every call from a
+single ``TransactionEngine``.
+
+    uv run python -m benchmarks.engine_latency
+    uv run python -m benchmarks.engine_latency --rows 10000000 --legacy-calls 2
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+import duckdb
+
+from benchmarks.common import (
+    report,
+    summarise,
+    synthetic_transactions,
+    time_calls,
+    write_json,
+)
+from configs.config import TRANSACTIONS_PATH
+from src.engine import TransactionEngine
+from utils.cache import ColumnarCache
+from utils.utils import load_data
+
+QUERY = """
+SELECT year, category, SUM(amount) AS total
+FROM transactions
+GROUP BY year, category
+ORDER BY year, category
+"""
+
+
+def legacy_execute_sql(filepath: Path, sql_query: str) -> str:
+    data = load_data(filepath, use_cache=False)  # noqa: F841
+    con = duckdb.default_connection()
+    con.sql("CREATE TABLE IF NOT EXISTS transactions AS SELECT * FROM data")
+    return con.sql(sql_query).df().to_string()
+
+
+def engine_execute_sql(engine: TransactionEngine, sql_query: str) -> str:
+    return engine.query(sql_query).to_string()
+
+
+def run(filepath: Path, calls: int, legacy_calls: int, cache_dir: Path) -> dict:
+    legacy = time_calls(lambda: legacy_execute_sql(filepath, QUERY), legacy_calls)
+    duckdb.default_connection().execute("DROP TABLE IF EXISTS transactions")
+
+    cache = ColumnarCache(cache_dir)
+    engines = []
+    startup = time_calls(
+        lambda: engines.append(TransactionEngine(filepath, cache=cache)), 1
+    )
+    engine = engines[0]
+    engine_timings = time_calls(lambda: engine_execute_sql(engine, QUERY), calls)
+    engine.close()
+    return {
+        "before": summarise(legacy),
+        "after": summarise(engine_timings),
+        "after_startup_ms": round(startup[0], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--rows", type=int, default=0, help="synthetic rows, 0 = shipped data"
+    )
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--legacy-calls", type=int, default=10)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = TRANSACTIONS_PATH
+        if args.rows:
+            filepath = write_json(
+                synthetic_transactions(args.rows), Path(tmp) / "transactions.json"
+            )
+        results = run(filepath, args.calls, args.legacy_calls, Path(tmp))
+
+    results["dataset"] = f"synthetic {args.rows} rows" if args.rows else "shipped"
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
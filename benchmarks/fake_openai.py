@@ -0,0 +1,354 @@
+"""
+Local stand-in for the parts of the OpenAI API used by the vector store code.
+
+Serves files, vector stores, vector store files and file batches from
+memory over HTTP, so the real ``openai`` clients can be pointed at it with
+``OPENAI_BASE_URL``. Every request can be delayed to simulate network
+latency, a share of requests can be failed with 429/500 responses to
+exercise retries, file batches can stay ``in_progress`` for a while to
+exercise polling, and all requests are recorded for inspection.
+
+    with FakeOpenAIServer(latency=0.05) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        ...
+"""
+
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+
+class FakeOpenAIState:
+    """In-memory objects served by the fake API."""
+
+    def __init__(self, batch_processing_s: float = 0.0):
+        self.lock = threading.Lock()
+        self.batch_processing_s = batch_processing_s
+        self.ids = itertools.count(1)
+        self.files: dict[str, dict[str, Any]] = {}
+        self.vector_stores: dict[str, dict[str, Any]] = {}
+        self.vector_store_files: dict[str, dict[str, dict[str, Any]]] = {}
+        # batch id -> batch object, its file ids and when it finishes processing
+        self.file_batches: dict[str, dict[str, Any]] = {}
+        self.requests: list[tuple[str, str]] = []
+        self.injected_failures = 0
+
+    def new_id(self, prefix: str) -> str:
+        return f"{prefix}_{next(self.ids):06d}"
+
+    def vector_store(self, name: str | None) -> dict[str, Any]:
+        now = int(time.time())
+        store = {
+            "id": self.new_id("vs"),
+            "object": "vector_store",
+            "name": name,
+            "created_at": now,
+            "last_active_at": now,
+            "status": "completed",
+            "usage_bytes": 0,
+            "metadata": {},
+            "file_counts": {
+                "cancelled": 0,
+                "completed": 0,
+                "failed": 0,
+                "in_progress": 0,
+                "total": 0,
+            },
+        }
+        self.vector_stores[store["id"]] = store
+        self.vector_store_files[store["id"]] = {}
+        return store
+
+    def attach_file(self, vector_store_id: str, file_id: str) -> dict[str, Any]:
+        store = self.vector_stores[vector_store_id]
+        attached = {
+            "id": file_id,
+            "object": "vector_store.file",
+            "created_at": int(time.time()),
+            "vector_store_id": vector_store_id,
+            "status": "completed",
+            "usage_bytes": self.files[file_id]["bytes"],
+            "last_error": None,
+        }
+        self.vector_store_files[vector_store_id][file_id] = attached
+        store["file_counts"]["completed"] += 1
+        store["file_counts"]["total"] += 1
+        store["usage_bytes"] += attached["usage_bytes"]
+        return attached
+
+    def create_file_batch(
+        self, vector_store_id: str, file_ids: list[str], processing_s: float
+    ) -> dict[str, Any]:
+        batch = {
+            "id": self.new_id("vsfb"),
+            "object": "vector_store.files_batch",
+            "created_at": int(time.time()),
+            "vector_store_id": vector_store_id,
+            "status": "in_progress",
+            "file_counts": {
+                "cancelled": 0,
+                "completed": 0,
+                "failed": 0,
+                "in_progress": len(file_ids),
+                "total": len(file_ids),
+            },
+        }
+        self.file_batches[batch["id"]] = {
+            "batch": batch,
+            "file_ids": file_ids,
+            "ready_at": time.monotonic() + processing_s,
+        }
+        return self.refresh_file_batch(batch["id"])
+
+    def refresh_file_batch(self, batch_id: str) -> dict[str, Any]:
+        """Finish a batch once its processing time is up, attaching its files."""
+        entry = self.file_batches[batch_id]
+        batch = entry["batch"]
+        if batch["status"] != "in_progress" or time.monotonic() < entry["ready_at"]:
+            return batch
+        counts = batch["file_counts"]
+        for file_id in entry["file_ids"]:
+            if file_id in self.files:
+                self.attach_file(batch["vector_store_id"], file_id)
+                counts["completed"] += 1
+            else:
+                counts["failed"] += 1
+            counts["in_progress"] -= 1
+        batch["status"] = "completed"
+        return batch
+
+    def file_batch_files(self, batch_id: str) -> list[dict[str, Any]]:
+        entry = self.file_batches[batch_id]
+        batch = entry["batch"]
+        attached = self.vector_store_files.get(batch["vector_store_id"], {})
+        files = []
+        for file_id in entry["file_ids"]:
+            if file_id in attached:
+                files.append(attached[file_id])
+                continue
+            failed = batch["status"] != "in_progress"
+            files.append(
+                {
+                    "id": file_id,
+                    "object": "vector_store.file",
+                    "created_at": batch["created_at"],
+                    "vector_store_id": batch["vector_store_id"],
+                    "status": "failed" if failed else "in_progress",
+                    "usage_bytes": 0,
+                    "last_error": (
+                        {"code": "invalid_file", "message": "No file found"}
+                        if failed
+                        else None
+                    ),
+                }
+            )
+        return files
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    server: "FakeOpenAIServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, body: dict[str, Any]) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _not_found(self) -> None:
+        self._send(404, {"error": {"message": "not found", "type": "not_found"}})
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("content-length", 0))
+        return self.rfile.read(length)
+
+    def _route(self, method: str) -> None:
+        state = self.server.state
+        path = self.path.split("?")[0].removeprefix("/v1")
+        body = self._body() if method == "POST" else b""
+        time.sleep(self.server.latency)
+        with state.lock:
+            state.requests.append((method, path))
+            status = self.server.injected_failure()
+            if status is not None:
+                state.injected_failures += 1
+                return self._send(
+                    status, {"error": {"message": "injected", "type": "server_error"}}
+                )
+            routes = self.server.routes(method)
+            for pattern, handler in routes:
+                match = re.fullmatch(pattern, path)
+                if match:
+                    status, response = handler(state, body, *match.groups())
+                    return self._send(status, response)
+        self._not_found()
+
+    def do_GET(self) -> None:
+        self._route("GET")
+
+    def do_POST(self) -> None:
+        self._route("POST")
+
+    def do_DELETE(self) -> None:
+        self._route("DELETE")
+
+
+def _create_file(state: FakeOpenAIState, body: bytes) -> tuple[int, dict]:
+    match = re.search(rb'filename="([^"]*)"', body)
+    file = {
+        "id": state.new_id("file"),
+        "object": "file",
+        "bytes": len(body),
+        "created_at": int(time.time()),
+        "filename": match.group(1).decode() if match else "upload",
+        "purpose": "assistants",
+        "status": "processed",
+    }
+    state.files[file["id"]] = file
+    return 200, file
+
+
+def _create_vector_store(state: FakeOpenAIState, body: bytes) -> tuple[int, dict]:
+    return 200, state.vector_store(json.loads(body or b"{}").get("name"))
+
+
+def _get_vector_store(state: FakeOpenAIState, body: bytes, vs_id: str):
+    if vs_id not in state.vector_stores:
+        return 404, {"error": {"message": "No vector store found", "type": "invalid"}}
+    return 200, state.vector_stores[vs_id]
+
+
+def _delete_vector_store(state: FakeOpenAIState, body: bytes, vs_id: str):
+    state.vector_stores.pop(vs_id, None)
+    state.vector_store_files.pop(vs_id, None)
+    return 200, {"id": vs_id, "object": "vector_store.deleted", "deleted": True}
+
+
+def _attach_file(state: FakeOpenAIState, body: bytes, vs_id: str):
+    if vs_id not in state.vector_stores:
+        return 404, {"error": {"message": "No vector store found", "type": "invalid"}}
+    file_id = json.loads(body)["file_id"]
+    if file_id not in state.files:
+        return 404, {"error": {"message": "No file found", "type": "invalid"}}
+    return 200, state.attach_file(vs_id, file_id)
+
+
+def _list_vector_store_files(state: FakeOpenAIState, body: bytes, vs_id: str):
+    files = list(state.vector_store_files.get(vs_id, {}).values())
+    return 200, {"object": "list", "data": files, "has_more": False}
+
+
+def _create_file_batch(state: FakeOpenAIState, body: bytes, vs_id: str):
+    if vs_id not in state.vector_stores:
+        return 404, {"error": {"message": "No vector store found", "type": "invalid"}}
+    file_ids = json.loads(body)["file_ids"]
+    return 200, state.create_file_batch(vs_id, file_ids, state.batch_processing_s)
+
+
+def _get_file_batch(state: FakeOpenAIState, body: bytes, vs_id: str, batch_id: str):
+    if batch_id not in state.file_batches:
+        return 404, {"error": {"message": "No file batch found", "type": "invalid"}}
+    return 200, state.refresh_file_batch(batch_id)
+
+
+def _list_file_batch_files(
+    state: FakeOpenAIState, body: bytes, vs_id: str, batch_id: str
+):
+    if batch_id not in state.file_batches:
+        return 404, {"error": {"message": "No file batch found", "type": "invalid"}}
+    files = state.file_batch_files(batch_id)
+    return 200, {"object": "list", "data": files, "has_more": False}
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server answering a subset of the OpenAI REST API.
+
+    Args:
+        latency (float): Seconds to sleep before answering each request.
+        port (int): Port to bind on localhost, 0 picks a free one.
+        failure_rate (float): Share of requests answered with a 429 or 500
+            error instead of being served.
+        batch_processing_s (float): Seconds a file batch stays
+            ``in_progress`` before its files are attached.
+        seed (int): Seed of the injected failures.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        port: int = 0,
+        failure_rate: float = 0.0,
+        batch_processing_s: float = 0.0,
+        seed: int = 0,
+    ):
+        super().__init__(("127.0.0.1", port), FakeOpenAIHandler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.state = FakeOpenAIState(batch_processing_s)
+        self._random = random.Random(seed)
+        self._thread: threading.Thread | None = None
+
+    def injected_failure(self) -> int | None:
+        """Return the error status to answer the current request with, if any."""
+        if self._random.random() >= self.failure_rate:
+            return None
+        return self._random.choice((429, 500))
+
+    def routes(self, method: str) -> list[tuple[str, Any]]:
+        return {
+            "GET": [
+                (r"/vector_stores/([^/]+)", _get_vector_store),
+                (r"/vector_stores/([^/]+)/files", _list_vector_store_files),
+                (r"/vector_stores/([^/]+)/file_batches/([^/]+)", _get_file_batch),
+                (
+                    r"/vector_stores/([^/]+)/file_batches/([^/]+)/files",
+                    _list_file_batch_files,
+                ),
+            ],
+            "POST": [
+                (r"/files", _create_file),
+                (r"/vector_stores", _create_vector_store),
+                (r"/vector_stores/([^/]+)/files", _attach_file),
+                (r"/vector_stores/([^/]+)/file_batches", _create_file_batch),
+            ],
+            "DELETE": [(r"/vector_stores/([^/]+)", _delete_vector_store)],
+        }.get(method, [])
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def requests(self) -> list[tuple[str, str]]:
+        return list(self.state.requests)
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    with FakeOpenAIServer(port=8765) as server:
+        print(f"fake OpenAI API listening on {server.base_url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
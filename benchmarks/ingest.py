@@ -0,0 +1,178 @@
+"""
+Document ingestion throughput against a local stand-in for the OpenAI API.
+
+Writes ``--documents`` synthetic documents and ingests them into fresh
+vector stores on ``FakeOpenAIServer``, which delays every request by
+``--latency`` seconds, fails ``--failure-rate`` of them with 429/500 errors
+and keeps file batches processing for ``--batch-processing`` seconds.
+Reports, for each:
+- the old one-at-a-time ``upload_pdf_to_vector_store`` loop,
+- the ``DocumentIngestor`` pipeline at several in-flight limits,
+- a re-run of the pipeline with its manifest (everything skipped),
+- a run cancelled halfway and resumed from its manifest,
+the wall time, API requests, retries and documents that did not make it.
+
+    uv run python -m benchmarks.ingest
+    uv run python -m benchmarks.ingest --documents 500 --latency 0.1 --failure-rate 0.1
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import openai
+
+from benchmarks.common import report
+from benchmarks.fake_openai import FakeOpenAIServer
+from src.ingest import DocumentIngestor, find_documents
+
+IN_FLIGHT_LIMITS = (1, 8, 32)
+
+
+def write_documents(directory: Path, count: int, size_kb: int) -> list[Path]:
+    rng = np.random.default_rng(42)
+    words = np.array(["budget", "saving", "index", "fund", "debt", "income", "tax"])
+    directory.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        text = " ".join(rng.choice(words, size_kb * 1024 // 6))
+        (directory / f"note-{i:04d}.md").write_text(f"# Note {i}\n\n{text}\n")
+    return find_documents(directory)
+
+
+def new_store(server: FakeOpenAIServer) -> str:
+    with server.state.lock:
+        return server.state.vector_store("ingest-benchmark")["id"]
+
+
+def stored_files(server: FakeOpenAIServer, vector_store_id: str) -> int:
+    return server.state.vector_stores[vector_store_id]["file_counts"]["completed"]
+
+
+async def run_pipeline(
+    server: FakeOpenAIServer,
+    documents: list[Path],
+    vector_store_id: str,
+    manifest: Path,
+    max_in_flight: int,
+    cancel_after_s: float | None = None,
+) -> dict[str, Any]:
+    client = openai.AsyncOpenAI(base_url=server.base_url, api_key="sk-local")
+    ingestor = DocumentIngestor(
+        vector_store_id,
+        client=client,
+        manifest_path=manifest,
+        max_in_flight=max_in_flight,
+        retry_backoff_s=0.05,
+        poll_interval_s=0.1,
+    )
+    before = len(server.requests)
+    start = time.perf_counter()
+    try:
+        summary = await asyncio.wait_for(ingestor.ingest(documents), cancel_after_s)
+    except asyncio.TimeoutError:
+        summary = {"cancelled": True, **ingestor.counters}
+    result = {
+        "wall_s": round(time.perf_counter() - start, 3),
+        "requests": len(server.requests) - before,
+        **summary,
+        "stored_files": stored_files(server, vector_store_id),
+    }
+    await client.close()
+    return result
+
+
+def run_legacy(server: FakeOpenAIServer, documents: list[Path]) -> dict[str, Any]:
+    # imported after the environment points at the fake server
+    from src.vector import upload_pdf_to_vector_store
+
+    vector_store_id = new_store(server)
+    before = len(server.requests)
+    start = time.perf_counter()
+    failed = 0
+    for path in documents:
+        try:
+            upload_pdf_to_vector_store(path, vector_store_id)
+        except openai.OpenAIError:
+            failed += 1
+    return {
+        "wall_s": round(time.perf_counter() - start, 3),
+        "requests": len(server.requests) - before,
+        "failed": failed,
+        "stored_files": stored_files(server, vector_store_id),
+    }
+
+
+async def benchmark(args: argparse.Namespace, tmp: Path) -> dict[str, Any]:
+    documents = write_documents(tmp / "documents", args.documents, args.document_kb)
+    results: dict[str, Any] = {
+        "documents": len(documents),
+        "latency_s": args.latency,
+        "failure_rate": args.failure_rate,
+    }
+    with FakeOpenAIServer(
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        batch_processing_s=args.batch_processing,
+    ) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-local")
+        if not args.skip_legacy:
+            results["legacy_sequential"] = await asyncio.to_thread(
+                run_legacy, server, documents
+            )
+
+        for limit in IN_FLIGHT_LIMITS:
+            manifest = tmp / f"manifest-{limit}.json"
+            vector_store_id = new_store(server)
+            results[f"pipeline_in_flight_{limit}"] = await run_pipeline(
+                server, documents, vector_store_id, manifest, limit
+            )
+        results["pipeline_rerun"] = await run_pipeline(
+            server, documents, vector_store_id, manifest, limit
+        )
+
+        manifest = tmp / "manifest-interrupted.json"
+        vector_store_id = new_store(server)
+        full_s = results[f"pipeline_in_flight_{limit}"]["wall_s"]
+        results["interrupted"] = await run_pipeline(
+            server, documents, vector_store_id, manifest, limit, full_s / 2
+        )
+        results["resumed"] = await run_pipeline(
+            server, documents, vector_store_id, manifest, limit
+        )
+        results["injected_failures"] = server.state.injected_failures
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=100)
+    parser.add_argument("--document-kb", type=int, default=16)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="simulated seconds per request"
+    )
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument(
+        "--batch-processing",
+        type=float,
+        default=0.5,
+        help="seconds a file batch stays in progress",
+    )
+    parser.add_argument(
+        "--skip-legacy", action="store_true", help="skip the sequential baseline"
+    )
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = asyncio.run(benchmark(args, Path(tmp)))
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
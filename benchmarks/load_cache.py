@@ -0,0 +1,79 @@
+"""
+Cold vs. warm ``load_data`` times through the columnar cache.
+
+"uncached" is the plain JSON parse + validation path, "cold" builds the
+Arrow cache from scratch, "warm" memory-maps the cached file, and
+"touched" reloads after the source mtime changed but its content did not
+(re-hash, no re-parse).
+
+    uv run python -m benchmarks.load_cache
+    uv run python -m benchmarks.load_cache --rows 1000000
+"""
+
+import argparse
+import os
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import (
+    report,
+    summarise,
+    synthetic_transactions,
+    time_calls,
+    write_json,
+)
+from configs.config import TRANSACTIONS_PATH
+from utils.cache import ColumnarCache
+from utils.utils import load_data, load_table
+
+
+def run(filepath: Path, cache_dir: Path, calls: int) -> dict:
+    cache = ColumnarCache(cache_dir)
+
+    def cold():
+        cache.clear(filepath)
+        load_table(filepath, cache=cache).to_pandas()
+
+    def touched():
+        os.utime(filepath)
+        load_table(filepath, cache=cache).to_pandas()
+
+    return {
+        "uncached": summarise(
+            time_calls(lambda: load_data(filepath, use_cache=False), calls)
+        ),
+        "cold": summarise(time_calls(cold, calls)),
+        "warm": summarise(
+            time_calls(lambda: load_table(filepath, cache=cache).to_pandas(), calls)
+        ),
+        "warm_arrow_only": summarise(
+            time_calls(lambda: load_table(filepath, cache=cache), calls)
+        ),
+        "touched": summarise(time_calls(touched, calls)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--rows", type=int, default=0, help="synthetic rows, 0 = shipped data"
+    )
+    parser.add_argument("--calls", type=int, default=5)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = Path(tmp) / "transactions.json"
+        if args.rows:
+            write_json(synthetic_transactions(args.rows), filepath)
+        else:
+            # copy so touching the file does not change the shipped data's mtime
+            filepath.write_bytes(TRANSACTIONS_PATH.read_bytes())
+        results = run(filepath, Path(tmp) / "cache", args.calls)
+
+    results["dataset"] = f"synthetic {args.rows} rows" if args.rows else "shipped"
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
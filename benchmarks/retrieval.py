@@ -0,0 +1,125 @@
+"""
+Build time, query latency and recall of the local BM25 document retrieval.
+
+Indexes the wealth PDF (or ``--pdf``) into a fresh directory and reports the
+cold build time (extraction, chunking, indexing, writing), the warm load
+time (manifest check and memory-mapping the saved arrays), and the latency
+and recall of the labelled questions in ``benchmarks/retrieval_questions.jsonl``.
+A question counts as recalled at k when one of its top k chunks comes from a
+page labelled as answering it; the mean reciprocal rank of the first such
+chunk is reported too. Each ``--chunk-words`` setting is evaluated on the
+same extracted text, to tune ``RETRIEVAL_CHUNK_WORDS``.
+
+    uv run python -m benchmarks.retrieval
+    uv run python -m benchmarks.retrieval --chunk-words 100 200 300 --calls 200
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from benchmarks.common import report, summarise, time_calls
+from configs.config import PDF_PATH, RETRIEVAL_CHUNK_OVERLAP, RETRIEVAL_CHUNK_WORDS
+from src.retrieval import (
+    DocumentIndex,
+    chunk_pages,
+    extract_pages,
+    load_or_build_index,
+)
+
+QUESTIONS_PATH = Path(__file__).parent / "retrieval_questions.jsonl"
+RECALL_AT = (1, 3, 5, 10)
+
+
+def load_questions(filepath: Path = QUESTIONS_PATH) -> list[dict[str, Any]]:
+    with filepath.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(index: DocumentIndex, questions: list[dict[str, Any]]) -> dict[str, Any]:
+    recalled = dict.fromkeys(RECALL_AT, 0)
+    reciprocal_ranks = []
+    misses = []
+    for question in questions:
+        hits = index.search(question["question"], max(RECALL_AT))
+        ranks = [
+            rank
+            for rank, hit in enumerate(hits, start=1)
+            if hit.page in question["pages"]
+        ]
+        first = ranks[0] if ranks else None
+        reciprocal_ranks.append(1 / first if first else 0.0)
+        for k in RECALL_AT:
+            recalled[k] += first is not None and first <= k
+        if first is None or first > 5:
+            misses.append(
+                {"question": question["question"], "pages": [h.page for h in hits[:5]]}
+            )
+    return {
+        **{f"recall_at_{k}": round(n / len(questions), 3) for k, n in recalled.items()},
+        "mrr": round(sum(reciprocal_ranks) / len(questions), 3),
+        "missed_at_5": misses,
+    }
+
+
+def time_queries(
+    index: DocumentIndex, questions: list[dict[str, Any]], calls: int, k: int
+) -> dict[str, float]:
+    queries = iter([question["question"] for question in questions] * calls)
+    return summarise(time_calls(lambda: index.search(next(queries), k), calls))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pdf", type=Path, nargs="+", default=[PDF_PATH])
+    parser.add_argument(
+        "--chunk-words", type=int, nargs="+", default=[100, RETRIEVAL_CHUNK_WORDS, 400]
+    )
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+    questions = load_questions()
+
+    results: dict[str, Any] = {"questions": len(questions)}
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = Path(tmp) / "index"
+        start = time.perf_counter()
+        load_or_build_index(args.pdf, index_dir)
+        results["cold_build_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        start = time.perf_counter()
+        index = load_or_build_index(args.pdf, index_dir)
+        results["warm_load_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        results["chunks"] = len(index.chunks)
+        results["terms"] = len(index.vocabulary)
+        results["index_kb"] = round(
+            sum(path.stat().st_size for path in index_dir.iterdir()) / 1024, 1
+        )
+        results["query_ms"] = time_queries(index, questions, args.calls, args.top_k)
+
+    start = time.perf_counter()
+    pages = [page for path in args.pdf for page in extract_pages(path)]
+    results["extract_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    for chunk_words in args.chunk_words:
+        overlap = min(RETRIEVAL_CHUNK_OVERLAP, chunk_words // 4)
+        start = time.perf_counter()
+        index = DocumentIndex.from_chunks(
+            [
+                {"source": "", "page": page, "text": text}
+                for page, text in chunk_pages(pages, chunk_words, overlap)
+            ]
+        )
+        results[f"chunk_words_{chunk_words}"] = {
+            "overlap": overlap,
+            "chunks": len(index.chunks),
+            "index_ms": round((time.perf_counter() - start) * 1000, 3),
+            **evaluate(index, questions),
+        }
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Latency of typical financial-agent aggregations on the raw transactions table
+vs. the same queries rewritten onto the monthly/yearly rollup tables.
+
+The queries are the SQL of the scripted corpus plus a few common shapes.
+Every rewritten query is checked to return the same rows as the raw one
+before it is timed. Synthetic data is loaded straight into DuckDB, so large
+row counts do not pay for JSON parsing.
+
+    uv run python -m benchmarks.rollups
+    uv run python -m benchmarks.rollups --rows 20000000 --calls 10
+"""
+
+import argparse
+import math
+import time
+from pathlib import Path
+
+import duckdb
+
+from benchmarks.agent_graph import load_corpus
+from benchmarks.common import report, summarise, synthetic_transactions, time_calls
+from configs.config import TRANSACTIONS_TABLE
+from src.rollups import ROLLUPS, create_rollups, rewrite_for_rollups
+
+EXTRA_QUERIES = [
+    "SELECT year, category, SUM(amount) AS total FROM transactions "
+    "GROUP BY year, category ORDER BY year, category",
+    "SELECT year, month, SUM(amount) AS debits, COUNT(*) AS n FROM transactions "
+    "WHERE type = 'debit' GROUP BY year, month ORDER BY year, month",
+    "SELECT category, MIN(amount), MAX(amount) FROM transactions "
+    "WHERE year >= 2023 GROUP BY category ORDER BY category",
+]
+
+
+def benchmark_queries() -> list[str]:
+    queries = [sql for query in load_corpus() for sql in query.get("sql", [])]
+    return list(dict.fromkeys(queries + EXTRA_QUERIES))
+
+
+def same_rows(left: list[tuple], right: list[tuple]) -> bool:
+    if len(left) != len(right):
+        return False
+    for left_row, right_row in zip(left, right):
+        for a, b in zip(left_row, right_row):
+            if isinstance(a, float) and isinstance(b, float):
+                if not math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6):
+                    return False
+            elif a != b:
+                return False
+    return True
+
+
+def run(n_rows: int, calls: int) -> dict:
+    conn = duckdb.connect()
+    data = synthetic_transactions(n_rows)
+    conn.register("incoming_transactions", data)
+    conn.execute(
+        f"CREATE TABLE {TRANSACTIONS_TABLE} AS SELECT * FROM incoming_transactions"
+    )
+    conn.unregister("incoming_transactions")
+    del data
+
+    start = time.perf_counter()
+    create_rollups(conn, TRANSACTIONS_TABLE)
+    build_ms = (time.perf_counter() - start) * 1000
+    rollup_rows = {
+        rollup.table_name(TRANSACTIONS_TABLE): conn.execute(
+            f"SELECT COUNT(*) FROM {rollup.table_name(TRANSACTIONS_TABLE)}"
+        ).fetchone()[0]
+        for rollup in ROLLUPS
+    }
+
+    results = []
+    for sql in benchmark_queries():
+        rewritten = rewrite_for_rollups(sql, TRANSACTIONS_TABLE, conn.sql(sql).columns)
+        record = {"sql": sql, "rewritten": rewritten}
+        raw = time_calls(lambda: conn.execute(sql).fetchall(), calls)
+        record["raw"] = summarise(raw)
+        if rewritten is not None:
+            if not same_rows(
+                conn.execute(sql).fetchall(), conn.execute(rewritten).fetchall()
+            ):
+                raise AssertionError(f"rollup result differs for: {sql}")
+            rolled = time_calls(lambda: conn.execute(rewritten).fetchall(), calls)
+            record["rollup"] = summarise(rolled)
+            record["speedup"] = round(
+                record["raw"]["p50_ms"] / record["rollup"]["p50_ms"], 1
+            )
+        results.append(record)
+    conn.close()
+
+    rewritten = [r for r in results if r["rewritten"] is not None]
+    return {
+        "rows": n_rows,
+        "rollup_build_ms": round(build_ms, 3),
+        "rollup_rows": rollup_rows,
+        "queries_rewritten": f"{len(rewritten)}/{len(results)}",
+        "total_p50_ms": {
+            "raw": round(sum(r["raw"]["p50_ms"] for r in rewritten), 3),
+            "rollup": round(sum(r["rollup"]["p50_ms"] for r in rewritten), 3),
+        },
+        "queries": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+    report(run(args.rows, args.calls), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Accuracy and latency saved by the local router in front of the triage agent.
+
+The router is trained on ``data/routing_examples.jsonl`` and evaluated on the
+held-out queries in ``benchmarks/router_holdout.jsonl``: it reports how many
+queries are dispatched directly (coverage), how many of those go to the right
+agent, and the same figures over a sweep of confidence thresholds. Each
+held-out query is then run through the agent graph on a scripted local model,
+once starting at the triage agent and once starting wherever the router sends
+it, to measure the model turns and latency saved.
+
+    uv run python -m benchmarks.router
+    uv run python -m benchmarks.router --model-latency 0.5 --output router.json
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+from agents import RunConfig
+
+from benchmarks.agent_graph import GraphProbe, TimedModel
+from benchmarks.common import percentile, report
+from configs.config import ROUTER_MIN_CONFIDENCE
+from src.agent import OFFLINE_VECTOR_STORE_ID, agent_execution, build_agent_graph
+from src.fake_model import FakeModelProvider, ScriptedModel
+from src.router import QueryRouter, load_examples
+
+HOLDOUT_PATH = Path(__file__).parent / "router_holdout.jsonl"
+THRESHOLDS = [0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6]
+
+
+def evaluate_routing(
+    router: QueryRouter, holdout: list[tuple[str, str]], threshold: float
+) -> dict[str, Any]:
+    """Coverage and accuracy of direct dispatch at a confidence threshold."""
+    routes = [(router.predict(query), agent) for query, agent in holdout]
+    dispatched = [
+        (max(route.scores, key=route.scores.get), agent)
+        for route, agent in routes
+        if route.confidence >= threshold
+    ]
+    correct = sum(predicted == agent for predicted, agent in dispatched)
+    return {
+        "threshold": threshold,
+        "coverage": round(len(dispatched) / len(routes), 4),
+        "dispatched_accuracy": round(correct / len(dispatched), 4)
+        if dispatched
+        else None,
+        "misrouted": len(dispatched) - correct,
+    }
+
+
+async def run_queries(
+    holdout: list[tuple[str, str]],
+    router: QueryRouter,
+    model_latency: float,
+    use_router: bool,
+) -> list[dict[str, Any]]:
+    scripts = {
+        query: {"route": agent, "answer": f"[{agent}] {query}"}
+        for query, agent in holdout
+    }
+    probe = GraphProbe()
+    model = TimedModel(ScriptedModel(scripts, latency=model_latency), probe)
+    graph = build_agent_graph(
+        OFFLINE_VECTOR_STORE_ID, model_provider=FakeModelProvider(model)
+    )
+    agents = {agent.name: agent for agent in graph.agents()}
+    run_config = RunConfig(tracing_disabled=True)
+
+    records = []
+    for query, expected in holdout:
+        probe.reset()
+        start = time.perf_counter()
+        agent = graph.triage_agent
+        if use_router:
+            agent = router.route(query, agents, fallback=graph.triage_agent)
+        routed_ms = (time.perf_counter() - start) * 1000
+        response = await agent_execution(agent, query, run_config=run_config)
+        records.append(
+            {
+                "expected": expected,
+                "final_agent": response.last_agent.name,
+                "wall_ms": (time.perf_counter() - start) * 1000,
+                "route_ms": routed_ms,
+                "model_calls": probe.model_calls,
+            }
+        )
+    return records
+
+
+def summarise_runs(records: list[dict[str, Any]]) -> dict[str, Any]:
+    wall = [r["wall_ms"] for r in records]
+    return {
+        "queries": len(records),
+        "wrong_final_agent": sum(r["final_agent"] != r["expected"] for r in records),
+        "model_calls_per_query": round(
+            statistics.fmean(r["model_calls"] for r in records), 3
+        ),
+        "latency_mean_ms": round(statistics.fmean(wall), 3),
+        "latency_p50_ms": round(percentile(wall, 50), 3),
+        "latency_p90_ms": round(percentile(wall, 90), 3),
+        "route_mean_ms": round(statistics.fmean(r["route_ms"] for r in records), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--model-latency", type=float, default=0.1, help="seconds per model call"
+    )
+    parser.add_argument("--threshold", type=float, default=ROUTER_MIN_CONFIDENCE)
+    parser.add_argument("--holdout", type=Path, default=HOLDOUT_PATH)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    examples = load_examples()
+    start = time.perf_counter()
+    router = QueryRouter(examples, min_confidence=args.threshold)
+    train_ms = (time.perf_counter() - start) * 1000
+    holdout = load_examples(args.holdout)
+
+    triage = asyncio.run(run_queries(holdout, router, args.model_latency, False))
+    routed = asyncio.run(run_queries(holdout, router, args.model_latency, True))
+    triage_summary, routed_summary = summarise_runs(triage), summarise_runs(routed)
+    report(
+        {
+            "train_examples": dict(Counter(agent for _, agent in examples)),
+            "train_ms": round(train_ms, 3),
+            "holdout_queries": len(holdout),
+            "routing": evaluate_routing(router, holdout, args.threshold),
+            "threshold_sweep": [
+                evaluate_routing(router, holdout, threshold) for threshold in THRESHOLDS
+            ],
+            "triage_only": triage_summary,
+            "with_router": routed_summary,
+            "saved_latency_mean_ms": round(
+                triage_summary["latency_mean_ms"] - routed_summary["latency_mean_ms"], 3
+            ),
+        },
+        args.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Load test of the WebSocket server with scripted local models.
+
+Starts the agent server in-process on a free port, with every agent on a
+``ScriptedModel`` following ``benchmarks/corpus.jsonl`` and the local tools
+running for real, then opens ``--sessions`` conversations from at most
+``--clients`` concurrent clients. Each conversation connects, asks
+``--queries`` corpus questions in order and disconnects. Queries answered
+``busy`` are retried with exponential backoff and jitter, and refused connections
+are retried the same way. Reports sessions and queries per second, client-side
+round-trip latency percentiles and the server's counters.
+
+    uv run python -m benchmarks.server_load
+    uv run python -m benchmarks.server_load --clients 64 --max-runs 8 --model-latency 0.2
+    uv run python -m benchmarks.server_load --url ws://localhost:8765
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from agents import RunConfig
+from websockets.asyncio.client import connect
+from websockets.exceptions import InvalidStatus
+
+from benchmarks.agent_graph import load_corpus
+from benchmarks.common import percentile, report
+from configs.config import (
+    SERVER_MAX_QUEUED_RUNS,
+    SERVER_MAX_RUNS,
+    SERVER_MAX_SESSIONS,
+)
+from src.agent import OFFLINE_VECTOR_STORE_ID, build_agent_graph
+from src.engine import get_engine
+from src.fake_model import FakeModelProvider, ScriptedModel
+from src.router import get_router
+from src.server import AgentServer, listening_port
+
+RETRY_BACKOFF_S = 0.05
+MAX_BACKOFF_S = 2.0
+
+
+def backoff(attempt: int) -> float:
+    """Seconds to wait before a retry, with full jitter."""
+    return random.uniform(0, min(MAX_BACKOFF_S, RETRY_BACKOFF_S * 2**attempt))
+
+
+class LoadStats:
+    """Client-side measurements of a load run."""
+
+    def __init__(self):
+        self.latencies_ms: list[float] = []
+        self.session_ms: list[float] = []
+        self.busy_retries = 0
+        self.refused_retries = 0
+        self.errors = 0
+
+
+async def run_session(url: str, queries: list[str], stats: LoadStats) -> None:
+    started_at = time.perf_counter()
+    attempt = 0
+    while True:
+        try:
+            websocket = await connect(url)
+            break
+        except InvalidStatus:
+            stats.refused_retries += 1
+            await asyncio.sleep(backoff(attempt))
+            attempt += 1
+    async with websocket:
+        json.loads(await websocket.recv())
+        for i, query in enumerate(queries):
+            attempt = 0
+            while True:
+                sent_at = time.perf_counter()
+                await websocket.send(json.dumps({"id": i, "query": query}))
+                reply = json.loads(await websocket.recv())
+                if not reply.get("busy"):
+                    break
+                stats.busy_retries += 1
+                await asyncio.sleep(backoff(attempt))
+                attempt += 1
+            stats.latencies_ms.append((time.perf_counter() - sent_at) * 1000)
+            stats.errors += "error" in reply
+    stats.session_ms.append((time.perf_counter() - started_at) * 1000)
+
+
+async def run_load(
+    url: str, conversations: list[list[str]], clients: int
+) -> tuple[LoadStats, float]:
+    stats = LoadStats()
+    pending = iter(conversations)
+
+    async def client() -> None:
+        for queries in pending:
+            await run_session(url, queries, stats)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return stats, time.perf_counter() - start
+
+
+def conversations(sessions: int, queries: int) -> list[list[str]]:
+    corpus = [script["query"] for script in load_corpus()]
+    return [
+        [corpus[(s + q) % len(corpus)] for q in range(queries)] for s in range(sessions)
+    ]
+
+
+async def benchmark(args: argparse.Namespace) -> dict[str, Any]:
+    workload = conversations(args.sessions, args.queries)
+    agent_server: Optional[AgentServer] = None
+    if args.url:
+        stats, wall_s = await run_load(args.url, workload, args.clients)
+    else:
+        model = ScriptedModel(
+            {script["query"]: script for script in load_corpus()},
+            latency=args.model_latency,
+        )
+        graph = build_agent_graph(
+            OFFLINE_VECTOR_STORE_ID, model_provider=FakeModelProvider(model)
+        )
+        get_engine()
+        agent_server = AgentServer(
+            graph,
+            run_config=RunConfig(tracing_disabled=True),
+            router=get_router(),
+            max_sessions=args.max_sessions,
+            max_runs=args.max_runs,
+            max_queued_runs=args.max_queued_runs,
+        )
+        async with agent_server.serve("localhost", 0) as server:
+            url = f"ws://localhost:{listening_port(server)}"
+            stats, wall_s = await run_load(url, workload, args.clients)
+
+    latencies = stats.latencies_ms
+    results = {
+        "sessions": args.sessions,
+        "queries_per_session": args.queries,
+        "clients": args.clients,
+        "model_latency_s": args.model_latency,
+        "wall_s": round(wall_s, 3),
+        "sessions_per_s": round(len(stats.session_ms) / wall_s, 3),
+        "queries_per_s": round(len(latencies) / wall_s, 3),
+        "query_latency_p50_ms": round(percentile(latencies, 50), 3),
+        "query_latency_p95_ms": round(percentile(latencies, 95), 3),
+        "query_latency_p99_ms": round(percentile(latencies, 99), 3),
+        "session_p95_ms": round(percentile(stats.session_ms, 95), 3),
+        "errors": stats.errors,
+        "busy_retries": stats.busy_retries,
+        "refused_retries": stats.refused_retries,
+    }
+    if agent_server is not None:
+        results["server"] = agent_server.status()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=3, help="queries per session")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument(
+        "--model-latency", type=float, default=0.05, help="seconds per model call"
+    )
+    parser.add_argument("--max-sessions", type=int, default=SERVER_MAX_SESSIONS)
+    parser.add_argument("--max-runs", type=int, default=SERVER_MAX_RUNS)
+    parser.add_argument("--max-queued-runs", type=int, default=SERVER_MAX_QUEUED_RUNS)
+    parser.add_argument(
+        "--url", default=None, help="load an already running server instead"
+    )
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+    report(asyncio.run(benchmark(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
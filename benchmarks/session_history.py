@@ -0,0 +1,159 @@
+"""
+Per-turn prompt size and latency over a long conversation, with the plain
+``SQLiteSession`` vs. the compacting session returned by ``create_session``.
+
+A 100-turn conversation alternates the scripted corpus questions with
+"list my transactions" questions whose SQL results are large tables, and is
+run through the agent graph on a scripted local model, carrying the current
+agent over between turns as ``src/main.py`` does. Both sessions write to a
+SQLite file. For each turn the harness records the prompt tokens sent to the
+model (approximate, from the fake model's usage) and the turn's wall time;
+the size of the stored history is reported at the end.
+
+    uv run python -m benchmarks.session_history
+    uv run python -m benchmarks.session_history --turns 200 --model-latency 0.05
+"""
+
+import argparse
+import asyncio
+import sqlite3
+import statistics
+import tempfile
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any
+
+from agents import RunConfig, SQLiteSession
+
+from benchmarks.agent_graph import load_corpus
+from benchmarks.common import percentile, report
+from src.agent import (
+    OFFLINE_VECTOR_STORE_ID,
+    agent_execution,
+    build_agent_graph,
+    create_session,
+)
+from src.engine import get_engine
+from src.fake_model import FakeModelProvider, ScriptedModel
+
+CHECKPOINTS = [1, 10, 25, 50, 100, 200]
+
+
+def listing_scripts(count: int) -> list[dict[str, Any]]:
+    scripts = []
+    for i in range(count):
+        year, month = 2020 + (i // 12) % 6, i % 12 + 1
+        scripts.append(
+            {
+                "query": f"List my transactions from {month}/{year}.",
+                "route": "financial_agent",
+                "sql": [
+                    "SELECT date, category, amount, description FROM transactions "
+                    f"WHERE year = {year} AND month = {month} ORDER BY date"
+                ],
+                "answer": f"Here are your transactions from {month}/{year}.",
+            }
+        )
+    return scripts
+
+
+def conversation(turns: int) -> list[dict[str, Any]]:
+    corpus = load_corpus()
+    listings = listing_scripts(turns)
+    return [
+        listings[i // 2] if i % 2 else corpus[(i // 2) % len(corpus)]
+        for i in range(turns)
+    ]
+
+
+async def run_conversation(
+    scripts: list[dict[str, Any]], session: SQLiteSession, model_latency: float
+) -> list[dict[str, Any]]:
+    model = ScriptedModel({s["query"]: s for s in scripts}, latency=model_latency)
+    graph = build_agent_graph(
+        OFFLINE_VECTOR_STORE_ID, model_provider=FakeModelProvider(model)
+    )
+    run_config = RunConfig(tracing_disabled=True)
+    cur_agent = graph.triage_agent
+    records = []
+    for turn, script in enumerate(scripts, start=1):
+        start = time.perf_counter()
+        response = await agent_execution(
+            cur_agent, script["query"], session=session, run_config=run_config
+        )
+        wall_ms = (time.perf_counter() - start) * 1000
+        cur_agent = response.last_agent
+        usage = response.context_wrapper.usage
+        records.append(
+            {
+                "turn": turn,
+                "wall_ms": wall_ms,
+                "model_calls": usage.requests,
+                "prompt_tokens": usage.input_tokens,
+                "history_items": len(await session.get_items()),
+            }
+        )
+    session.close()
+    return records
+
+
+def stored_bytes(db_path: Path) -> int:
+    """Size of the message data the session left in its database."""
+    with closing(sqlite3.connect(db_path)) as conn:
+        return conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(message_data)), 0) FROM agent_messages"
+        ).fetchone()[0]
+
+
+def summarise_turns(records: list[dict[str, Any]], db_path: Path) -> dict[str, Any]:
+    wall = [r["wall_ms"] for r in records]
+    tokens = [r["prompt_tokens"] for r in records]
+    return {
+        "prompt_tokens_total": sum(tokens),
+        "prompt_tokens_per_call_at_turn": {
+            r["turn"]: round(r["prompt_tokens"] / r["model_calls"])
+            for r in records
+            if r["turn"] in CHECKPOINTS
+        },
+        "history_items_at_end": records[-1]["history_items"],
+        "turn_latency_mean_ms": round(statistics.fmean(wall), 3),
+        "turn_latency_p95_ms": round(percentile(wall, 95), 3),
+        "last_10_turns_mean_ms": round(statistics.fmean(wall[-10:]), 3),
+        "stored_bytes": stored_bytes(db_path),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument(
+        "--model-latency", type=float, default=0.0, help="seconds per model call"
+    )
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    get_engine()
+    scripts = conversation(args.turns)
+    results: dict[str, Any] = {"turns": args.turns}
+    with tempfile.TemporaryDirectory() as tmp:
+        plain_db, compact_db = Path(tmp) / "plain.db", Path(tmp) / "compact.db"
+        sessions = {
+            "sqlite_session": (SQLiteSession("bench", db_path=plain_db), plain_db),
+            "compacting_session": (
+                create_session("bench", db_path=compact_db),
+                compact_db,
+            ),
+        }
+        for name, (session, db_path) in sessions.items():
+            records = asyncio.run(
+                run_conversation(scripts, session, args.model_latency)
+            )
+            results[name] = summarise_turns(records, db_path)
+            if hasattr(session, "flushes"):
+                results[name]["write_batches"] = session.flushes
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Cost of the SQL guard on everyday queries, and what it saves on dangerous ones.
+
+A ``TransactionEngine`` ingests a generated Parquet dataset of ``--accounts``
+accounts, with the result cache and rollups off. The corpus SQL is timed
+through ``execute`` with the guard on and off, next to the guard's own check
+(parse, and ``EXPLAIN`` where it plans the query). Then each dangerous query
+an agent might write (a join without a condition, joins on low-cardinality
+keys, an unbounded ``SELECT *``, DDL) is run once with the guard on, where it
+is rejected or limited, and once with it off, where it runs until it ends or
+hits the ``--timeout``. DDL is only run with the guard on, since it would
+change the table.
+
+    uv run python -m benchmarks.sql_guard
+    uv run python -m benchmarks.sql_guard --accounts 50000 --timeout 20
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from benchmarks.agent_graph import load_corpus
+from benchmarks.common import report, summarise, time_calls
+from src.engine import QueryTimeoutError, TransactionEngine
+from src.sql_cache import SQLResultCache
+from src.sql_guard import QueryRejectedError, SQLGuard
+from utils.cache import ColumnarCache
+from utils.generate_data import generate_transactions, write_transactions
+
+END_YEAR = 2025
+# name -> (SQL, safe to run without the guard)
+DANGEROUS_QUERIES = {
+    "cross_join": (
+        "SELECT a.amount, b.amount FROM transactions a, transactions b",
+        True,
+    ),
+    "low_cardinality_join": (
+        "SELECT a.category, COUNT(*) AS n FROM transactions a "
+        "JOIN transactions b ON a.type = b.type GROUP BY a.category",
+        True,
+    ),
+    "year_join": (
+        "SELECT a.amount, b.amount FROM transactions a "
+        "JOIN transactions b ON a.year = b.year",
+        True,
+    ),
+    "unbounded_select": ("SELECT * FROM transactions ORDER BY amount", True),
+    "ddl": ("DROP VIEW transactions", False),
+}
+# limits off: the guard returns every query unchanged without planning it
+NO_GUARD = SQLGuard(
+    read_only=False, auto_limit=None, max_join_rows=None, max_plan_rows=None
+)
+
+
+def run_once(engine: TransactionEngine, sql: str) -> dict[str, Any]:
+    start = time.perf_counter()
+    try:
+        result = engine.execute(sql)
+        outcome = "limited" if result.endswith("was added.") else "ok"
+    except QueryRejectedError as e:
+        outcome = f"rejected: {e.code}"
+    except QueryTimeoutError:
+        outcome = "timed_out"
+    return {"outcome": outcome, "ms": round((time.perf_counter() - start) * 1000, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--accounts", type=int, default=20_000)
+    parser.add_argument(
+        "--monthly-count",
+        type=int,
+        default=5,
+        help="transactions per account per month",
+    )
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument(
+        "--timeout", type=float, default=10.0, help="query timeout in seconds"
+    )
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "source"
+        rows = write_transactions(
+            generate_transactions(
+                END_YEAR, END_YEAR, args.monthly_count, args.accounts
+            ),
+            source,
+            "parquet",
+        )
+        engine = TransactionEngine(
+            source,
+            cache=ColumnarCache(Path(tmp) / "cache"),
+            storage="parquet",
+            use_rollups=False,
+            timeout=args.timeout,
+        )
+        engine.result_cache = SQLResultCache(max_entries=0)
+        guard = engine.guard
+        corpus = list(
+            dict.fromkeys(
+                sql for query in load_corpus() for sql in query.get("sql", [])
+            )
+        )
+
+        results: dict[str, Any] = {"rows": rows, "corpus_queries": len(corpus)}
+        cursor = engine._cursor()
+        results["check_ms"] = summarise(
+            [
+                timing
+                for sql in corpus
+                for timing in time_calls(lambda: guard.check(cursor, sql), args.calls)
+            ]
+        )
+        results["explained"] = guard.stats()["explained"]
+        for name, engine.guard in (("guarded", guard), ("unguarded", NO_GUARD)):
+            results[f"corpus_{name}_ms"] = summarise(
+                [
+                    timing
+                    for sql in corpus
+                    for timing in time_calls(lambda: engine.execute(sql), args.calls)
+                ]
+            )
+
+        for name, (sql, safe) in DANGEROUS_QUERIES.items():
+            engine.guard = guard
+            results[name] = {"guarded": run_once(engine, sql)}
+            if safe:
+                engine.guard = NO_GUARD
+                results[name]["unguarded"] = run_once(engine, sql)
+        engine.close()
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Start-up time, memory and query latency of the two transaction storages.
+
+Synthetic transactions are written as a JSON file and served by a
+``TransactionEngine`` with ``"memory"`` storage (the whole file loaded into
+DuckDB through the columnar cache) and with ``"parquet"`` storage (a view
+over the year/month partitioned Parquet store). For each, the harness times
+a cold start (empty cache: parse, validate, write), a warm start (cache and
+store already built) and a set of queries from selective month lookups to
+full scans, with rollup rewriting and the result cache off so every query
+reads the table.
+
+    uv run python -m benchmarks.storage
+    uv run python -m benchmarks.storage --rows 5000000 --calls 10
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from benchmarks.common import (
+    report,
+    summarise,
+    synthetic_transactions,
+    time_calls,
+    write_json,
+)
+from src.engine import TransactionEngine
+from src.sql_cache import SQLResultCache
+from utils.cache import ColumnarCache
+
+QUERIES = {
+    "month_aggregate": "SELECT category, SUM(amount) FROM transactions "
+    "WHERE year = 2024 AND month = 3 GROUP BY category",
+    "month_listing": "SELECT date, description, amount FROM transactions "
+    "WHERE year = 2024 AND month = 3 AND category = 'dining' ORDER BY date",
+    "year_aggregate": "SELECT month, SUM(amount) FROM transactions "
+    "WHERE year = 2023 GROUP BY month ORDER BY month",
+    "full_aggregate": "SELECT category, AVG(amount) FROM transactions GROUP BY category",
+    "full_text_scan": "SELECT COUNT(*) FROM transactions "
+    "WHERE description ILIKE '%dining%'",
+}
+
+
+def start_engine(source: Path, cache_dir: Path, storage: str) -> TransactionEngine:
+    return TransactionEngine(
+        source, cache=ColumnarCache(cache_dir), storage=storage, use_rollups=False
+    )
+
+
+def duckdb_memory_mb(engine: TransactionEngine) -> float:
+    used = engine._conn.execute(
+        "SELECT SUM(memory_usage_bytes) FROM duckdb_memory()"
+    ).fetchone()[0]
+    return round(used / 2**20, 1)
+
+
+def run(source: Path, cache_dir: Path, storage: str, calls: int) -> dict[str, Any]:
+    start = time.perf_counter()
+    start_engine(source, cache_dir, storage).close()
+    cold_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    engine = start_engine(source, cache_dir, storage)
+    warm_ms = (time.perf_counter() - start) * 1000
+    engine.result_cache = SQLResultCache(max_entries=0)
+
+    queries = {
+        name: summarise(time_calls(lambda: engine.query(sql), calls))
+        for name, sql in QUERIES.items()
+    }
+    result = {
+        "cold_start_ms": round(cold_ms, 3),
+        "warm_start_ms": round(warm_ms, 3),
+        "duckdb_memory_mb": duckdb_memory_mb(engine),
+        "queries": queries,
+    }
+    engine.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    results: dict[str, Any] = {"rows": args.rows}
+    with tempfile.TemporaryDirectory() as tmp:
+        source = write_json(synthetic_transactions(args.rows), Path(tmp) / "data.json")
+        results["source_mb"] = round(source.stat().st_size / 2**20, 1)
+        for storage in ("memory", "parquet"):
+            cache_dir = Path(tmp) / f"cache-{storage}"
+            results[storage] = run(source, cache_dir, storage, args.calls)
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
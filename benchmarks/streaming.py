@@ -0,0 +1,116 @@
+"""
+Time to first token of streamed agent runs against waiting for the answer.
+
+The corpus in ``benchmarks/corpus.jsonl`` is run through the whole graph on a
+``ScriptedModel`` that takes ``--model-latency`` seconds per call plus
+``--token-latency`` seconds per word it writes, standing in for a model that
+generates its answer over time. Each query runs once with
+``agent_execution``, where the user sees nothing until the run ends, and once
+as a ``StreamedRun``. Reports the latency of both, the streamed time to first
+token and to the first event of any kind (a handoff or a tool call), and
+whether both runs ended on the same agent with the same answer.
+
+    uv run python -m benchmarks.streaming
+    uv run python -m benchmarks.streaming --model-latency 0.5 --token-latency 0.05
+"""
+
+import argparse
+import asyncio
+import time
+from pathlib import Path
+from typing import Any
+
+from agents import RunConfig
+
+from benchmarks.agent_graph import CORPUS_PATH, load_corpus
+from benchmarks.common import report, summarise
+from src.agent import OFFLINE_VECTOR_STORE_ID, agent_execution, build_agent_graph
+from src.engine import get_engine
+from src.fake_model import FakeModelProvider, ScriptedModel
+from src.streaming import StreamedRun
+
+
+async def benchmark(
+    corpus: list[dict[str, Any]],
+    model_latency: float,
+    token_latency: float,
+    repeat: int,
+) -> dict[str, Any]:
+    model = ScriptedModel(
+        {q["query"]: q for q in corpus},
+        latency=model_latency,
+        token_latency=token_latency,
+    )
+    graph = build_agent_graph(
+        OFFLINE_VECTOR_STORE_ID, model_provider=FakeModelProvider(model)
+    )
+    run_config = RunConfig(tracing_disabled=True)
+
+    blocking_ms, streamed_ms, ttft_ms, first_event_ms = [], [], [], []
+    events = 0
+    answers_match = True
+    for _ in range(repeat):
+        for query in corpus:
+            start = time.perf_counter()
+            response = await agent_execution(
+                graph.triage_agent, query["query"], run_config=run_config
+            )
+            blocking_ms.append((time.perf_counter() - start) * 1000)
+
+            run = StreamedRun(graph.triage_agent, query["query"], run_config=run_config)
+            start = time.perf_counter()
+            first_event = None
+            async for _event in run.events():
+                events += 1
+                if first_event is None:
+                    first_event = (time.perf_counter() - start) * 1000
+            streamed_ms.append(run.latency_ms)
+            first_event_ms.append(first_event)
+            if run.ttft_ms is not None:
+                ttft_ms.append(run.ttft_ms)
+            answers_match &= (run.last_agent.name, str(run.final_output)) == (
+                response.last_agent.name,
+                str(response.final_output),
+            )
+    return {
+        "queries": len(blocking_ms),
+        "blocking_ms": summarise(blocking_ms),
+        "streamed_ms": summarise(streamed_ms),
+        "first_token_ms": summarise(ttft_ms),
+        "first_event_ms": summarise(first_event_ms),
+        "events_per_query": round(events / len(streamed_ms), 1),
+        "answers_match": answers_match,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--model-latency", type=float, default=0.2, help="seconds per model call"
+    )
+    parser.add_argument(
+        "--token-latency",
+        type=float,
+        default=0.02,
+        help="seconds per word the model writes",
+    )
+    parser.add_argument("--repeat", type=int, default=2, help="passes over the corpus")
+    parser.add_argument("--corpus", type=Path, default=CORPUS_PATH)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    # load the data up front so the first query does not pay for it
+    get_engine()
+    results = asyncio.run(
+        benchmark(
+            load_corpus(args.corpus),
+            args.model_latency,
+            args.token_latency,
+            args.repeat,
+        )
+    )
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
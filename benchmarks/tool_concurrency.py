@@ -0,0 +1,130 @@
+"""
+Event-loop responsiveness while data tools run slow and fast queries.
+
+Several concurrent clients each run a mix of fast queries (the corpus SQL)
+and one slow query through the transaction engine, either inline on the
+event loop, as the synchronous tools used to, or on the tool worker pool
+with per-thread DuckDB cursors. One client also sends a runaway query that
+the engine's timeout interrupts. A heartbeat task measures how late the
+event loop wakes up, which is how long every other session is stalled.
+
+    uv run python -m benchmarks.tool_concurrency
+    uv run python -m benchmarks.tool_concurrency --clients 16 --slow-rows 100000000
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from benchmarks.agent_graph import load_corpus
+from benchmarks.common import report, summarise
+from src.engine import QueryTimeoutError, TransactionEngine
+from src.sql_cache import SQLResultCache
+from src.workers import run_blocking
+from utils.cache import ColumnarCache
+
+HEARTBEAT_S = 0.01
+SLOW_QUERY = "SELECT COUNT(*) FROM range({rows}) t(i) WHERE hash(i) % 7 = {client}"
+RUNAWAY_QUERY = "SELECT COUNT(*) FROM range(100000000000) t(i) WHERE hash(i) % 7 = 3"
+
+
+async def heartbeat(stop: asyncio.Event, lags: list[float]) -> None:
+    while not stop.is_set():
+        expected = time.perf_counter() + HEARTBEAT_S
+        await asyncio.sleep(HEARTBEAT_S)
+        lags.append(max(0.0, time.perf_counter() - expected) * 1000)
+
+
+async def run_query(engine: TransactionEngine, sql: str, pooled: bool) -> str:
+    if pooled:
+        return await run_blocking(engine.execute, sql)
+    return engine.execute(sql)
+
+
+async def client(
+    client_id: int,
+    engine: TransactionEngine,
+    queries: list[tuple[str, str]],
+    pooled: bool,
+    timings: dict[str, list[float]],
+) -> None:
+    for kind, sql in queries:
+        start = time.perf_counter()
+        try:
+            await run_query(engine, sql, pooled)
+        except QueryTimeoutError:
+            kind = "timed_out"
+        timings.setdefault(kind, []).append((time.perf_counter() - start) * 1000)
+        # yield between queries as an agent run would between tool calls
+        await asyncio.sleep(0)
+
+
+def workload(clients: int, slow_rows: int) -> list[list[tuple[str, str]]]:
+    fast = [sql for query in load_corpus() for sql in query.get("sql", [])]
+    workloads = []
+    for client_id in range(clients):
+        queries = [("fast", sql) for sql in fast]
+        slow = SLOW_QUERY.format(rows=slow_rows, client=client_id % 7)
+        queries.insert(client_id % len(queries), ("slow", slow))
+        if client_id == 0:
+            queries.insert(len(queries) // 2, ("runaway", RUNAWAY_QUERY))
+        workloads.append(queries)
+    return workloads
+
+
+async def run_mode(
+    engine: TransactionEngine, workloads: list[list[tuple[str, str]]], pooled: bool
+) -> dict[str, Any]:
+    # measure the queries, not the result cache
+    engine.result_cache = SQLResultCache(max_entries=0)
+    stop, lags = asyncio.Event(), []
+    timings: dict[str, list[float]] = {}
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            client(i, engine, queries, pooled, timings)
+            for i, queries in enumerate(workloads)
+        )
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    stop.set()
+    await beat
+    return {
+        "wall_ms": round(wall_ms, 3),
+        "loop_lag": summarise(lags),
+        "queries": {kind: summarise(values) for kind, values in timings.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument(
+        "--slow-rows", type=int, default=30_000_000, help="rows scanned by slow queries"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=3.0, help="query timeout in seconds"
+    )
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    workloads = workload(args.clients, args.slow_rows)
+    results: dict[str, Any] = {
+        "clients": args.clients,
+        "queries_per_client": len(workloads[0]),
+        "timeout_s": args.timeout,
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = TransactionEngine(cache=ColumnarCache(Path(tmp)), timeout=args.timeout)
+        results["inline"] = asyncio.run(run_mode(engine, workloads, pooled=False))
+        results["worker_pool"] = asyncio.run(run_mode(engine, workloads, pooled=True))
+        engine.close()
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
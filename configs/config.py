@@ -1,8 +1,142 @@
+from functools import cache
 from pathlib import Path
+import httpx
 import openai
 
 ROOT = Path(__file__).parents[1]
 TRANSACTIONS_PATH = ROOT / "data" / "financial_transactions.json"
 PDF_PATH = ROOT / "data" / "build-wealth.pdf"
+TRANSACTIONS_TABLE = "transactions"
+CACHE_DIR = ROOT / "data" / ".cache"
+# where the transactions table lives: "parquet" queries a year/month
+# partitioned Parquet copy of the JSON file (kept in CACHE_DIR) in place,
+# "memory" loads the whole file into DuckDB
+TRANSACTIONS_STORAGE = "parquet"
+# what runs the queries of the transaction tools: "duckdb", or "polars" for
+# lazy Polars scans of the "parquet" storage, with DuckDB as the fallback for
+# SQL that Polars does not support
+TRANSACTIONS_BACKEND = "duckdb"
+# account conversations are bound to when the client does not name one, and
+# the account given to transactions files without an account_id column
+DEFAULT_ACCOUNT_ID = 1
+# inline the transactions schema into the SQL agent prompt
+INLINE_SCHEMA_IN_PROMPT = True
+# accounts whose own metadata index (row counts, distinct values, date range)
+# is kept in memory for the schema tools and prompts of account-bound runs
+ACCOUNT_METADATA_MAX_ENTRIES = 1024
+# limits of the execute_sql result cache
+SQL_CACHE_MAX_ENTRIES = 256
+SQL_CACHE_MAX_BYTES = 16 * 1024 * 1024
+# memo of sql_query_agent_tool answers in AGENT_MEMO_PATH, shared by every
+# session and process: a data question asked again (same words once
+# normalised, same account, same data) is answered without running the SQL
+# agent, for AGENT_MEMO_TTL_S seconds, keeping the most recently used
+# AGENT_MEMO_MAX_ENTRIES answers up to AGENT_MEMO_MAX_BYTES
+AGENT_MEMO_ENABLED = True
+AGENT_MEMO_PATH = CACHE_DIR / "agent_memo.sqlite"
+AGENT_MEMO_TTL_S = 24 * 3600.0
+AGENT_MEMO_MAX_ENTRIES = 4096
+AGENT_MEMO_MAX_BYTES = 32 * 1024 * 1024
+# budgets for rendering execute_sql results to the model
+RESULT_MAX_ROWS = 50
+RESULT_MAX_BYTES = 8 * 1024
+RESULT_MAX_TOKENS = 2000
+RESULT_BATCH_ROWS = 2048
+MAX_OPEN_CURSORS = 256
+# threads the blocking data tools run on, and seconds a query may run before
+# it is interrupted
+TOOL_WORKERS = 4
+QUERY_TIMEOUT_S = 30.0
+# memory DuckDB may use for the transactions database and its queries, past
+# which a query spills to disk or is stopped
+QUERY_MEMORY_LIMIT = "2GB"
+# checks run on agent-written SQL before it executes: only a single SELECT is
+# accepted, a LIMIT is added to queries estimated to return more rows than
+# SQL_AUTO_LIMIT, and plans whose joins are estimated to produce more rows than
+# SQL_MAX_JOIN_ROWS, or whose operators would process more rows in total than
+# SQL_MAX_PLAN_ROWS, are rejected
+SQL_READ_ONLY = True
+SQL_AUTO_LIMIT = 10_000
+SQL_MAX_JOIN_ROWS = 10_000_000
+SQL_MAX_PLAN_ROWS = 1_000_000_000
+# answer qualifying aggregate queries from the monthly/yearly rollup tables
+REWRITE_TO_ROLLUPS = True
+# stream answers token by token in the interactive loop, showing tool calls
+# and handoffs as they happen and the time to the first token
+STREAM_OUTPUT = True
+# route confident queries straight to a specialist with a local classifier
+# trained on labelled queries, instead of spending a triage model turn
+USE_LOCAL_ROUTER = True
+ROUTING_EXAMPLES_PATH = ROOT / "data" / "routing_examples.jsonl"
+ROUTER_MIN_CONFIDENCE = 0.4
+# conversation history kept by sessions: approximate token budget, recent turns
+# whose tool outputs are kept whole, characters kept of older tool outputs, and
+# turns whose writes are batched into one transaction
+SESSION_MAX_TOKENS = 6000
+SESSION_KEEP_TURNS = 2
+SESSION_TOOL_OUTPUT_CHARS = 400
+SESSION_FLUSH_TURNS = 4
+# network server: connections served at once, agent runs in flight, runs
+# allowed to wait for a free slot before new queries are turned away, and
+# pooled HTTP connections to the model API
+SERVER_HOST = "localhost"
+SERVER_PORT = 8765
+SERVER_MAX_SESSIONS = 256
+SERVER_MAX_RUNS = 32
+SERVER_MAX_QUEUED_RUNS = 64
+MODEL_MAX_CONNECTIONS = 64
+# instrumentation events (model/tool latency, tokens, handoffs) appended to a
+# JSONL file every METRICS_FLUSH_EVENTS events
+METRICS_ENABLED = True
+METRICS_PATH = ROOT / "data" / "metrics.jsonl"
+METRICS_FLUSH_EVENTS = 256
+# model cassette used by the app's agent graph: None calls the live model,
+# "record" also appends every new request's response to MODEL_CASSETTE_PATH,
+# "replay" answers only from the cassette, offline
+MODEL_CASSETTE_MODE = None
+MODEL_CASSETTE_PATH = ROOT / "data" / "cassettes" / "agent_graph.jsonl"
+# name of the wealth agent's vector store, and the vector stores already
+# created for a given PDF, keyed on the PDF content hash
+WEALTH_STORE_NAME = "wealth-advice"
+VECTOR_STORE_MANIFEST = ROOT / "data" / "vector_stores.json"
+# document ingestion into vector stores: documents already ingested per store
+# keyed on content hash, file types picked up from a directory, uploads in
+# flight, retries of a failed request with exponential backoff (base and cap
+# in seconds), and seconds between file batch status polls
+DOCUMENTS_MANIFEST = ROOT / "data" / "ingested_documents.json"
+INGEST_SUFFIXES = (".pdf", ".md", ".txt", ".docx", ".html")
+INGEST_MAX_IN_FLIGHT = 8
+INGEST_MAX_RETRIES = 5
+INGEST_RETRY_BACKOFF_S = 0.5
+INGEST_MAX_BACKOFF_S = 30.0
+INGEST_POLL_INTERVAL_S = 1.0
+# how the wealth agent searches the book: "hosted" uses the OpenAI file search
+# over the uploaded vector store, "local" a BM25 index of the PDF built once
+# in RETRIEVAL_DIR, which works offline and answers in milliseconds
+WEALTH_RETRIEVAL = "hosted"
+RETRIEVAL_DIR = CACHE_DIR / "retrieval"
+# words per indexed chunk, words shared by consecutive chunks of a page, and
+# chunks returned per search
+RETRIEVAL_CHUNK_WORDS = 200
+RETRIEVAL_CHUNK_OVERLAP = 50
+RETRIEVAL_TOP_K = 5
 
-CLIENT = openai.OpenAI(project="proj_DEb1OlP06KoUF2Qi8geIGnk4")
+
+@cache
+def get_client() -> openai.OpenAI:
+    """Return the shared OpenAI client, created on first use."""
+    return openai.OpenAI(project="proj_DEb1OlP06KoUF2Qi8geIGnk4")
+
+
+@cache
+def get_async_client() -> openai.AsyncOpenAI:
+    """Return the shared async OpenAI client with a bounded connection pool."""
+    return openai.AsyncOpenAI(
+        project="proj_DEb1OlP06KoUF2Qi8geIGnk4",
+        http_client=openai.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=MODEL_MAX_CONNECTIONS,
+                max_keepalive_connections=MODEL_MAX_CONNECTIONS,
+            )
+        ),
+    )
@@ -65,8 +65,10 @@ def _(duckdb):
 
 @app.cell
 def _():
-    from src.agent import triage_agent
+    from src.agent import OFFLINE_VECTOR_STORE_ID, build_agent_graph
     from agents.extensions.visualization import draw_graph
+    # drawing the graph needs no vector store, so nothing is uploaded
+    triage_agent = build_agent_graph(OFFLINE_VECTOR_STORE_ID).triage_agent
     return draw_graph, triage_agent
 
 
@@ -0,0 +1,109 @@
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+
+from src.sql_cache import strip_markdown
+
+ACCOUNT_COLUMN = "account_id"
+
+
+@dataclass(frozen=True)
+class AccountContext:
+    """
+    Run context binding a conversation to one account.
+
+    Passed as the ``context`` of every run of the conversation; the SDK hands
+    it to nested agent-as-tool runs too, so every data tool call of the
+    conversation is scoped to ``account_id``.
+    """
+
+    account_id: int
+
+
+class AccountScopeError(ValueError):
+    """Raised when a query cannot be confined to a single account."""
+
+
+def scope_to_account(
+    sql_query: str, account_id: int, tables: Iterable[str], dialect: str = "duckdb"
+) -> str:
+    """
+    Rewrite a query so every reference to ``tables`` only sees one account.
+
+    Each of the tables the query reads is shadowed by a CTE of the same name
+    selecting the account's rows, e.g. ``WITH transactions AS (SELECT * FROM
+    main.transactions WHERE account_id = 7) ...``, so joins, subqueries and
+    the query's own CTEs all resolve to the filtered rows, and DuckDB pushes
+    the filter down into the scan. Nothing else can be read: table
+    functions (``read_json``, ``query_table``, ``glob``, ...), file paths and
+    other tables are refused, as they would bypass the CTEs.
+
+    Args:
+        sql_query (str): The query, markdown fences allowed.
+        account_id (int): The account the query may read.
+        tables (Iterable[str]): Tables holding an ``account_id`` column.
+        dialect (str): SQL dialect to parse and render.
+
+    Returns:
+        str: The scoped query.
+
+    Raises:
+        AccountScopeError: If the SQL is not a single query, reads anything
+            but ``tables`` and its own CTEs, or names a scoped table in a way
+            the CTEs would not shadow (schema-qualified, or reused as a CTE
+            name).
+
+    Example:
+        >>> scope_to_account("SELECT SUM(amount) FROM transactions", 7, ["transactions"])
+        'WITH transactions AS (SELECT * FROM main.transactions WHERE account_id = 7) SELECT SUM(amount) FROM transactions'
+    """
+    try:
+        statements = sqlglot.parse(strip_markdown(sql_query), read=dialect)
+    except SqlglotError as e:
+        raise AccountScopeError(f"could not parse the query: {e}") from e
+    statements = [s for s in statements if s is not None]
+    if len(statements) != 1 or not isinstance(statements[0], exp.Query):
+        raise AccountScopeError("only a single SELECT query can be run")
+    query = statements[0]
+
+    scoped = {table.lower() for table in tables}
+    cte_names = set()
+    for cte in query.find_all(exp.CTE):
+        if cte.alias_or_name.lower() in scoped:
+            raise AccountScopeError(f"a CTE cannot be named {cte.alias_or_name}")
+        cte_names.add(cte.alias_or_name.lower())
+    readable = ", ".join(sorted(scoped))
+    used = set()
+    for table in query.find_all(exp.Table):
+        if not isinstance(table.this, exp.Identifier):
+            raise AccountScopeError(f"table functions cannot be used, read {readable}")
+        name = table.name.lower()
+        qualified = table.args.get("db") or table.args.get("catalog")
+        if name in scoped:
+            if qualified:
+                raise AccountScopeError(f"refer to {table.name} without a schema")
+            used.add(name)
+        elif name not in cte_names or qualified:
+            raise AccountScopeError(f"{table.name} cannot be read, read {readable}")
+    if not used:
+        return query.sql(dialect=dialect)
+
+    ctes = [
+        exp.CTE(
+            this=sqlglot.parse_one(
+                f"SELECT * FROM main.{name} WHERE {ACCOUNT_COLUMN} = {int(account_id)}",
+                read=dialect,
+            ),
+            alias=exp.TableAlias(this=exp.to_identifier(name)),
+        )
+        for name in sorted(used)
+    ]
+    with_ = query.args.get("with")
+    if with_ is None:
+        query.set("with", exp.With(expressions=ctes))
+    else:
+        with_.set("expressions", ctes + with_.expressions)
+    return query.sql(dialect=dialect)
@@ -1,122 +1,289 @@
 from agents import (
     Agent,
     FileSearchTool,
+    Model,
+    ModelProvider,
     ModelSettings,
+    RunConfig,
+    RunContextWrapper,
     Runner,
     SQLiteSession,
     WebSearchTool,
 )
-from src.vector import create_vector_store, upload_pdf_to_vector_store
+from agents.models.multi_provider import MultiProvider
+from src.accounts import AccountContext
+from src.agent_memo import AgentMemo, get_agent_memo, memoized_agent_tool
+from src.cassette import CassetteModelProvider
+from src.metrics import InstrumentedModel, MetricsHooks, MetricsRecorder, get_metrics
+from src.session import CompactingSession
+from src.vector import resolve_vector_store
+from dataclasses import dataclass, fields
+from functools import cache
 from typing import Optional
-from configs.config import PDF_PATH
+from configs.config import (
+    AGENT_MEMO_ENABLED,
+    INLINE_SCHEMA_IN_PROMPT,
+    METRICS_ENABLED,
+    MODEL_CASSETTE_MODE,
+    PDF_PATH,
+    WEALTH_RETRIEVAL,
+    WEALTH_STORE_NAME,
+)
+from src.engine import get_engine
 
 from src.prompts import (
-    QUERY_TRANSACTION_PROMPT,
+    build_query_transaction_prompt,
     FINANCIAL_AGENT_PROMPT,
     TRIAGE_AGENT_PROMPT,
     INVESTMENT_AGENT_PROMPT,
     WEALTH_AGENT_PROMPT,
 )
 from src.tools import (
-    addition,
-    division,
+    calculate,
     get_metadata_from_table,
     get_table_columns,
     execute_sql,
-    multiplication,
-    percent_change,
-    subtraction,
+    fetch_more_rows,
+    search_documents,
 )
 
+DEFAULT_MODEL = "gpt-4o-mini"
+# placeholder store for offline runs whose models never call the hosted file search
+OFFLINE_VECTOR_STORE_ID = "vs_offline"
 
-sql_query_agent = Agent(
-    name="sql_query_agent",
-    instructions=QUERY_TRANSACTION_PROMPT,
-    tools=[WebSearchTool(), get_metadata_from_table, get_table_columns, execute_sql],
-    model="gpt-4o-mini",
-    model_settings=ModelSettings(temperature=0, tool_choice="required"),
-)
-financial_agent = Agent(
-    name="financial_agent",
-    instructions=FINANCIAL_AGENT_PROMPT,
-    model="gpt-4o-mini",
-    model_settings=ModelSettings(temperature=0.2, tool_choice="auto"),
-    tools=[
-        sql_query_agent.as_tool(
-            tool_name="sql_query_agent_tool",
-            tool_description="This sql agent as a tool is called for pulling data from tables and aggregation",
-        ),
-        addition,
-        subtraction,
-        multiplication,
-        division,
-        percent_change,
-    ],
-)
 
-investment_agent = Agent(
-    name="investment_agent",
-    instructions=INVESTMENT_AGENT_PROMPT,
-    model="gpt-4o-mini",
-    model_settings=ModelSettings(temperature=0.2, tool_choice="required"),
-    tools=[
-        WebSearchTool(),
-        addition,
-        subtraction,
-        multiplication,
-        division,
-        percent_change,
-    ],
-)
+def sql_query_instructions(context: RunContextWrapper, agent: Agent) -> str:
+    """
+    Build the SQL agent prompt with the current table schema inlined.
 
+    A run bound to an account gets the schema of that account's rows only.
+    """
+    schema = None
+    if INLINE_SCHEMA_IN_PROMPT:
+        account = context.context
+        account_id = account.account_id if isinstance(account, AccountContext) else None
+        schema = get_engine().schema_summary(account_id=account_id)
+    return build_query_transaction_prompt(schema)
 
-vector_store = create_vector_store(store_name="wealth-advice")
-file_upload = upload_pdf_to_vector_store(
-    pdf_filepath=PDF_PATH, vector_store_id=vector_store["vector_store_id"]
-)
-wealth_agent = Agent(
-    name="wealth_agent",
-    instructions=WEALTH_AGENT_PROMPT,
-    model="gpt-4o-mini",
-    model_settings=ModelSettings(temperature=0.2, tool_choice="required"),
-    tools=[
-        FileSearchTool(vector_store_ids=[vector_store["vector_store_id"]]),
-        addition,
-        subtraction,
-        multiplication,
-        division,
-        percent_change,
-    ],
-    handoffs=[financial_agent],
-)
 
-# Set the handoffs for financial_agent after sql_query_agent is defined
-financial_agent.handoffs = [investment_agent]
-investment_agent.handoffs = [financial_agent, wealth_agent]
+@dataclass(frozen=True)
+class AgentGraph:
+    """The finance assistant's agents, wired together with their handoffs."""
 
-triage_agent = Agent(
-    name="triage_agent",
-    instructions=TRIAGE_AGENT_PROMPT,
-    handoffs=[financial_agent, investment_agent, wealth_agent],
-    model="gpt-4o-mini",
-    model_settings=ModelSettings(temperature=0.1, tool_choice="required"),
-)
+    triage_agent: Agent
+    sql_query_agent: Agent
+    financial_agent: Agent
+    investment_agent: Agent
+    wealth_agent: Agent
+
+    def get(self, name: str) -> Agent:
+        """Look an agent up by its name, e.g. ``"wealth_agent"``."""
+        return getattr(self, name)
+
+    def agents(self) -> list[Agent]:
+        """Return every agent in the graph."""
+        return [getattr(self, field.name) for field in fields(self)]
+
+
+def build_agent_graph(
+    wealth_vector_store_id: str,
+    model_provider: Optional[ModelProvider] = None,
+    wealth_retrieval: str = WEALTH_RETRIEVAL,
+    agent_memo: Optional[AgentMemo] = None,
+) -> AgentGraph:
+    """
+    Build the agent graph without any network calls.
+
+    Args:
+        wealth_vector_store_id (str): Vector store searched by the wealth agent.
+        model_provider (Optional[ModelProvider]): Provider the agents' models are
+            resolved from up front, e.g. a local fake. Unlike ``RunConfig``, this
+            also covers the nested run of ``sql_query_agent_tool``.
+        wealth_retrieval (str): ``"hosted"`` to give the wealth agent the
+            OpenAI file search over the vector store, ``"local"`` for the
+            ``search_documents`` tool over the local index of the PDF.
+        agent_memo (Optional[AgentMemo]): Memo answering repeated
+            ``sql_query_agent_tool`` requests without running the SQL agent
+            (see ``src.agent_memo``), None to always run it.
+
+    Returns:
+        AgentGraph: The wired agents.
+    """
+    if wealth_retrieval not in ("hosted", "local"):
+        raise ValueError(f"unknown wealth retrieval {wealth_retrieval!r}")
+    model = model_provider.get_model(DEFAULT_MODEL) if model_provider else DEFAULT_MODEL
+    sql_query_agent = Agent(
+        name="sql_query_agent",
+        instructions=sql_query_instructions,
+        tools=[
+            WebSearchTool(),
+            get_metadata_from_table,
+            get_table_columns,
+            execute_sql,
+            fetch_more_rows,
+        ],
+        model=model,
+        model_settings=ModelSettings(temperature=0, tool_choice="required"),
+    )
+    sql_tool_name = "sql_query_agent_tool"
+    sql_tool_description = "This sql agent as a tool is called for pulling data from tables and aggregation"
+    if agent_memo is None:
+        sql_query_agent_tool = sql_query_agent.as_tool(
+            tool_name=sql_tool_name, tool_description=sql_tool_description
+        )
+    else:
+        sql_query_agent_tool = memoized_agent_tool(
+            sql_query_agent, sql_tool_name, sql_tool_description, agent_memo
+        )
+    financial_agent = Agent(
+        name="financial_agent",
+        instructions=FINANCIAL_AGENT_PROMPT,
+        model=model,
+        model_settings=ModelSettings(temperature=0.2, tool_choice="auto"),
+        tools=[sql_query_agent_tool, calculate],
+    )
+
+    investment_agent = Agent(
+        name="investment_agent",
+        instructions=INVESTMENT_AGENT_PROMPT,
+        model=model,
+        model_settings=ModelSettings(temperature=0.2, tool_choice="required"),
+        tools=[
+            WebSearchTool(),
+            calculate,
+        ],
+    )
+
+    wealth_agent = Agent(
+        name="wealth_agent",
+        instructions=WEALTH_AGENT_PROMPT,
+        model=model,
+        model_settings=ModelSettings(temperature=0.2, tool_choice="required"),
+        tools=[
+            search_documents
+            if wealth_retrieval == "local"
+            else FileSearchTool(vector_store_ids=[wealth_vector_store_id]),
+            calculate,
+        ],
+        handoffs=[financial_agent],
+    )
+
+    # Set the handoffs for financial_agent after sql_query_agent is defined
+    financial_agent.handoffs = [investment_agent]
+    investment_agent.handoffs = [financial_agent, wealth_agent]
+
+    triage_agent = Agent(
+        name="triage_agent",
+        instructions=TRIAGE_AGENT_PROMPT,
+        handoffs=[financial_agent, investment_agent, wealth_agent],
+        model=model,
+        model_settings=ModelSettings(temperature=0.1, tool_choice="required"),
+    )
+    return AgentGraph(
+        triage_agent=triage_agent,
+        sql_query_agent=sql_query_agent,
+        financial_agent=financial_agent,
+        investment_agent=investment_agent,
+        wealth_agent=wealth_agent,
+    )
+
+
+def instrument_graph(
+    graph: AgentGraph,
+    recorder: Optional[MetricsRecorder] = None,
+    model_provider: Optional[ModelProvider] = None,
+) -> AgentGraph:
+    """
+    Record every agent's model calls, tool calls and handoffs.
+
+    Each agent gets metrics hooks and its model wrapped in an
+    ``InstrumentedModel``; model names are resolved up front, so nested
+    agent-as-tool runs are covered too.
+
+    Args:
+        graph (AgentGraph): The graph to instrument in place.
+        recorder (Optional[MetricsRecorder]): Sink of the events, defaults to
+            the process-wide recorder.
+        model_provider (Optional[ModelProvider]): Provider model names are
+            resolved from, the SDK's default provider if None.
+
+    Returns:
+        AgentGraph: The same graph.
+    """
+    recorder = recorder or get_metrics()
+    hooks = MetricsHooks(recorder)
+    model_provider = model_provider or MultiProvider()
+    for agent in graph.agents():
+        model = agent.model
+        if isinstance(model, InstrumentedModel):
+            model = model.model
+        elif not isinstance(model, Model):
+            model = model_provider.get_model(model)
+        agent.model = InstrumentedModel(model, agent.name, recorder)
+        agent.hooks = hooks
+    return graph
+
+
+@cache
+def get_agent_graph() -> AgentGraph:
+    """
+    Return the process-wide agent graph, building it on first use.
+
+    The wealth vector store is resolved here rather than at import time, and is
+    reused from the vector store manifest when the PDF has been uploaded before.
+    With ``WEALTH_RETRIEVAL = "local"`` no vector store is needed and the local
+    index of the PDF is searched instead. With ``MODEL_CASSETTE_MODE`` set the
+    models record to or replay from the model cassette (see ``src.cassette``);
+    replaying needs no vector store either. With ``AGENT_MEMO_ENABLED``
+    repeated data questions are answered from the agent memo. With
+    ``METRICS_ENABLED`` the graph is instrumented (see ``instrument_graph``).
+    """
+    if WEALTH_RETRIEVAL == "local" or MODEL_CASSETTE_MODE == "replay":
+        vector_store_id = OFFLINE_VECTOR_STORE_ID
+    else:
+        vector_store_id = resolve_vector_store(
+            store_name=WEALTH_STORE_NAME, pdf_filepath=PDF_PATH
+        )
+    model_provider = None
+    if MODEL_CASSETTE_MODE is not None:
+        model_provider = CassetteModelProvider(MODEL_CASSETTE_MODE)
+    graph = build_agent_graph(
+        vector_store_id,
+        model_provider=model_provider,
+        agent_memo=get_agent_memo() if AGENT_MEMO_ENABLED else None,
+    )
+    return instrument_graph(graph) if METRICS_ENABLED else graph
 
 
 def create_session(session_name: str, **kwargs):
-    session = SQLiteSession(session_name, **kwargs)
+    session = CompactingSession(session_name, **kwargs)
     return session
 
 
 async def agent_execution(
-    agent: Agent, query: str, session: Optional[SQLiteSession] = None
+    agent: Agent,
+    query: str,
+    session: Optional[SQLiteSession] = None,
+    run_config: Optional[RunConfig] = None,
+    context: Optional[AccountContext] = None,
 ):
-    if session is None:
-        new_session = create_session("Agent-Session")
-        response = await Runner.run(
-            starting_agent=agent, input=query, session=new_session
-        )
-    else:
-        response = await Runner.run(starting_agent=agent, input=query, session=session)
+    with get_metrics().run(agent.name):
+        if session is None:
+            new_session = create_session("Agent-Session")
+            response = await Runner.run(
+                starting_agent=agent,
+                input=query,
+                session=new_session,
+                run_config=run_config,
+                context=context,
+            )
+        else:
+            response = await Runner.run(
+                starting_agent=agent,
+                input=query,
+                session=session,
+                run_config=run_config,
+                context=context,
+            )
 
     return response
@@ -0,0 +1,338 @@
+"""
+Memoise the answers of an agent used as a tool, across sessions and processes.
+
+``financial_agent`` pulls data through ``sql_query_agent_tool``, and every call
+runs the whole SQL agent (schema discovery, queries, write-up) even when the
+same data question was answered a turn, or a session, ago.
+``memoized_agent_tool`` builds that tool around an ``AgentMemo``: the request
+is normalised (case, punctuation, whitespace, filler words) and hashed
+together with the agent, the account the run is bound to and the content
+hash of the transactions data, and a hit returns the stored answer without
+running the agent. Requests with relative dates ("this month", "last year")
+also key on today's date. Answers are only stored when the nested run
+neither searched the web nor got an error from a tool, since those depend
+on more than the data.
+
+The memo is a SQLite table, so answers survive restarts and are shared by
+every process pointed at the same file. Entries expire ``ttl_s`` seconds
+after they were stored, and the least recently used ones are evicted once
+the memo holds more than ``max_entries`` answers or ``max_bytes`` of them.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections.abc import Callable
+from datetime import date
+from functools import cache
+from pathlib import Path
+from typing import Any, Optional
+
+from agents import (
+    Agent,
+    FunctionTool,
+    ItemHelpers,
+    RunContextWrapper,
+    RunResult,
+    Runner,
+    ToolCallItem,
+    ToolCallOutputItem,
+    function_tool,
+)
+
+from configs.config import (
+    AGENT_MEMO_MAX_BYTES,
+    AGENT_MEMO_MAX_ENTRIES,
+    AGENT_MEMO_PATH,
+    AGENT_MEMO_TTL_S,
+)
+from src.accounts import AccountContext
+from src.engine import get_engine
+from src.metrics import get_metrics
+from src.workers import run_blocking
+
+# bump whenever the request normalisation or key changes, so old answers miss
+MEMO_KEY_VERSION = 2
+# words that never change what a data question asks for
+FILLER_WORDS = frozenset({"please", "kindly", "thanks", "thank", "pls"})
+# comparison operators, and words, numbers, amounts and dates such as 2024-03,
+# 1,200.50 or -500
+REQUEST_TOKEN = re.compile(r"<>|!=|[<>=]=?|(?:-(?=[\d$]))?[\w$%]+(?:[.,:/-]\w+)*%?")
+# requests whose answer depends on the day they are asked
+RELATIVE_DATE = re.compile(
+    r"\b(today|yesterday|tomorrow|now|current(ly)?|this|last|past|recent(ly)?"
+    r"|latest|ago|so far|to date|ytd|mtd)\b"
+)
+
+
+def normalize_request(request: str) -> str:
+    """
+    Return the canonical form of a request to an agent.
+
+    Case, punctuation, whitespace and filler words are dropped; comparison
+    operators and minus signs are kept, as they change what is asked.
+
+    Example:
+        >>> normalize_request("  How much did I spend on Groceries in 2024, please?")
+        'how much did i spend on groceries in 2024'
+    """
+    text = unicodedata.normalize("NFKC", request).casefold()
+    return " ".join(w for w in REQUEST_TOKEN.findall(text) if w not in FILLER_WORDS)
+
+
+def memo_key(
+    agent: Agent,
+    request: str,
+    data_version: str,
+    account_id: Optional[int] = None,
+    today: Optional[date] = None,
+) -> str:
+    """
+    Hash everything that decides an agent's answer to a request.
+
+    Args:
+        agent (Agent): The agent answering, by name and tools.
+        request (str): The request, normalised before hashing.
+        data_version (str): Content hash of the data the agent queries.
+        account_id (Optional[int]): Account the run is bound to.
+        today (Optional[date]): Date keyed on for relative-date requests,
+            today by default.
+
+    Returns:
+        str: sha256 hex digest of the key.
+    """
+    normalized = normalize_request(request)
+    key = {
+        "version": MEMO_KEY_VERSION,
+        "agent": agent.name,
+        "tools": sorted(tool.name for tool in agent.tools),
+        "request": normalized,
+        "data": data_version,
+        "account": account_id,
+        "date": (
+            (today or date.today()).isoformat()
+            if RELATIVE_DATE.search(normalized)
+            else None
+        ),
+    }
+    encoded = json.dumps(key, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def is_memoizable(result: RunResult) -> bool:
+    """Whether an agent run's answer depends only on its request and the data."""
+    for item in result.new_items:
+        if isinstance(item, ToolCallItem) and item.raw_item.type == "web_search_call":
+            return False
+        if isinstance(item, ToolCallOutputItem) and str(item.output).startswith(
+            "Error"
+        ):
+            return False
+    return True
+
+
+class AgentMemo:
+    """
+    SQLite store of agent answers keyed on ``memo_key``.
+
+    Lookups and writes are serialised on one connection, which may be used
+    from any thread; a file database runs in WAL mode with
+    ``synchronous=NORMAL``, as sessions do.
+
+    Args:
+        db_path (str | Path): SQLite file, created if missing, or ``":memory:"``.
+        ttl_s (Optional[float]): Seconds an answer is served after it was
+            stored, None to keep it until it is evicted.
+        max_entries (int): Answers kept.
+        max_bytes (int): Total size of the answers kept.
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path = AGENT_MEMO_PATH,
+        ttl_s: Optional[float] = AGENT_MEMO_TTL_S,
+        max_entries: int = AGENT_MEMO_MAX_ENTRIES,
+        max_bytes: int = AGENT_MEMO_MAX_BYTES,
+    ):
+        self.db_path = db_path
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        if db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS agent_memo (
+                key TEXT PRIMARY KEY,
+                agent TEXT NOT NULL,
+                request TEXT NOT NULL,
+                output TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                used_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS agent_memo_used_at ON agent_memo (used_at);
+            CREATE INDEX IF NOT EXISTS agent_memo_created_at
+                ON agent_memo (created_at);
+            """
+        )
+        self._lock = threading.Lock()
+
+    def _expired_before(self, now: float) -> float:
+        return float("-inf") if self.ttl_s is None else now - self.ttl_s
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the stored answer for ``key`` if it has not expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT output, created_at FROM agent_memo WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            output, created_at = row
+            if created_at < self._expired_before(now):
+                self._conn.execute("DELETE FROM agent_memo WHERE key = ?", (key,))
+                self._conn.commit()
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE agent_memo SET used_at = ?, hits = hits + 1 WHERE key = ?",
+                (now, key),
+            )
+            self._conn.commit()
+            self.hits += 1
+            return output
+
+    def put(self, key: str, agent_name: str, request: str, output: str) -> None:
+        """Store an answer, then evict expired and least recently used ones."""
+        size = len(output.encode())
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO agent_memo "
+                "(key, agent, request, output, bytes, created_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, agent_name, normalize_request(request), output, size, now, now),
+            )
+            expired = self._conn.execute(
+                "DELETE FROM agent_memo WHERE created_at < ?",
+                (self._expired_before(now),),
+            ).rowcount
+            entries, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM agent_memo"
+            ).fetchone()
+            evicted = 0
+            while entries > self.max_entries or total_bytes > self.max_bytes:
+                oldest, oldest_bytes = self._conn.execute(
+                    "SELECT key, bytes FROM agent_memo ORDER BY used_at LIMIT 1"
+                ).fetchone()
+                self._conn.execute("DELETE FROM agent_memo WHERE key = ?", (oldest,))
+                entries -= 1
+                total_bytes -= oldest_bytes
+                evicted += 1
+            self._conn.commit()
+            self.expirations += expired
+            self.evictions += evicted
+
+    def stats(self) -> dict[str, int | float]:
+        """Return the hit/miss counters of this process and the memo's size."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM agent_memo"
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": size,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM agent_memo")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@cache
+def get_agent_memo() -> AgentMemo:
+    """Return the process-wide agent memo, opening it on first use."""
+    return AgentMemo()
+
+
+def memoized_agent_tool(
+    agent: Agent,
+    tool_name: str,
+    tool_description: str,
+    memo: AgentMemo,
+    data_version: Optional[Callable[[], str]] = None,
+) -> FunctionTool:
+    """
+    Turn an agent into a tool, like ``Agent.as_tool``, answering repeats from a memo.
+
+    Args:
+        agent (Agent): The agent run by the tool.
+        tool_name (str): Name of the tool.
+        tool_description (str): Description of the tool given to the model.
+        memo (AgentMemo): Where answers are looked up and stored.
+        data_version (Optional[Callable[[], str]]): Returns the version of
+            the data the agent answers from, the transaction engine's content
+            hash by default.
+
+    Returns:
+        FunctionTool: The tool.
+    """
+    data_version = data_version or (lambda: get_engine().content_hash())
+
+    @function_tool(name_override=tool_name, description_override=tool_description)
+    async def run_agent(context: RunContextWrapper[Any], input: str) -> str:
+        account = context.context
+        account_id = account.account_id if isinstance(account, AccountContext) else None
+        start = time.perf_counter()
+
+        def lookup() -> tuple[str, Optional[str]]:
+            key = memo_key(agent, input, data_version(), account_id)
+            return key, memo.get(key)
+
+        key, cached = await run_blocking(lookup)
+        if cached is not None:
+            get_metrics().record(
+                "stage",
+                (time.perf_counter() - start) * 1000,
+                agent=agent.name,
+                name="memo_hit",
+            )
+            return cached
+
+        result = await Runner.run(starting_agent=agent, input=input, context=account)
+        output = ItemHelpers.text_message_outputs(result.new_items)
+        if output and is_memoizable(result):
+            await run_blocking(memo.put, key, agent.name, input, output)
+        return output
+
+    return run_agent
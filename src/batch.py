@@ -0,0 +1,229 @@
+"""
+Run JSONL query workloads through the agent graph concurrently.
+
+Each input line is a JSON object with a ``query`` and optionally an ``id``,
+a ``conversation_id`` and an ``account_id`` (``DEFAULT_ACCOUNT_ID`` if
+missing) whose transactions the conversation may read. Queries of the same
+conversation run in order on their own session, continuing from the agent
+that answered last (as the interactive loop does); different conversations
+run concurrently, with at most ``--concurrency`` queries in flight. Results
+and per-query timings are written back as JSONL.
+
+    uv run python -m src.batch queries.jsonl results.jsonl --concurrency 8
+    uv run python -m src.batch queries.jsonl results.jsonl --fake-model --fake-latency 0.5
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Optional
+
+from agents import Agent, RunConfig
+from dotenv import load_dotenv
+
+from configs.config import DEFAULT_ACCOUNT_ID, METRICS_ENABLED
+from src.accounts import AccountContext
+from src.agent import (
+    OFFLINE_VECTOR_STORE_ID,
+    agent_execution,
+    build_agent_graph,
+    create_session,
+    get_agent_graph,
+    instrument_graph,
+)
+from src.fake_model import FakeModel, FakeModelProvider
+from src.metrics import get_metrics
+
+
+def read_queries(filepath: Path) -> list[dict[str, Any]]:
+    """Read queries from JSONL, filling in missing ids, conversations and accounts."""
+    queries = []
+    with filepath.open(encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "query" not in record:
+                raise ValueError(f"line {line_number} of {filepath} has no 'query'")
+            record.setdefault("id", str(line_number))
+            record.setdefault("conversation_id", record["id"])
+            record.setdefault("account_id", DEFAULT_ACCOUNT_ID)
+            queries.append(record)
+    return queries
+
+
+async def run_conversation(
+    conversation_id: str,
+    queries: list[dict[str, Any]],
+    starting_agent: Agent,
+    semaphore: asyncio.Semaphore,
+    run_config: Optional[RunConfig],
+    session_db: Optional[Path],
+) -> list[dict[str, Any]]:
+    session_kwargs = {"db_path": session_db} if session_db else {}
+    session = create_session(conversation_id, **session_kwargs)
+    account = AccountContext(int(queries[0]["account_id"]))
+    cur_agent = starting_agent
+    results = []
+    try:
+        for query in queries:
+            queued_at = time.perf_counter()
+            async with semaphore:
+                started_at = time.perf_counter()
+                result = {
+                    "id": query["id"],
+                    "conversation_id": conversation_id,
+                    "query": query["query"],
+                    "queue_ms": round((started_at - queued_at) * 1000, 3),
+                }
+                try:
+                    response = await agent_execution(
+                        cur_agent,
+                        query["query"],
+                        session=session,
+                        run_config=run_config,
+                        context=account,
+                    )
+                    cur_agent = response.last_agent
+                    usage = response.context_wrapper.usage
+                    result.update(
+                        agent=cur_agent.name,
+                        output=str(response.final_output),
+                        model_requests=usage.requests,
+                        input_tokens=usage.input_tokens,
+                        output_tokens=usage.output_tokens,
+                        error=None,
+                    )
+                except Exception as e:
+                    result.update(agent=cur_agent.name, output=None, error=repr(e))
+                result["latency_ms"] = round(
+                    (time.perf_counter() - started_at) * 1000, 3
+                )
+            results.append(result)
+    finally:
+        session.close()
+    return results
+
+
+async def run_batch(
+    queries: list[dict[str, Any]],
+    starting_agent: Agent,
+    concurrency: int = 8,
+    run_config: Optional[RunConfig] = None,
+    session_db: Optional[Path] = None,
+) -> list[dict[str, Any]]:
+    """
+    Run queries through the agent graph with bounded concurrency.
+
+    Args:
+        queries (list[dict]): Queries as read by ``read_queries``.
+        starting_agent (Agent): Agent each conversation starts with.
+        concurrency (int): Maximum number of queries in flight.
+        run_config (Optional[RunConfig]): Run configuration for every query.
+        session_db (Optional[Path]): SQLite file for sessions, in-memory if None.
+
+    Returns:
+        list[dict]: One result per query, in input order, also when ids repeat.
+
+    Raises:
+        ValueError: If a conversation mixes queries of different accounts.
+    """
+    conversations: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    # input positions of each conversation's queries, as ids need not be unique
+    positions: dict[str, list[int]] = defaultdict(list)
+    for position, query in enumerate(queries):
+        conversations[query["conversation_id"]].append(query)
+        positions[query["conversation_id"]].append(position)
+    for conversation_id, items in conversations.items():
+        if len({item["account_id"] for item in items}) > 1:
+            raise ValueError(
+                f"conversation {conversation_id} mixes queries of different accounts"
+            )
+
+    semaphore = asyncio.Semaphore(concurrency)
+    per_conversation = await asyncio.gather(
+        *(
+            run_conversation(
+                conversation_id,
+                items,
+                starting_agent,
+                semaphore,
+                run_config,
+                session_db,
+            )
+            for conversation_id, items in conversations.items()
+        )
+    )
+    ordered: list[dict[str, Any]] = [{} for _ in queries]
+    for conversation_id, results in zip(conversations, per_conversation):
+        for position, result in zip(positions[conversation_id], results):
+            ordered[position] = result
+    return ordered
+
+
+def write_results(results: list[dict[str, Any]], filepath: Path) -> None:
+    with filepath.open("w", encoding="utf-8") as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+
+
+def summarise_results(results: list[dict[str, Any]], wall_s: float) -> dict[str, Any]:
+    latencies = sorted(r["latency_ms"] for r in results) or [0.0]
+    return {
+        "queries": len(results),
+        "errors": sum(r["error"] is not None for r in results),
+        "wall_s": round(wall_s, 3),
+        "queries_per_s": round(len(results) / wall_s, 3) if wall_s else None,
+        "mean_latency_ms": round(statistics.fmean(latencies), 3),
+        "p95_latency_ms": latencies[int(0.95 * (len(latencies) - 1))],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("input", type=Path, help="JSONL file of queries")
+    parser.add_argument("output", type=Path, help="JSONL file to write results to")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--session-db", type=Path, default=None)
+    parser.add_argument(
+        "--fake-model", action="store_true", help="use the local fake model provider"
+    )
+    parser.add_argument(
+        "--fake-latency", type=float, default=0.0, help="seconds per fake model call"
+    )
+    args = parser.parse_args()
+
+    run_config = None
+    if args.fake_model:
+        run_config = RunConfig(tracing_disabled=True)
+        graph = build_agent_graph(
+            OFFLINE_VECTOR_STORE_ID,
+            model_provider=FakeModelProvider(FakeModel(latency=args.fake_latency)),
+        )
+        if METRICS_ENABLED:
+            instrument_graph(graph)
+    else:
+        graph = get_agent_graph()
+
+    queries = read_queries(args.input)
+    start = time.perf_counter()
+    results = await run_batch(
+        queries,
+        graph.triage_agent,
+        concurrency=args.concurrency,
+        run_config=run_config,
+        session_db=args.session_db,
+    )
+    wall_s = time.perf_counter() - start
+    write_results(results, args.output)
+    get_metrics().flush()
+    print(json.dumps(summarise_results(results, wall_s), indent=2))
+
+
+if __name__ == "__main__":
+    _ = load_dotenv(override=True)
+    asyncio.run(main())
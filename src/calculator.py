@@ -0,0 +1,198 @@
+import ast
+import re
+from typing import Callable
+
+import numpy as np
+
+MAX_EXPRESSIONS = 50
+MAX_EXPRESSION_LENGTH = 2000
+MAX_ARRAY_LENGTH = 10_000
+# values shown per array in the formatted results
+MAX_SHOWN_VALUES = 100
+
+Value = np.float64 | np.ndarray
+
+
+class CalculationError(ValueError):
+    """Raised when an expression is invalid or cannot be evaluated."""
+
+
+def _pct_change(old: Value, new: Value) -> Value:
+    return (new - old) / np.abs(old) * 100
+
+
+def _round(value: Value, digits: Value = np.float64(2)) -> Value:
+    return np.round(value, int(digits))
+
+
+FUNCTIONS: dict[str, Callable[..., Value]] = {
+    "abs": np.abs,
+    "count": lambda values: np.float64(np.size(values)),
+    "cumsum": np.cumsum,
+    "diff": np.diff,
+    "exp": np.exp,
+    "log": np.log,
+    "max": np.max,
+    "mean": np.mean,
+    "median": np.median,
+    "min": np.min,
+    "pct_change": _pct_change,
+    "prod": np.prod,
+    "round": _round,
+    "sqrt": np.sqrt,
+    "std": np.std,
+    "sum": np.sum,
+}
+
+BINARY_OPERATORS: dict[type[ast.operator], Callable[[Value, Value], Value]] = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+    ast.Mod: np.mod,
+    ast.Pow: np.power,
+}
+
+UNARY_OPERATORS: dict[type[ast.unaryop], Callable[[Value], Value]] = {
+    ast.UAdd: np.positive,
+    ast.USub: np.negative,
+}
+
+NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _evaluate_node(node: ast.AST, names: dict[str, Value]) -> Value:
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise CalculationError(f"unsupported constant {node.value!r}")
+        return np.float64(node.value)
+    if isinstance(node, ast.Name):
+        if node.id not in names:
+            raise CalculationError(f"unknown name '{node.id}'")
+        return names[node.id]
+    if isinstance(node, (ast.List, ast.Tuple)):
+        if len(node.elts) > MAX_ARRAY_LENGTH:
+            raise CalculationError(f"arrays are limited to {MAX_ARRAY_LENGTH} values")
+        values = [_evaluate_node(element, names) for element in node.elts]
+        if any(np.ndim(value) for value in values):
+            raise CalculationError("array elements must be numbers")
+        return np.array(values, dtype=np.float64)
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        left = _evaluate_node(node.left, names)
+        right = _evaluate_node(node.right, names)
+        try:
+            return BINARY_OPERATORS[type(node.op)](left, right)
+        except ValueError as e:
+            # arrays of different lengths
+            raise CalculationError(str(e)) from e
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        return UNARY_OPERATORS[type(node.op)](_evaluate_node(node.operand, names))
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+            raise CalculationError(
+                f"unknown function, use one of: {', '.join(sorted(FUNCTIONS))}"
+            )
+        if node.keywords:
+            raise CalculationError("keyword arguments are not supported")
+        args = [_evaluate_node(arg, names) for arg in node.args]
+        try:
+            return FUNCTIONS[node.func.id](*args)
+        except (TypeError, ValueError, OverflowError) as e:
+            # wrong number of arguments, empty arrays, infinite digits and the like
+            raise CalculationError(f"{node.func.id}(): {e}") from e
+    if isinstance(node, ast.Subscript):
+        values = _evaluate_node(node.value, names)
+        index = _evaluate_node(node.slice, names)
+        if (
+            np.ndim(values) != 1
+            or np.ndim(index)
+            or not np.isfinite(index)
+            or index != int(index)
+        ):
+            raise CalculationError("only arrays can be indexed, by a whole number")
+        if not -len(values) <= int(index) < len(values):
+            raise CalculationError(f"index {int(index)} is out of range")
+        return values[int(index)]
+    raise CalculationError(f"unsupported syntax '{type(node).__name__}'")
+
+
+def _parse(line: str, position: int) -> tuple[str, ast.expr]:
+    """Split ``name = expression`` (or a bare expression) into name and AST."""
+    if len(line) > MAX_EXPRESSION_LENGTH:
+        raise CalculationError(
+            f"expressions are limited to {MAX_EXPRESSION_LENGTH} characters"
+        )
+    name, expression = f"result_{position}", line
+    target, separator, rest = line.partition("=")
+    if separator and NAME_PATTERN.match(target.strip()) and not rest.startswith("="):
+        name, expression = target.strip(), rest
+    if name in FUNCTIONS:
+        raise CalculationError(f"'{name}' is a function name")
+    try:
+        return name, ast.parse(expression.strip(), mode="eval").body
+    except SyntaxError as e:
+        raise CalculationError(f"invalid syntax in '{line}': {e.msg}") from e
+
+
+def evaluate(expressions: list[str]) -> dict[str, Value]:
+    """
+    Evaluate named arithmetic expressions in order.
+
+    Each expression is ``name = expression`` (or a bare expression, named
+    ``result_<n>``) and may refer to the names defined before it. Numbers and
+    arrays (``[1, 2, 3]``) are supported, with ``+ - * / % **`` applied
+    element-wise, indexing (``values[0]``) and the functions in
+    ``FUNCTIONS``. Expressions are parsed with ``ast`` and only these nodes
+    are evaluated, so no Python code is ever executed.
+
+    Example:
+        >>> results = evaluate(["spend = [120, 80, 100]", "total = sum(spend)"])
+        >>> print(format_results(results))
+        spend = [120, 80, 100]
+        total = 300
+
+    Args:
+        expressions (list[str]): The expressions to evaluate.
+
+    Returns:
+        dict[str, Value]: The value of each named expression, in order.
+
+    Raises:
+        CalculationError: If an expression is invalid, refers to an unknown
+            name, divides by zero or overflows.
+    """
+    if len(expressions) > MAX_EXPRESSIONS:
+        raise CalculationError(f"at most {MAX_EXPRESSIONS} expressions per call")
+    names: dict[str, Value] = {}
+    for position, line in enumerate(expressions, start=1):
+        name, tree = _parse(line, position)
+        try:
+            with np.errstate(all="raise", under="ignore"):
+                value = _evaluate_node(tree, names)
+        except (CalculationError, FloatingPointError) as e:
+            raise CalculationError(f"{name}: {e}") from e
+        if np.size(value) > MAX_ARRAY_LENGTH:
+            raise CalculationError(
+                f"{name}: arrays are limited to {MAX_ARRAY_LENGTH} values"
+            )
+        names[name] = value
+    return names
+
+
+def format_number(value: float) -> str:
+    value = round(float(value), 6)
+    return str(int(value)) if value.is_integer() and abs(value) < 1e15 else str(value)
+
+
+def format_results(results: dict[str, Value]) -> str:
+    """Render evaluated expressions as one ``name = value`` line each."""
+    lines = []
+    for name, value in results.items():
+        if np.ndim(value):
+            shown = ", ".join(format_number(v) for v in value[:MAX_SHOWN_VALUES])
+            more = len(value) - MAX_SHOWN_VALUES
+            suffix = f", ... ({more} more)" if more > 0 else ""
+            lines.append(f"{name} = [{shown}{suffix}]")
+        else:
+            lines.append(f"{name} = {format_number(value)}")
+    return "\n".join(lines)
@@ -0,0 +1,403 @@
+"""
+Record model responses to an on-disk cassette and replay them offline.
+
+``CassetteModelProvider`` wraps the models of the agent graph. In ``"record"``
+mode every request that is not on the cassette yet goes to the live model and
+its response (messages, tool calls and handoffs alike) is appended to the
+cassette, keyed by a hash of the normalised request. In ``"replay"`` mode
+responses only come from the cassette, with the latency measured when they
+were recorded or a fixed one, and a request that was never recorded raises
+``CassetteMissError``. Streamed and non-streamed requests share entries.
+Runs replayed from a cassette make no network calls and take the same path
+through the graph every time, so the local side of a run (tools, sessions,
+routing) can be profiled and compared across commits.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any, Optional
+
+from agents import (
+    FunctionTool,
+    Handoff,
+    Model,
+    ModelProvider,
+    ModelResponse,
+    ModelSettings,
+    ModelTracing,
+    Tool,
+    TResponseInputItem,
+    Usage,
+)
+from agents.agent_output import AgentOutputSchemaBase
+from agents.items import TResponseStreamEvent
+from agents.models.multi_provider import MultiProvider
+from openai.types.responses import ResponseCompletedEvent, ResponseOutputItem
+from pydantic import BaseModel, TypeAdapter
+
+from configs.config import MODEL_CASSETTE_PATH
+from src.fake_model import last_user_message, response_stream
+
+CASSETTE_MODES = ("record", "replay")
+# bump whenever the request normalisation changes, so old recordings miss
+# instead of replaying the wrong response
+KEY_VERSION = 1
+# item ids are minted afresh by every response, so they never make a request
+# different
+VOLATILE_KEYS = frozenset({"id"})
+OUTPUT_ITEM = TypeAdapter(ResponseOutputItem)
+
+
+class CassetteMissError(LookupError):
+    """Raised when a replayed request was never recorded."""
+
+
+def _normalise(value: Any, call_ids: dict[str, str]) -> Any:
+    """Drop item ids and number tool call ids in order of appearance."""
+    if isinstance(value, BaseModel):
+        value = value.model_dump(exclude_none=True)
+    if isinstance(value, dict):
+        return {
+            key: call_ids.setdefault(item, f"call_{len(call_ids)}")
+            if key == "call_id"
+            else _normalise(item, call_ids)
+            for key, item in value.items()
+            if key not in VOLATILE_KEYS
+        }
+    if isinstance(value, (list, tuple)):
+        return [_normalise(item, call_ids) for item in value]
+    return value
+
+
+def _tool_spec(tool: Tool) -> dict[str, Any]:
+    if isinstance(tool, FunctionTool):
+        return {
+            "name": tool.name,
+            "description": tool.description,
+            "parameters": tool.params_json_schema,
+        }
+    # hosted tools run on the model's side; their name is what the model sees
+    return {"name": tool.name}
+
+
+def request_key(
+    model_name: str,
+    system_instructions: Optional[str],
+    input: str | list[TResponseInputItem],
+    model_settings: ModelSettings,
+    tools: list[Tool],
+    output_schema: Optional[AgentOutputSchemaBase],
+    handoffs: list[Handoff],
+) -> str:
+    """
+    Hash everything about a model request that can change its response.
+
+    Item ids and tool call ids differ between otherwise identical runs, so
+    ids are dropped and call ids replaced by their order of appearance before
+    hashing.
+
+    Returns:
+        str: sha256 hex digest of the normalised request.
+    """
+    request = {
+        "version": KEY_VERSION,
+        "model": model_name,
+        "instructions": system_instructions,
+        "input": _normalise(input, {}),
+        "settings": model_settings.to_json_dict(),
+        "tools": [_tool_spec(tool) for tool in tools],
+        "handoffs": [
+            {
+                "name": handoff.tool_name,
+                "description": handoff.tool_description,
+                "parameters": handoff.input_json_schema,
+            }
+            for handoff in handoffs
+        ],
+        "output_schema": output_schema.json_schema() if output_schema else None,
+    }
+    encoded = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class Cassette:
+    """
+    Recorded responses, one JSON line per request, appended as they come in.
+
+    Each line holds the request ``key``, the model and latest user message
+    (for people reading the file), the output items, token usage and the
+    latency of the live call. The first response recorded for a key wins.
+
+    Args:
+        path (Path): The cassette file, created on the first recording.
+    """
+
+    def __init__(self, path: Path = MODEL_CASSETTE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict[str, Any]] = {}
+        if path.exists():
+            with path.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        return self._entries.get(key)
+
+    def put(self, entry: dict[str, Any]) -> None:
+        """Record an entry unless its key is already on the cassette."""
+        with self._lock:
+            if entry["key"] in self._entries:
+                return
+            self._entries[entry["key"]] = entry
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+
+class CassetteModel(Model):
+    """
+    Model recording to and replaying from a ``Cassette``.
+
+    Args:
+        model_name (str): Name the model was requested under, part of the key.
+        cassette (Cassette): Where responses are recorded and replayed from.
+        mode (str): ``"record"`` answers recorded requests from the cassette
+            and records the rest from ``model``; ``"replay"`` only answers
+            from the cassette.
+        model (Optional[Model]): The live model, needed to record.
+        latency (Optional[float]): Seconds each replayed response takes, the
+            latency of the recorded call if None.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        cassette: Cassette,
+        mode: str = "replay",
+        model: Optional[Model] = None,
+        latency: Optional[float] = None,
+    ):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"unknown cassette mode {mode!r}")
+        if mode == "record" and model is None:
+            raise ValueError("recording needs the live model")
+        self.model_name = model_name
+        self.cassette = cassette
+        self.mode = mode
+        self.model = model
+        self.latency = latency
+        self.hits = 0
+        self.misses = 0
+
+    def _key(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchemaBase | None,
+        handoffs: list[Handoff],
+    ) -> str:
+        return request_key(
+            self.model_name,
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+        )
+
+    async def _replay(
+        self, key: str, input: str | list[TResponseInputItem]
+    ) -> Optional[ModelResponse]:
+        """Answer from the cassette after the replay latency, None on a miss."""
+        entry = self.cassette.get(key)
+        if entry is None:
+            self.misses += 1
+            if self.mode == "replay":
+                raise CassetteMissError(
+                    f"no recorded response for request {key[:12]} (latest user "
+                    f"message {last_user_message(input)[:80]!r}) in "
+                    f"{self.cassette.path}"
+                )
+            return None
+        self.hits += 1
+        latency = self.latency
+        if latency is None:
+            latency = entry["latency_ms"] / 1000
+        await asyncio.sleep(latency)
+        return ModelResponse(
+            output=[OUTPUT_ITEM.validate_python(item) for item in entry["output"]],
+            usage=Usage(**entry["usage"]),
+            response_id=None,
+        )
+
+    def _record(
+        self,
+        key: str,
+        input: str | list[TResponseInputItem],
+        output: list[ResponseOutputItem],
+        usage: Usage,
+        start: float,
+    ) -> None:
+        self.cassette.put(
+            {
+                "key": key,
+                "model": self.model_name,
+                "query": last_user_message(input),
+                "output": [item.model_dump(exclude_none=True) for item in output],
+                "usage": {
+                    "requests": usage.requests,
+                    "input_tokens": usage.input_tokens,
+                    "output_tokens": usage.output_tokens,
+                    "total_tokens": usage.total_tokens,
+                },
+                "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+            }
+        )
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchemaBase | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        **kwargs: Any,
+    ) -> ModelResponse:
+        key = self._key(
+            system_instructions, input, model_settings, tools, output_schema, handoffs
+        )
+        response = await self._replay(key, input)
+        if response is not None:
+            return response
+
+        start = time.perf_counter()
+        response = await self.model.get_response(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            tracing,
+            **kwargs,
+        )
+        self._record(key, input, response.output, response.usage, start)
+        return response
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchemaBase | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        **kwargs: Any,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        """
+        Stream a response, recording it once the live stream completes.
+
+        Streamed and non-streamed requests share cassette entries. Only the
+        whole response is recorded, so a replayed stream arrives at once
+        after the replay latency.
+        """
+        key = self._key(
+            system_instructions, input, model_settings, tools, output_schema, handoffs
+        )
+        response = await self._replay(key, input)
+        if response is not None:
+            async for event in response_stream(response.output, response.usage):
+                yield event
+            return
+
+        start = time.perf_counter()
+        async for event in self.model.stream_response(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            tracing,
+            **kwargs,
+        ):
+            if isinstance(event, ResponseCompletedEvent):
+                usage = event.response.usage
+                self._record(
+                    key,
+                    input,
+                    event.response.output,
+                    Usage(
+                        requests=1,
+                        input_tokens=usage.input_tokens if usage else 0,
+                        output_tokens=usage.output_tokens if usage else 0,
+                        total_tokens=usage.total_tokens if usage else 0,
+                    ),
+                    start,
+                )
+            yield event
+
+
+class CassetteModelProvider(ModelProvider):
+    """
+    Provider wrapping every model in a ``CassetteModel`` on one cassette.
+
+    Args:
+        mode (str): ``"record"`` or ``"replay"``, see ``CassetteModel``.
+        path (Path): The cassette file.
+        provider (Optional[ModelProvider]): Where live models come from when
+            recording, the SDK's default provider if None. Not used to replay,
+            so replaying needs no API key.
+        latency (Optional[float]): Seconds per replayed response, the
+            recorded latency if None.
+    """
+
+    def __init__(
+        self,
+        mode: str = "replay",
+        path: Path = MODEL_CASSETTE_PATH,
+        provider: Optional[ModelProvider] = None,
+        latency: Optional[float] = None,
+    ):
+        self.mode = mode
+        self.cassette = Cassette(path)
+        self.provider = provider
+        self.latency = latency
+        self.models: dict[str, CassetteModel] = {}
+
+    def get_model(self, model_name: str | None) -> Model:
+        name = model_name or ""
+        if name not in self.models:
+            live = None
+            if self.mode == "record":
+                self.provider = self.provider or MultiProvider()
+                live = self.provider.get_model(model_name)
+            self.models[name] = CassetteModel(
+                name, self.cassette, self.mode, live, self.latency
+            )
+        return self.models[name]
+
+    def stats(self) -> dict[str, int]:
+        """Requests answered from the cassette, and those that were not."""
+        return {
+            "recorded": len(self.cassette),
+            "hits": sum(model.hits for model in self.models.values()),
+            "misses": sum(model.misses for model in self.models.values()),
+        }
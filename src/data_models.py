@@ -1,10 +1,13 @@
 from datetime import date as dt
+from typing import Optional
 
 import pandera.pandas as pa
 from pandera.typing.pandas import Series
 
 
 class InputTransactions(pa.DataFrameModel):
+    # optional so single-account files load, ingestion fills in the default
+    account_id: Optional[Series[int]] = pa.Field(nullable=False, ge=1)
     date: Series[dt] = pa.Field(nullable=False)
     year: Series[int] = pa.Field(nullable=False, ge=1900, le=2026)
     month: Series[int] = pa.Field(nullable=False, ge=1, le=12)
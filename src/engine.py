@@ -0,0 +1,562 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import cache
+from pathlib import Path
+from typing import Any, Optional
+
+import duckdb
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+
+from configs.config import (
+    ACCOUNT_METADATA_MAX_ENTRIES,
+    DEFAULT_ACCOUNT_ID,
+    MAX_OPEN_CURSORS,
+    QUERY_MEMORY_LIMIT,
+    QUERY_TIMEOUT_S,
+    RESULT_BATCH_ROWS,
+    REWRITE_TO_ROLLUPS,
+    TRANSACTIONS_BACKEND,
+    TRANSACTIONS_PATH,
+    TRANSACTIONS_STORAGE,
+    TRANSACTIONS_TABLE,
+)
+from src.accounts import scope_to_account
+from src.metadata import build_metadata_index, load_or_build_index, schema_summary
+from src.metrics import get_metrics
+from src.polars_backend import PolarsBackend, PolarsTimeoutError
+from src.render import ResultBudget, render_result
+from src.rollups import ROLLUPS, create_rollups, rewrite_for_rollups
+from src.sql_cache import SQLResultCache, normalize_sql
+from src.sql_guard import QueryRejectedError, SQLGuard
+from src.storage import PartitionedStore, source_signature
+from utils.cache import ColumnarCache
+from utils.utils import load_table
+
+
+class QueryTimeoutError(TimeoutError):
+    """Raised when a query is cancelled for running past the engine's timeout."""
+
+
+class TransactionEngine:
+    """
+    Long-lived owner of the DuckDB database that serves the transaction tools.
+
+    With ``"parquet"`` storage the transactions file is converted once, and
+    validated, into a year/month partitioned Parquet store that the table is
+    a view over, so queries only read the partitions and columns they need.
+    With ``"memory"`` storage the file is loaded, through the columnar cache,
+    into a table of a dedicated DuckDB connection. Every call checks the
+    file's size and modification time and reloads only when the file has
+    changed on disk, so tool calls never pay for parsing and validation and
+    never read a stale table. A metadata index (schema, distinct values, date
+    range, row counts) is built alongside each load, persisted next to the
+    cached data, and used to answer the schema discovery tools without
+    touching the table. Monthly and yearly rollups of the table are rebuilt
+    with it, and aggregate queries that only touch rollup dimensions are
+    rewritten to read from them. Rendered query results are kept in a result
+    cache keyed on the canonical SQL and tied to the data version, which is
+    bumped on every reload.
+
+    Rows carry an ``account_id``, and both storages keep them clustered by
+    account. Queries given an ``account_id`` are rewritten so the
+    transactions table and its rollups only show that account's rows (see
+    ``src.accounts.scope_to_account``); the filter is pushed down to the
+    scan, which skips every other account's row groups, so a scoped query
+    costs about the same however many accounts the table holds.
+
+    Queries are safe to run from many threads at once: each thread gets its
+    own DuckDB cursor on the shared database, so queries run in parallel
+    instead of queueing on one connection, and a query still running after
+    ``timeout`` seconds is cancelled with DuckDB's interrupt. The database
+    may use up to ``memory_limit``; a query that needs more than it can spill
+    to disk is stopped with a ``QueryRejectedError``.
+
+    Before a query given to ``execute`` runs, and only when it is not served
+    from the result cache, the engine's ``SQLGuard`` checks it (see
+    ``src.sql_guard``): anything but a single SELECT is refused, plans that
+    DuckDB estimates would blow up (joins without a condition, runaway
+    joins, huge scans) are rejected with an error saying how to fix them,
+    and large results without a LIMIT are limited.
+
+    With the ``"polars"`` backend, plain queries run on a Polars LazyFrame
+    scanning the Parquet store instead (see ``src.polars_backend``), with the
+    account filter applied to the scan and the result columns named and
+    typed as DuckDB would return them; DDL, writes, rollup tables, SQL that
+    Polars cannot plan and queries whose columns Polars computes as another
+    type still run on DuckDB, counted in ``polars_fallbacks``. The store,
+    metadata index and rollups are built, and queries are checked by the
+    guard, with DuckDB either way.
+
+    Args:
+        filepath (Path): Path to the transactions JSON file, or, with
+            ``"parquet"`` storage, to a directory of Parquet files such as
+            the output of ``utils/generate_data.py --format parquet``.
+        table_name (str): Name of the table the data is exposed as.
+        database (str): DuckDB database to open, in-memory by default.
+        cache (Optional[ColumnarCache]): Columnar cache the file is loaded
+            through, also holding the metadata index.
+        storage (str): ``"parquet"`` or ``"memory"``, see above.
+        store (Optional[PartitionedStore]): Parquet store used by ``"parquet"``
+            storage, kept next to the cached data by default.
+        use_rollups (bool): Build the rollup tables and rewrite qualifying
+            queries onto them.
+        timeout (Optional[float]): Seconds a query may run, None for no limit.
+        backend (str): ``"duckdb"`` or ``"polars"``, which needs ``"parquet"``
+            storage; see above.
+        guard (Optional[SQLGuard]): Checks queries before ``execute`` runs
+            them, with the configured limits by default.
+        memory_limit (Optional[str]): DuckDB memory limit, e.g. ``"2GB"``,
+            None for DuckDB's default.
+    """
+
+    def __init__(
+        self,
+        filepath: Path = TRANSACTIONS_PATH,
+        table_name: str = TRANSACTIONS_TABLE,
+        database: str = ":memory:",
+        cache: Optional[ColumnarCache] = None,
+        storage: str = TRANSACTIONS_STORAGE,
+        store: Optional[PartitionedStore] = None,
+        use_rollups: bool = REWRITE_TO_ROLLUPS,
+        timeout: Optional[float] = QUERY_TIMEOUT_S,
+        backend: str = TRANSACTIONS_BACKEND,
+        guard: Optional[SQLGuard] = None,
+        memory_limit: Optional[str] = QUERY_MEMORY_LIMIT,
+    ):
+        self.filepath = filepath
+        self.cache = cache or ColumnarCache()
+        if storage not in ("parquet", "memory"):
+            raise ValueError(f"unknown storage {storage!r}, use 'parquet' or 'memory'")
+        if storage == "memory" and filepath.is_dir():
+            raise ValueError("'memory' storage reads a JSON file, not a directory")
+        if backend not in ("duckdb", "polars"):
+            raise ValueError(f"unknown backend {backend!r}, use 'duckdb' or 'polars'")
+        if backend == "polars" and storage != "parquet":
+            raise ValueError("the 'polars' backend scans the 'parquet' storage")
+        self.storage = storage
+        self.store = store or PartitionedStore(self.cache.sidecar(filepath, "parquet"))
+        self.polars = (
+            PolarsBackend(self.store.root, table_name) if backend == "polars" else None
+        )
+        self.polars_fallbacks = 0
+        self.use_rollups = use_rollups
+        self.rollup_rewrites = 0
+        self.timeout = timeout
+        self.guard = guard or SQLGuard()
+        self.memory_limit = memory_limit
+        self.table_name = table_name
+        self.version = 0
+        self._conn = duckdb.connect(database)
+        if memory_limit is not None:
+            self._conn.execute(f"SET memory_limit = '{memory_limit}'")
+        # queries may only read the engine's own tables and parquet store, so
+        # no SQL can reach other files; this cannot be undone on the database
+        self._conn.execute(f"SET allowed_directories = ['{self.store.root}/']")
+        self._conn.execute("SET enable_external_access = false")
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._thread_cursors: list[duckdb.DuckDBPyConnection] = []
+        self._signature: Optional[tuple[int, int]] = None
+        self.index: dict[str, Any] = {}
+        # (data version, account) -> metadata index of the account's rows
+        self._account_indexes: OrderedDict[tuple[int, int], dict[str, Any]] = (
+            OrderedDict()
+        )
+        self.result_cache = SQLResultCache()
+        self.budget = ResultBudget()
+        # cursor id -> (data version, account, sql, total rows, backend) of
+        # truncated results
+        self._cursors: OrderedDict[
+            str, tuple[int, Optional[int], str, int, Optional[str]]
+        ] = OrderedDict()
+        self.refresh()
+
+    def _cursor(self) -> duckdb.DuckDBPyConnection:
+        """Return the calling thread's cursor on the shared database."""
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            with self._lock:
+                cursor = self._local.cursor = self._conn.cursor()
+                self._thread_cursors.append(cursor)
+        return cursor
+
+    @contextmanager
+    def _deadline(self, cursor: duckdb.DuckDBPyConnection) -> Iterator[None]:
+        """
+        Interrupt ``cursor`` if the enclosed query outlives the timeout.
+
+        Raises:
+            QueryTimeoutError: If the query was interrupted.
+            QueryRejectedError: If the query ran out of memory.
+        """
+        timer = None
+        if self.timeout:
+            timer = threading.Timer(self.timeout, cursor.interrupt)
+            timer.daemon = True
+            timer.start()
+        try:
+            yield
+        except (duckdb.Error, OSError) as e:
+            # errors raised while a result streams come through pyarrow as
+            # OSError, carrying DuckDB's message
+            message = str(e)
+            if isinstance(e, duckdb.InterruptException) or message.startswith(
+                "INTERRUPT"
+            ):
+                raise QueryTimeoutError(
+                    f"query cancelled after {self.timeout:g}s, narrow it down with "
+                    "filters, aggregation or LIMIT"
+                ) from e
+            if isinstance(e, duckdb.OutOfMemoryException) or message.startswith(
+                "Out of Memory"
+            ):
+                raise QueryRejectedError(
+                    "memory_limit",
+                    f"the query needed more than the {self.memory_limit} memory limit",
+                    "aggregate before joining or sorting, or select fewer columns",
+                ) from e
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+    def _file_signature(self) -> tuple[int, int]:
+        return source_signature(self.filepath)
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Reload the transactions table if the source file changed.
+
+        Args:
+            force (bool): Reload even if the file looks unchanged.
+
+        Returns:
+            bool: True if the table was (re)loaded, False otherwise.
+        """
+        signature = self._file_signature()
+        if not force and signature == self._signature:
+            return False
+
+        with self._lock:
+            if not force and signature == self._signature:
+                return False
+
+            metrics = get_metrics()
+            with metrics.timer("stage", name="load_data"):
+                if self.storage == "parquet":
+                    sha256 = self.store.sync(self.filepath)["sha256"]
+                    self._conn.execute(
+                        f"CREATE OR REPLACE VIEW {self.table_name} AS "
+                        f"{self.store.scan_sql()}"
+                    )
+                    if self.polars is not None:
+                        self.polars.refresh()
+                else:
+                    data = load_table(self.filepath, cache=self.cache)
+                    account = ""
+                    if "account_id" not in data.column_names:
+                        account = f"{DEFAULT_ACCOUNT_ID}::BIGINT AS account_id, "
+                    self._conn.register("incoming_transactions", data)
+                    # clustered by account so zonemaps skip other accounts
+                    self._conn.execute(
+                        f"CREATE OR REPLACE TABLE {self.table_name} AS "
+                        f"SELECT {account}* FROM incoming_transactions "
+                        "ORDER BY account_id, date"
+                    )
+                    self._conn.unregister("incoming_transactions")
+                    sha256 = self.cache.read_manifest(self.filepath)["sha256"]
+            if self.use_rollups:
+                with metrics.timer("stage", name="create_rollups"):
+                    create_rollups(self._conn, self.table_name)
+
+            self.index = load_or_build_index(
+                self._conn,
+                self.table_name,
+                self.cache.sidecar(self.filepath, f"{self.storage}-metadata.json"),
+                sha256,
+            )
+            self._signature = signature
+            self.version += 1
+            self._account_indexes.clear()
+        return True
+
+    def _scope(self, sql_query: str, account_id: Optional[int]) -> str:
+        """Confine ``sql_query`` to one account's rows, if an account is given."""
+        if account_id is None:
+            return sql_query
+        tables = [self.table_name]
+        tables += [rollup.table_name(self.table_name) for rollup in ROLLUPS]
+        return scope_to_account(sql_query, account_id, tables)
+
+    def query(self, sql_query: str, account_id: Optional[int] = None) -> pd.DataFrame:
+        """
+        Run a SQL query against the loaded table and return a DataFrame.
+
+        Raises:
+            AccountScopeError: If ``account_id`` is given and the SQL cannot be
+                scoped to it.
+        """
+        self.refresh()
+        scoped_sql = self._scope(sql_query, account_id)
+        table = self._run_polars(sql_query, account_id)
+        if table is not None:
+            return table.to_pandas()
+        cursor = self._cursor()
+        with self._deadline(cursor):
+            return cursor.execute(scoped_sql).df()
+
+    def _run_polars(
+        self, sql_query: str, account_id: Optional[int], offset: int = 0
+    ) -> Optional[pa.Table]:
+        """
+        Run a plain query on the Polars backend.
+
+        Returns:
+            Optional[pa.Table]: The result, or None if there is no Polars
+                backend or the query has to run on DuckDB instead.
+
+        Raises:
+            QueryTimeoutError: If the query runs past the engine's timeout.
+        """
+        if self.polars is None or normalize_sql(sql_query) is None:
+            return None
+        try:
+            # DuckDB's column names and types; with LIMIT 0 no data is read
+            schema = self._cursor().sql(sql_query).limit(0).arrow().schema
+        except duckdb.Error:
+            return None
+        try:
+            return self.polars.collect(
+                sql_query, account_id, offset, self.timeout, schema
+            )
+        except PolarsTimeoutError as e:
+            raise QueryTimeoutError(
+                f"query cancelled after {self.timeout:g}s, narrow it down with "
+                "filters, aggregation or LIMIT"
+            ) from e
+        except pl.exceptions.PolarsError:
+            self.polars_fallbacks += 1
+            return None
+
+    def execute(self, sql_query: str, account_id: Optional[int] = None) -> str:
+        """
+        Run a SQL query and return the result rendered as a bounded markdown table.
+
+        The result is streamed in Arrow record batches and rendered only up to
+        the engine's row/byte/token budget; truncated results end with a
+        summary and a cursor id for ``fetch_more``. Aggregations the rollup
+        tables can answer are rewritten to read from them. Repeats of a query, up to
+        formatting and identifier casing, are served from the result cache
+        until the underlying data changes.
+
+        Args:
+            sql_query (str): The SQL to run.
+            account_id (Optional[int]): Only let the query see this account's
+                rows; only single SELECT queries are accepted then. None runs
+                the SQL over every account.
+
+        Raises:
+            AccountScopeError: If ``account_id`` is given and the SQL cannot be
+                scoped to it.
+            QueryRejectedError: If the guard rejects the query, or it runs out
+                of memory.
+            QueryTimeoutError: If the query runs past the engine's timeout.
+        """
+        self.refresh()
+        version = self.version
+        # the scoped SQL names the account, so accounts never share entries
+        cache_key = self._scope(sql_query, account_id)
+        cached = self.result_cache.get(cache_key, version)
+        if cached is not None:
+            return cached
+        guarded = self.guard.check(
+            self._cursor(), sql_query, cache_key, self.index.get("distinct_counts")
+        )
+        sql_query = guarded.sql
+        scoped_sql = cache_key
+        if guarded.limit is not None:
+            scoped_sql = self._scope(sql_query, account_id)
+        table = self._run_polars(sql_query, account_id)
+        if table is not None:
+            rendered = render_result(table.to_reader(RESULT_BATCH_ROWS), self.budget)
+            executed_sql, backend = sql_query, "polars"
+        else:
+            cursor = self._cursor()
+            executed_sql, backend = scoped_sql, None
+            if self.use_rollups and normalize_sql(sql_query) is not None:
+                # binds the query without running it
+                output_names = cursor.sql(sql_query).columns
+                rewritten = rewrite_for_rollups(
+                    sql_query, self.table_name, output_names, self.columns()
+                )
+                if rewritten is not None:
+                    executed_sql = self._scope(rewritten, account_id)
+                    self.rollup_rewrites += 1
+            with self._deadline(cursor):
+                reader = cursor.execute(executed_sql).fetch_record_batch(
+                    RESULT_BATCH_ROWS
+                )
+                rendered = render_result(reader, self.budget)
+        cursor_id = None
+        if rendered.truncated:
+            cursor_id = self._open_cursor(
+                version, account_id, executed_sql, rendered.total_rows, backend
+            )
+        result = rendered.to_text(cursor_id) + guarded.note()
+        if normalize_sql(sql_query) is None:
+            # not a plain query, it may have modified the tables behind the
+            # cache and the rollups
+            self.result_cache.clear()
+            if self.use_rollups:
+                with self._lock:
+                    create_rollups(self._conn, self.table_name)
+        else:
+            self.result_cache.put(cache_key, version, result)
+        return result
+
+    def _open_cursor(
+        self,
+        version: int,
+        account_id: Optional[int],
+        sql_query: str,
+        total_rows: int,
+        backend: Optional[str] = None,
+    ) -> str:
+        """Remember a truncated result; ``backend`` is "polars" if it ran there."""
+        key = f"{version}:{account_id}:{normalize_sql(sql_query) or sql_query}"
+        cursor_id = hashlib.sha1(key.encode()).hexdigest()[:12]
+        with self._lock:
+            self._cursors[cursor_id] = (
+                version,
+                account_id,
+                sql_query,
+                total_rows,
+                backend,
+            )
+            self._cursors.move_to_end(cursor_id)
+            while len(self._cursors) > MAX_OPEN_CURSORS:
+                self._cursors.popitem(last=False)
+        return cursor_id
+
+    def fetch_more(
+        self, cursor_id: str, offset: int, account_id: Optional[int] = None
+    ) -> str:
+        """
+        Render the next page of a truncated result, starting at row ``offset``.
+
+        Raises:
+            ValueError: If the cursor is unknown, evicted, was opened for
+                another account, or the data has changed since the result was
+                produced.
+            QueryTimeoutError: If the page query runs past the timeout.
+        """
+        self.refresh()
+        with self._lock:
+            version, owner, sql_query, total_rows, backend = self._cursors.get(
+                cursor_id, (None, None, "", 0, None)
+            )
+        if version != self.version or owner != account_id:
+            raise ValueError(
+                f"cursor {cursor_id} has expired, re-run the query instead"
+            )
+        if backend == "polars":
+            # the stored SQL is unscoped, the scan applies the account filter
+            table = self._run_polars(sql_query, account_id, int(offset))
+            if table is not None:
+                rendered = render_result(
+                    table.to_reader(RESULT_BATCH_ROWS),
+                    self.budget,
+                    first_row=int(offset),
+                    total_rows=total_rows,
+                )
+                return rendered.to_text(cursor_id)
+            sql_query = self._scope(sql_query, account_id)
+        page_sql = (
+            f"SELECT * FROM ({sql_query.rstrip().rstrip(';')}) OFFSET {int(offset)}"
+        )
+        cursor = self._cursor()
+        with self._deadline(cursor):
+            reader = cursor.execute(page_sql).fetch_record_batch(RESULT_BATCH_ROWS)
+            rendered = render_result(
+                reader, self.budget, first_row=int(offset), total_rows=total_rows
+            )
+        return rendered.to_text(cursor_id)
+
+    def columns(self) -> list[str]:
+        """Return the column names of the transactions table."""
+        self.refresh()
+        return [column["name"] for column in self.index["columns"]]
+
+    def account_index(self, account_id: Optional[int] = None) -> dict[str, Any]:
+        """
+        Return the metadata index of one account's rows.
+
+        The persisted index covers every account, so a conversation bound to
+        an account is given one built over its own rows instead, which
+        neither shows other accounts' counts and values nor misleads the
+        agent about how many rows it can see. Account indexes are built on
+        first use and kept for the ``ACCOUNT_METADATA_MAX_ENTRIES`` most
+        recent accounts until the data changes.
+
+        Args:
+            account_id (Optional[int]): The account, None for the index of
+                every account.
+        """
+        self.refresh()
+        if account_id is None:
+            return self.index
+        key = (self.version, int(account_id))
+        with self._lock:
+            index = self._account_indexes.get(key)
+            if index is not None:
+                self._account_indexes.move_to_end(key)
+                return index
+        cursor = self._cursor()
+        with self._deadline(cursor):
+            index = build_metadata_index(cursor, self.table_name, account_id)
+        with self._lock:
+            if key[0] == self.version:
+                self._account_indexes[key] = index
+                while len(self._account_indexes) > ACCOUNT_METADATA_MAX_ENTRIES:
+                    self._account_indexes.popitem(last=False)
+        return index
+
+    def metadata(self, account_id: Optional[int] = None) -> tuple[list[str], list[str]]:
+        """Return the distinct transaction types and categories of an account."""
+        distinct_values = self.account_index(account_id)["distinct_values"]
+        return (
+            list(distinct_values.get("type", {})),
+            list(distinct_values.get("category", {})),
+        )
+
+    def schema_summary(self, account_id: Optional[int] = None) -> str:
+        """Describe the table, or one account's rows, for the SQL agent prompt."""
+        return schema_summary(self.account_index(account_id))
+
+    def content_hash(self) -> str:
+        """
+        Return the content hash of the loaded data.
+
+        Unlike ``version``, which counts reloads of this engine, the hash is
+        the same in every process serving the same data.
+        """
+        self.refresh()
+        return self.index["source_sha256"]
+
+    def close(self) -> None:
+        with self._lock:
+            for cursor in self._thread_cursors:
+                cursor.close()
+            self._thread_cursors.clear()
+            self._conn.close()
+
+
+@cache
+def get_engine() -> TransactionEngine:
+    """Return the process-wide transaction engine, creating it on first use."""
+    return TransactionEngine()
@@ -0,0 +1,359 @@
+import asyncio
+import itertools
+import json
+import re
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+from agents import (
+    Handoff,
+    Model,
+    ModelProvider,
+    ModelResponse,
+    ModelSettings,
+    ModelTracing,
+    Tool,
+    TResponseInputItem,
+    Usage,
+)
+from agents.agent_output import AgentOutputSchemaBase
+from agents.items import TResponseStreamEvent
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseCreatedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputItem,
+    ResponseOutputItemAddedEvent,
+    ResponseOutputItemDoneEvent,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+    ResponseUsage,
+)
+from openai.types.responses.response_usage import (
+    InputTokensDetails,
+    OutputTokensDetails,
+)
+
+_ids = itertools.count(1)
+# a streamed chunk of text: one word with the whitespace before it
+WORD_BOUNDARY = re.compile(r"(?<=\s)(?=\S)")
+
+
+def approx_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) used for fake usage numbers."""
+    return max(1, len(text) // 4)
+
+
+def input_text(input: str | list[TResponseInputItem]) -> str:
+    """Flatten model input items into plain text."""
+    if isinstance(input, str):
+        return input
+    parts = []
+    for item in input:
+        content = item.get("content") if isinstance(item, dict) else None
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(part.get("text", "") for part in content)
+        elif isinstance(item, dict) and "output" in item:
+            parts.append(str(item["output"]))
+    return "\n".join(parts)
+
+
+def last_user_message(input: str | list[TResponseInputItem]) -> str:
+    """Return the text of the most recent user message in the model input."""
+    if isinstance(input, str):
+        return input
+    for item in reversed(input):
+        if isinstance(item, dict) and item.get("role") == "user":
+            return input_text([item])
+    return ""
+
+
+def message_output(text: str) -> ResponseOutputMessage:
+    return ResponseOutputMessage(
+        id=f"msg_fake_{next(_ids)}",
+        content=[ResponseOutputText(text=text, type="output_text", annotations=[])],
+        role="assistant",
+        status="completed",
+        type="message",
+    )
+
+
+def tool_call(name: str, arguments: dict[str, Any]) -> ResponseFunctionToolCall:
+    call_id = f"call_fake_{next(_ids)}"
+    return ResponseFunctionToolCall(
+        id=f"fc_{call_id}",
+        call_id=call_id,
+        name=name,
+        arguments=json.dumps(arguments),
+        type="function_call",
+        status="completed",
+    )
+
+
+def message_words(item: ResponseOutputItem) -> list[str]:
+    """Split the text of a message into the chunks it is streamed in."""
+    if not isinstance(item, ResponseOutputMessage):
+        return []
+    text = "".join(part.text for part in item.content if hasattr(part, "text"))
+    return WORD_BOUNDARY.split(text) if text else []
+
+
+def _response(output: list[ResponseOutputItem], usage: Usage) -> Response:
+    return Response(
+        id=f"resp_fake_{next(_ids)}",
+        created_at=time.time(),
+        model="fake",
+        object="response",
+        output=output,
+        parallel_tool_calls=True,
+        tool_choice="auto",
+        tools=[],
+        usage=ResponseUsage(
+            input_tokens=usage.input_tokens,
+            input_tokens_details=InputTokensDetails(cached_tokens=0),
+            output_tokens=usage.output_tokens,
+            output_tokens_details=OutputTokensDetails(reasoning_tokens=0),
+            total_tokens=usage.total_tokens,
+        ),
+    )
+
+
+async def response_stream(
+    output: list[ResponseOutputItem], usage: Usage, token_latency: float = 0.0
+) -> AsyncIterator[TResponseStreamEvent]:
+    """
+    Stream finished output items the way the Responses API streams them.
+
+    Message text arrives a word at a time as ``response.output_text.delta``
+    events, ``token_latency`` seconds apart, and the stream ends with
+    ``response.completed`` carrying the whole response, which is what the
+    runner reads the turn from.
+    """
+    sequence = itertools.count()
+    yield ResponseCreatedEvent(
+        response=_response([], usage),
+        sequence_number=next(sequence),
+        type="response.created",
+    )
+    for index, item in enumerate(output):
+        yield ResponseOutputItemAddedEvent(
+            item=item,
+            output_index=index,
+            sequence_number=next(sequence),
+            type="response.output_item.added",
+        )
+        for word in message_words(item):
+            await asyncio.sleep(token_latency)
+            yield ResponseTextDeltaEvent(
+                content_index=0,
+                delta=word,
+                item_id=item.id,
+                output_index=index,
+                sequence_number=next(sequence),
+                type="response.output_text.delta",
+            )
+        yield ResponseOutputItemDoneEvent(
+            item=item,
+            output_index=index,
+            sequence_number=next(sequence),
+            type="response.output_item.done",
+        )
+    yield ResponseCompletedEvent(
+        response=_response(output, usage),
+        sequence_number=next(sequence),
+        type="response.completed",
+    )
+
+
+def calls_since_last_user_message(
+    input: str | list[TResponseInputItem],
+) -> list[tuple[str, str]]:
+    """Return (tool name, output) of the function calls after the last user message."""
+    if isinstance(input, str):
+        return []
+    names: dict[str, str] = {}
+    calls: list[tuple[str, str]] = []
+    for item in input:
+        if not isinstance(item, dict):
+            continue
+        if item.get("role") == "user":
+            names.clear()
+            calls.clear()
+        elif item.get("type") == "function_call":
+            names[item["call_id"]] = item["name"]
+        elif item.get("type") == "function_call_output":
+            calls.append((names.get(item["call_id"], ""), str(item["output"])))
+    return calls
+
+
+class FakeModel(Model):
+    """
+    Local stand-in for an LLM that answers every request with a canned message.
+
+    No network calls are made. Each request sleeps for ``latency`` seconds to
+    simulate model time, plus ``token_latency`` seconds per word of a message
+    it answers with, and reports approximate token usage, so agent runs can
+    be timed offline. Streamed responses deliver the words of a message as
+    they are "generated", so the first token arrives after ``latency``.
+
+    Args:
+        latency (float): Seconds to wait before answering each request.
+        token_latency (float): Seconds per word of a message.
+    """
+
+    def __init__(self, latency: float = 0.0, token_latency: float = 0.0):
+        self.latency = latency
+        self.token_latency = token_latency
+
+    def respond(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        tools: list[Tool],
+        handoffs: list[Handoff],
+    ) -> ResponseOutputMessage | ResponseFunctionToolCall:
+        """Decide the single output item of a request; overridden by subclasses."""
+        return message_output(f"[fake response] {last_user_message(input)}")
+
+    def usage(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        output: ResponseOutputItem,
+    ) -> Usage:
+        input_tokens = approx_tokens((system_instructions or "") + input_text(input))
+        output_tokens = approx_tokens(output.model_dump_json())
+        return Usage(
+            requests=1,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+        )
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchemaBase | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        **kwargs: Any,
+    ) -> ModelResponse:
+        output = self.respond(system_instructions, input, tools, handoffs)
+        await asyncio.sleep(
+            self.latency + self.token_latency * len(message_words(output))
+        )
+        return ModelResponse(
+            output=[output],
+            usage=self.usage(system_instructions, input, output),
+            response_id=None,
+        )
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchemaBase | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        **kwargs: Any,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        output = self.respond(system_instructions, input, tools, handoffs)
+        await asyncio.sleep(self.latency)
+        usage = self.usage(system_instructions, input, output)
+        async for event in response_stream([output], usage, self.token_latency):
+            yield event
+
+
+class ScriptedModel(FakeModel):
+    """
+    Fake model that walks the agent graph according to a per-query script.
+
+    Scripts are looked up by the text of the latest user message, which is also
+    the input of nested agent-as-tool runs. A script is a dict with:
+
+    - ``route``: agent the triage agent hands off to,
+    - ``sql``: queries the SQL agent runs through ``execute_sql``, one per turn,
+    - ``calculations``: ``{"tool": name, "arguments": {...}}`` calls made by
+      the answering agent, one per turn,
+    - ``answer``: final text of the answering agent.
+
+    The model infers which agent it is serving from the tools and handoffs it
+    is offered, and which step comes next from the tool outputs already in the
+    input, so it is stateless and safe to share between concurrent runs.
+    Queries without a script get a canned answer.
+
+    Args:
+        scripts (dict[str, dict]): Scripts keyed by query text.
+        latency (float): Seconds to wait before answering each request.
+        token_latency (float): Seconds per word of a message.
+    """
+
+    def __init__(
+        self,
+        scripts: dict[str, dict[str, Any]],
+        latency: float = 0.0,
+        token_latency: float = 0.0,
+    ):
+        super().__init__(latency=latency, token_latency=token_latency)
+        self.scripts = scripts
+
+    def respond(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        tools: list[Tool],
+        handoffs: list[Handoff],
+    ) -> ResponseOutputMessage | ResponseFunctionToolCall:
+        query = last_user_message(input)
+        script = self.scripts.get(query)
+        if script is None:
+            return super().respond(system_instructions, input, tools, handoffs)
+
+        tool_names = {tool.name for tool in tools}
+        calls = calls_since_last_user_message(input)
+        called = [name for name, _ in calls]
+
+        # triage: hand off to the scripted specialist
+        if not tool_names:
+            for handoff in handoffs:
+                if handoff.agent_name == script["route"]:
+                    return tool_call(handoff.tool_name, {})
+
+        # SQL agent: run each query, then report the results
+        if "execute_sql" in tool_names:
+            for sql in script.get("sql", [])[called.count("execute_sql") :]:
+                return tool_call("execute_sql", {"sql_query": sql})
+            outputs = [output for name, output in calls if name == "execute_sql"]
+            return message_output("\n\n".join(outputs))
+
+        # answering agent: pull data through the SQL sub-agent, then calculate
+        if script.get("sql") and "sql_query_agent_tool" in tool_names:
+            if "sql_query_agent_tool" not in called:
+                return tool_call("sql_query_agent_tool", {"input": query})
+        calculations = script.get("calculations", [])
+        calculation_tools = {calculation["tool"] for calculation in calculations}
+        done = sum(name in calculation_tools for name in called)
+        for calculation in calculations[done:]:
+            if calculation["tool"] in tool_names:
+                return tool_call(calculation["tool"], calculation["arguments"])
+        return message_output(script.get("answer", f"[scripted answer] {query}"))
+
+
+class FakeModelProvider(ModelProvider):
+    """Model provider that serves the same ``FakeModel`` for every model name."""
+
+    def __init__(self, model: Model | None = None):
+        self.model = model or FakeModel()
+
+    def get_model(self, model_name: str | None) -> Model:
+        return self.model
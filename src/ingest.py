@@ -0,0 +1,286 @@
+"""
+Ingest a directory of documents into a vector store.
+
+Documents are hashed and checked against a manifest of what each vector
+store already holds, so re-running the ingestion only uploads new or changed
+documents, and an interrupted run resumes where it stopped: files uploaded
+but not yet attached are attached without being uploaded again. Uploads run
+concurrently on the async client, at most ``INGEST_MAX_IN_FLIGHT`` at once.
+Uploaded files are attached in file batches whose status is polled with
+``asyncio.sleep``, so nothing blocks the event loop. Rate limits, timeouts,
+connection and server errors are retried with exponential backoff and
+jitter; documents that still fail are recorded as failed and retried on the
+next run.
+
+    uv run python -m src.ingest data/documents
+    uv run python -m src.ingest data/documents --vector-store-id vs_123 --max-in-flight 16
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any, Optional, TypeVar
+
+import openai
+from dotenv import load_dotenv
+
+from configs.config import (
+    DOCUMENTS_MANIFEST,
+    INGEST_MAX_BACKOFF_S,
+    INGEST_MAX_IN_FLIGHT,
+    INGEST_MAX_RETRIES,
+    INGEST_POLL_INTERVAL_S,
+    INGEST_RETRY_BACKOFF_S,
+    INGEST_SUFFIXES,
+    PDF_PATH,
+    WEALTH_STORE_NAME,
+    get_async_client,
+)
+from src.vector import read_manifest, resolve_vector_store, write_manifest
+from src.workers import run_blocking
+from utils.cache import file_digest
+
+# files attached per vector store file batch
+FILE_BATCH_SIZE = 100
+# seconds between manifest writes while uploads are running
+MANIFEST_FLUSH_S = 1.0
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+T = TypeVar("T")
+
+
+def find_documents(
+    directory: Path, suffixes: tuple[str, ...] = INGEST_SUFFIXES
+) -> list[Path]:
+    """Return the documents under ``directory`` with one of ``suffixes``, sorted."""
+    return sorted(
+        path
+        for path in directory.rglob("*")
+        if path.is_file() and path.suffix.lower() in suffixes
+    )
+
+
+def retry_delay(
+    attempt: int,
+    backoff_s: float = INGEST_RETRY_BACKOFF_S,
+    max_backoff_s: float = INGEST_MAX_BACKOFF_S,
+) -> float:
+    """Seconds to wait before retry ``attempt`` (from 0), with full jitter."""
+    return random.uniform(0, min(max_backoff_s, backoff_s * 2**attempt))
+
+
+class DocumentIngestor:
+    """
+    Uploads documents to one vector store, skipping those already ingested.
+
+    The manifest maps each vector store id to the documents it holds, keyed
+    on content hash, with the uploaded file id and a status: ``uploaded``
+    (not yet attached), ``completed`` or ``failed``.
+
+    Args:
+        vector_store_id (str): Vector store the documents are attached to.
+        client (Optional[openai.AsyncOpenAI]): Client to use, the shared async
+            client by default. Its own retries are turned off in favour of
+            the ingestor's.
+        manifest_path (Path): Where the manifest is persisted.
+        max_in_flight (int): Uploads running at once.
+        max_retries (int): Retries of a request that failed with a retryable
+            error.
+        retry_backoff_s (float): Base of the exponential retry backoff.
+        poll_interval_s (float): Seconds between file batch status polls.
+    """
+
+    def __init__(
+        self,
+        vector_store_id: str,
+        client: Optional[openai.AsyncOpenAI] = None,
+        manifest_path: Path = DOCUMENTS_MANIFEST,
+        max_in_flight: int = INGEST_MAX_IN_FLIGHT,
+        max_retries: int = INGEST_MAX_RETRIES,
+        retry_backoff_s: float = INGEST_RETRY_BACKOFF_S,
+        poll_interval_s: float = INGEST_POLL_INTERVAL_S,
+    ):
+        self.vector_store_id = vector_store_id
+        self.client = (client or get_async_client()).with_options(max_retries=0)
+        self.manifest_path = manifest_path
+        self.max_retries = max_retries
+        self.retry_backoff_s = retry_backoff_s
+        self.poll_interval_s = poll_interval_s
+        self.counters: Counter[str] = Counter()
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._manifest: dict[str, Any] = {}
+        self._flushed_at = 0.0
+
+    @property
+    def documents(self) -> dict[str, dict[str, Any]]:
+        """Manifest entries of this vector store, keyed on content hash."""
+        return self._manifest.setdefault(self.vector_store_id, {})
+
+    def _flush(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if force or now - self._flushed_at >= MANIFEST_FLUSH_S:
+            write_manifest(self._manifest, self.manifest_path)
+            self._flushed_at = now
+
+    async def _call(self, request: Callable[[], Awaitable[T]]) -> T:
+        """Run an API request, retrying retryable errors with backoff."""
+        attempt = 0
+        while True:
+            try:
+                return await request()
+            except RETRYABLE_ERRORS:
+                if attempt >= self.max_retries:
+                    raise
+                self.counters["retries"] += 1
+                await asyncio.sleep(retry_delay(attempt, self.retry_backoff_s))
+                attempt += 1
+
+    async def _upload(self, path: Path, sha256: str) -> None:
+        async with self._slots:
+            try:
+                content = await run_blocking(path.read_bytes)
+                file = await self._call(
+                    lambda: self.client.files.create(
+                        file=(path.name, content), purpose="assistants"
+                    )
+                )
+            except (OSError, openai.OpenAIError) as e:
+                self.counters["failed"] += 1
+                self.documents[sha256] = {
+                    "file": path.name,
+                    "status": "failed",
+                    "error": repr(e),
+                }
+                return
+        self.counters["uploaded"] += 1
+        self.documents[sha256] = {
+            "file": path.name,
+            "file_id": file.id,
+            "status": "uploaded",
+        }
+        self._flush()
+
+    async def _attach(self, file_ids: list[str]) -> dict[str, Any]:
+        """Attach files as one file batch and wait for it to finish processing."""
+        batch = await self._call(
+            lambda: self.client.vector_stores.file_batches.create(
+                self.vector_store_id, file_ids=file_ids
+            )
+        )
+        while batch.status == "in_progress":
+            self.counters["polls"] += 1
+            await asyncio.sleep(self.poll_interval_s)
+            batch = await self._call(
+                lambda: self.client.vector_stores.file_batches.retrieve(
+                    batch.id, vector_store_id=self.vector_store_id
+                )
+            )
+        statuses = {}
+        page = await self._call(
+            lambda: self.client.vector_stores.file_batches.list_files(
+                batch.id, vector_store_id=self.vector_store_id, limit=FILE_BATCH_SIZE
+            )
+        )
+        async for file in page:
+            statuses[file.id] = file.status
+        return statuses
+
+    async def ingest(self, paths: list[Path]) -> dict[str, Any]:
+        """
+        Ingest documents, skipping those already in the vector store.
+
+        Args:
+            paths (list[Path]): Documents to ingest.
+
+        Returns:
+            dict: Counters of the run: documents ``skipped`` as already
+                ingested, ``uploaded``, ``attached``, ``failed``, and the API
+                ``retries`` and batch status ``polls`` it took.
+        """
+        self._manifest = read_manifest(self.manifest_path)
+        hashes = await asyncio.gather(
+            *(run_blocking(file_digest, path) for path in paths)
+        )
+        pending = {}
+        for path, sha256 in zip(paths, hashes):
+            status = self.documents.get(sha256, {}).get("status")
+            if status == "completed" or sha256 in pending:
+                self.counters["skipped"] += 1
+            elif status != "uploaded":
+                pending[sha256] = path
+
+        try:
+            await asyncio.gather(
+                *(self._upload(path, sha256) for sha256, path in pending.items())
+            )
+        finally:
+            self._flush(force=True)
+
+        to_attach = {
+            entry["file_id"]: sha256
+            for sha256, entry in self.documents.items()
+            if entry["status"] == "uploaded"
+        }
+        file_ids = list(to_attach)
+        batches = [
+            file_ids[i : i + FILE_BATCH_SIZE]
+            for i in range(0, len(file_ids), FILE_BATCH_SIZE)
+        ]
+        try:
+            for statuses in await asyncio.gather(*map(self._attach, batches)):
+                for file_id, status in statuses.items():
+                    entry = self.documents[to_attach[file_id]]
+                    if status == "completed":
+                        entry["status"] = "completed"
+                        self.counters["attached"] += 1
+                    else:
+                        entry.update(status="failed", error=f"file batch: {status}")
+                        self.counters["failed"] += 1
+        finally:
+            self._flush(force=True)
+        return {
+            key: self.counters[key]
+            for key in ("skipped", "uploaded", "attached", "failed", "retries", "polls")
+        }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("directory", type=Path, help="directory of documents")
+    parser.add_argument(
+        "--vector-store-id",
+        default=None,
+        help="vector store to add the documents to, the wealth agent's by default",
+    )
+    parser.add_argument("--max-in-flight", type=int, default=INGEST_MAX_IN_FLIGHT)
+    parser.add_argument("--manifest", type=Path, default=DOCUMENTS_MANIFEST)
+    args = parser.parse_args()
+
+    vector_store_id = args.vector_store_id
+    if vector_store_id is None:
+        vector_store_id = await run_blocking(
+            resolve_vector_store,
+            WEALTH_STORE_NAME,
+            PDF_PATH,
+            documents_manifest_path=args.manifest,
+        )
+    ingestor = DocumentIngestor(
+        vector_store_id, manifest_path=args.manifest, max_in_flight=args.max_in_flight
+    )
+    summary = await ingestor.ingest(find_documents(args.directory))
+    print(f"vector store {vector_store_id}: {summary}")
+    if summary["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    _ = load_dotenv(override=True)
+    asyncio.run(main())
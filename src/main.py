@@ -1,28 +1,86 @@
 from src.agent import agent_execution
 import asyncio
-from src.agent import triage_agent, create_session
+from src.agent import get_agent_graph, create_session
 from dotenv import load_dotenv
-from configs.config import ROOT
+from configs.config import DEFAULT_ACCOUNT_ID, ROOT, STREAM_OUTPUT, USE_LOCAL_ROUTER
+from src.accounts import AccountContext
+from src.engine import get_engine
+from src.metrics import get_metrics
+from src.router import get_router
+from src.streaming import StreamedRun
 
 _ = load_dotenv(override=True)
 
 
+async def print_stream(run: StreamedRun) -> None:
+    """Print a streamed run's answer, tool calls and handoffs as they arrive."""
+    speaking = None
+    async for event in run.events():
+        kind = event["type"]
+        if kind == "token":
+            if speaking != event["agent"]:
+                speaking = event["agent"]
+                print(f"{speaking} response: ", end="", flush=True)
+            print(event["delta"], end="", flush=True)
+            continue
+        if speaking is not None:
+            print()
+            speaking = None
+        if kind == "handoff":
+            print(f"  [handoff {event['source']} -> {event['target']}]")
+        elif kind == "tool_started":
+            print(f"  [{event['agent']} calling {event['tool']}]")
+        elif kind == "tool_finished":
+            print(f"  [{event['tool']} done in {event['ms']:.0f} ms]")
+        elif kind == "done":
+            if event["ttft_ms"] is None:
+                # nothing was streamed, e.g. a structured output
+                print(f"{event['agent']} response: {event['output']}")
+                print(f"  [total {event['latency_ms']:.0f} ms]")
+            else:
+                print(
+                    f"  [first token {event['ttft_ms']:.0f} ms, "
+                    f"total {event['latency_ms']:.0f} ms]"
+                )
+
+
 async def main():
+    # load the transactions once up front so the first tool call is fast
+    get_engine()
     session = create_session(
         session_name="finance_session", db_path=ROOT / "data" / "session.db"
     )
-    full_query = ""
-    cur_agent = triage_agent
-    while True:
-        user_query = input(">>  ")
-        if user_query.strip().lower() in {"exit", "quit"}:
-            break
-        full_query += f"<message_start>{user_query}"
-        response = await agent_execution(cur_agent, user_query, session=session)
-        full_query += f"<response_start>{response.final_output}"
-        cur_agent = response.last_agent
-
-        print(f"{cur_agent.name} response: {response.final_output}")
+    # the data tools only see this account's transactions
+    account = AccountContext(DEFAULT_ACCOUNT_ID)
+    graph = get_agent_graph()
+    agents = {agent.name: agent for agent in graph.agents()}
+    # confident queries skip the triage turn and go straight to a specialist
+    router = get_router() if USE_LOCAL_ROUTER else None
+    cur_agent = graph.triage_agent
+    try:
+        while True:
+            user_query = input(">>  ")
+            if user_query.strip().lower() in {"exit", "quit"}:
+                break
+            if router is not None:
+                cur_agent = router.route(user_query, agents, fallback=cur_agent)
+            if STREAM_OUTPUT:
+                run = StreamedRun(
+                    cur_agent, user_query, session=session, context=account
+                )
+                await print_stream(run)
+                cur_agent = run.last_agent
+            else:
+                response = await agent_execution(
+                    cur_agent, user_query, session=session, context=account
+                )
+                cur_agent = response.last_agent
+
+                print(f"{cur_agent.name} response: {response.final_output}")
+    finally:
+        # writes the session's pending history and the buffered metrics
+        session.close()
+        get_metrics().flush()
 
 
 if __name__ == "__main__":
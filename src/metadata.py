@@ -0,0 +1,150 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Optional
+
+import duckdb
+
+from src.accounts import ACCOUNT_COLUMN
+
+# bump whenever the layout of the index changes
+METADATA_FORMAT_VERSION = 3
+# string columns with more distinct values than this are not enumerated
+MAX_DISTINCT_VALUES = 50
+
+
+def build_metadata_index(
+    conn: duckdb.DuckDBPyConnection,
+    table_name: str,
+    account_id: Optional[int] = None,
+) -> dict[str, Any]:
+    """
+    Build the schema and metadata index of a loaded transactions table.
+
+    The index holds the column names and DuckDB types, the row count, the
+    approximate number of distinct values of every column, the distinct
+    values (with counts) of low-cardinality text columns, the date range, and
+    the row counts per year and per month.
+
+    Args:
+        conn (duckdb.DuckDBPyConnection): Connection holding the table.
+        table_name (str): Name of the table to index.
+        account_id (Optional[int]): Only index this account's rows, so the
+            index can be shown to a conversation bound to the account.
+
+    Returns:
+        dict[str, Any]: A JSON-serialisable metadata index.
+    """
+    described = conn.execute(f"DESCRIBE {table_name}").fetchall()
+    columns = [{"name": row[0], "type": row[1]} for row in described]
+    source = table_name
+    if account_id is not None:
+        source = (
+            f"(SELECT * FROM {table_name} "
+            f"WHERE {ACCOUNT_COLUMN} = {int(account_id)}) AS {table_name}"
+        )
+    (row_count,) = conn.execute(f"SELECT COUNT(*) FROM {source}").fetchone()
+    approx_distinct = conn.execute(
+        "SELECT "
+        + ", ".join(f'approx_count_distinct("{c["name"]}")' for c in columns)
+        + f" FROM {source}"
+    ).fetchone()
+    distinct_counts = {column["name"]: n for column, n in zip(columns, approx_distinct)}
+
+    distinct_values = {}
+    for column in columns:
+        if column["type"] != "VARCHAR":
+            continue
+        name = column["name"]
+        (n_distinct,) = conn.execute(
+            f'SELECT COUNT(DISTINCT "{name}") FROM {source}'
+        ).fetchone()
+        if n_distinct > MAX_DISTINCT_VALUES:
+            continue
+        counts = conn.execute(
+            f'SELECT "{name}", COUNT(*) AS n FROM {source} '
+            f'GROUP BY "{name}" ORDER BY n DESC, "{name}"'
+        ).fetchall()
+        distinct_values[name] = {str(value): n for value, n in counts}
+
+    min_date, max_date = conn.execute(
+        f"SELECT MIN(date)::DATE, MAX(date)::DATE FROM {source}"
+    ).fetchone()
+    per_month = conn.execute(
+        f"SELECT year, month, COUNT(*) FROM {source} "
+        "GROUP BY year, month ORDER BY year, month"
+    ).fetchall()
+    rows_per_year: dict[str, int] = {}
+    for year, _, n in per_month:
+        rows_per_year[str(year)] = rows_per_year.get(str(year), 0) + n
+
+    return {
+        "format_version": METADATA_FORMAT_VERSION,
+        "table": table_name,
+        "row_count": row_count,
+        "columns": columns,
+        "distinct_counts": distinct_counts,
+        "distinct_values": distinct_values,
+        "date_range": {"min": str(min_date), "max": str(max_date)},
+        "rows_per_year": rows_per_year,
+        "rows_per_month": {f"{y}-{m:02d}": n for y, m, n in per_month},
+    }
+
+
+def load_or_build_index(
+    conn: duckdb.DuckDBPyConnection, table_name: str, path: Path, source_sha256: str
+) -> dict[str, Any]:
+    """
+    Load the persisted metadata index, rebuilding it if the data changed.
+
+    Args:
+        conn (duckdb.DuckDBPyConnection): Connection holding the table.
+        table_name (str): Name of the indexed table.
+        path (Path): Where the index is persisted.
+        source_sha256 (str): Content hash of the data the table was loaded from.
+
+    Returns:
+        dict[str, Any]: The metadata index of the current data.
+    """
+    try:
+        index = json.loads(path.read_text())
+        if (
+            index.get("format_version") == METADATA_FORMAT_VERSION
+            and index.get("table") == table_name
+            and index.get("source_sha256") == source_sha256
+        ):
+            return index
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+
+    index = build_metadata_index(conn, table_name)
+    index["source_sha256"] = source_sha256
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(index, indent=2))
+    os.replace(tmp_path, path)
+    return index
+
+
+def schema_summary(index: dict[str, Any]) -> str:
+    """
+    Render a metadata index as a compact schema description for prompts.
+
+    Example:
+        TABLE transactions (3600 rows, dates 2020-01-01 to 2025-12-28)
+        - date TIMESTAMP_NS
+        - type VARCHAR: debit (3000), credit (600)
+    """
+    date_range = index["date_range"]
+    years = ", ".join(index["rows_per_year"])
+    lines = [
+        f"TABLE {index['table']} ({index['row_count']} rows, "
+        f"dates {date_range['min']} to {date_range['max']}, years {years})"
+    ]
+    for column in index["columns"]:
+        line = f"- {column['name']} {column['type']}"
+        values = index["distinct_values"].get(column["name"])
+        if values:
+            line += ": " + ", ".join(f"{v} ({n})" for v, n in values.items())
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,475 @@
+"""
+Latency, token and tool metrics of agent runs.
+
+Agent hooks and a delegating model record one event per model call, tool
+call, handoff and run, plus timed stages such as loading the transactions.
+Events are aggregated into histograms and counters, rendered in the
+Prometheus text format, and appended to a JSONL file that the command line
+summarises into a flame-style breakdown of where a run's time went.
+
+    uv run python -m src.metrics data/metrics.jsonl
+    uv run python -m src.metrics data/metrics.jsonl --run 3f2a... --prometheus metrics.prom
+"""
+
+import argparse
+import bisect
+import json
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import cache
+from pathlib import Path
+from typing import Any, Optional
+
+from agents import Agent, AgentHooks, Model, ModelResponse, RunContextWrapper, Tool
+
+from configs.config import METRICS_ENABLED, METRICS_FLUSH_EVENTS, METRICS_PATH
+
+# upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS_S = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+# label holding an event's name, by event kind
+NAME_LABELS = {"tool": "tool", "stage": "stage"}
+METRIC_HELP = {
+    "agent_run_duration_seconds": "Wall time of agent runs, by starting agent.",
+    "agent_model_duration_seconds": "Model call latency, by agent.",
+    "agent_tool_duration_seconds": "Function tool latency, by agent and tool.",
+    "agent_stage_duration_seconds": "Latency of timed stages such as data loading.",
+    "agent_model_tokens_total": "Model tokens, by agent and direction.",
+    "agent_tool_result_bytes_total": "Bytes of tool results, by agent and tool.",
+    "agent_handoffs_total": "Handoffs, by source and target agent.",
+}
+
+_run_id: ContextVar[Optional[str]] = ContextVar("run_id", default=None)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS_S):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """(upper bound, observations at or below it) pairs, ending with +Inf."""
+        bounds = [f"{bound:g}" for bound in self.buckets] + ["+Inf"]
+        total, pairs = 0, []
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class MetricsRecorder:
+    """
+    Thread-safe sink of instrumentation events.
+
+    Every event updates the in-memory histograms and counters; when an
+    ``events_path`` is given, events are also buffered and appended to that
+    JSONL file every ``flush_events`` events and on ``flush``.
+
+    Args:
+        events_path (Optional[Path]): JSONL file events are appended to.
+        flush_events (int): Buffered events that trigger a write.
+    """
+
+    def __init__(
+        self,
+        events_path: Optional[Path] = None,
+        flush_events: int = METRICS_FLUSH_EVENTS,
+    ):
+        self.events_path = events_path
+        self.flush_events = flush_events
+        self.histograms: dict[tuple[str, Labels], Histogram] = {}
+        self.counters: Counter[tuple[str, Labels]] = Counter()
+        self._events: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        kind: str,
+        ms: Optional[float] = None,
+        agent: Optional[str] = None,
+        name: Optional[str] = None,
+        **fields: Any,
+    ) -> None:
+        """
+        Record one event.
+
+        Args:
+            kind (str): ``run``, ``model``, ``tool``, ``handoff`` or ``stage``.
+            ms (Optional[float]): Duration in milliseconds.
+            agent (Optional[str]): Agent the event belongs to.
+            name (Optional[str]): Tool, stage or handoff source name.
+            **fields: Extra values, e.g. ``input_tokens`` or ``result_bytes``.
+        """
+        event = {
+            "ts": round(time.time(), 6),
+            "run_id": _run_id.get(),
+            "kind": kind,
+            "agent": agent,
+            "name": name,
+            "ms": None if ms is None else round(ms, 3),
+            **fields,
+        }
+        with self._lock:
+            self.apply(event)
+            if self.events_path is None:
+                return
+            self._events.append(event)
+            should_flush = len(self._events) >= self.flush_events
+        if should_flush:
+            self.flush()
+
+    def apply(self, event: dict[str, Any]) -> None:
+        """Add an event to the histograms and counters."""
+        kind, agent, name = event["kind"], event["agent"], event["name"]
+        if kind == "handoff":
+            labels = (("source", str(name)), ("target", str(agent)))
+            self.counters[("agent_handoffs_total", labels)] += 1
+            return
+        labels = tuple(
+            (key, str(value))
+            for key, value in (("agent", agent), (NAME_LABELS.get(kind), name))
+            if key is not None and value is not None
+        )
+        if event["ms"] is not None:
+            metric = (f"agent_{kind}_duration_seconds", labels)
+            histogram = self.histograms.get(metric)
+            if histogram is None:
+                histogram = self.histograms[metric] = Histogram()
+            histogram.observe(event["ms"] / 1000)
+        for direction in ("input", "output"):
+            tokens = event.get(f"{direction}_tokens")
+            if tokens:
+                key = ("agent_model_tokens_total", labels + (("direction", direction),))
+                self.counters[key] += tokens
+        if event.get("result_bytes") is not None:
+            self.counters[("agent_tool_result_bytes_total", labels)] += event[
+                "result_bytes"
+            ]
+
+    def flush(self) -> None:
+        """Append the buffered events to ``events_path``."""
+        with self._lock:
+            events, self._events = self._events, []
+            if not events or self.events_path is None:
+                return
+            self.events_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.events_path.open("a", encoding="utf-8") as f:
+                f.writelines(json.dumps(event) + "\n" for event in events)
+
+    @contextmanager
+    def timer(
+        self,
+        kind: str,
+        agent: Optional[str] = None,
+        name: Optional[str] = None,
+        **fields: Any,
+    ) -> Iterator[None]:
+        """Record the duration of the ``with`` block as one event."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(
+                kind, (time.perf_counter() - start) * 1000, agent, name, **fields
+            )
+
+    @contextmanager
+    def run(self, agent_name: str) -> Iterator[str]:
+        """
+        Time an agent run and tag every event recorded inside it with a run id.
+
+        Nested runs, such as an agent used as a tool, inherit the run id.
+        """
+        token = _run_id.set(uuid.uuid4().hex)
+        try:
+            with self.timer("run", agent=agent_name):
+                yield _run_id.get()
+        finally:
+            _run_id.reset(token)
+
+    def prometheus_text(self) -> str:
+        """Render the histograms and counters in the Prometheus text format."""
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        lines: list[str] = []
+        described: set[str] = set()
+
+        def describe(metric: str, metric_type: str) -> None:
+            if metric not in described:
+                described.add(metric)
+                lines.append(f"# HELP {metric} {METRIC_HELP.get(metric, metric)}")
+                lines.append(f"# TYPE {metric} {metric_type}")
+
+        for (metric, labels), histogram in histograms:
+            describe(metric, "histogram")
+            for bound, count in histogram.cumulative():
+                bucket_labels = format_labels(labels + (("le", bound),))
+                lines.append(f"{metric}_bucket{bucket_labels} {count}")
+            lines.append(f"{metric}_sum{format_labels(labels)} {histogram.sum:.6f}")
+            lines.append(f"{metric}_count{format_labels(labels)} {histogram.count}")
+        for (metric, labels), value in counters:
+            describe(metric, "counter")
+            lines.append(f"{metric}{format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsHooks(AgentHooks):
+    """Agent hooks recording tool calls and handoffs into a recorder."""
+
+    def __init__(self, recorder: MetricsRecorder):
+        self.recorder = recorder
+        self._tool_started: defaultdict[tuple[int, str], list[float]] = defaultdict(
+            list
+        )
+
+    async def on_handoff(
+        self, context: RunContextWrapper, agent: Agent, source: Agent
+    ) -> None:
+        self.recorder.record("handoff", agent=agent.name, name=source.name)
+
+    async def on_tool_start(
+        self, context: RunContextWrapper, agent: Agent, tool: Tool
+    ) -> None:
+        self._tool_started[(id(context), tool.name)].append(time.perf_counter())
+
+    async def on_tool_end(
+        self, context: RunContextWrapper, agent: Agent, tool: Tool, result: str
+    ) -> None:
+        key = (id(context), tool.name)
+        started = self._tool_started[key].pop()
+        if not self._tool_started[key]:
+            del self._tool_started[key]
+        self.recorder.record(
+            "tool",
+            (time.perf_counter() - started) * 1000,
+            agent=agent.name,
+            name=tool.name,
+            result_bytes=len(str(result).encode()),
+        )
+
+
+class InstrumentedModel(Model):
+    """Delegating model recording each call's latency and token usage."""
+
+    def __init__(self, model: Model, agent_name: str, recorder: MetricsRecorder):
+        self.model = model
+        self.agent_name = agent_name
+        self.recorder = recorder
+
+    async def get_response(self, *args: Any, **kwargs: Any) -> ModelResponse:
+        start = time.perf_counter()
+        response = await self.model.get_response(*args, **kwargs)
+        self.recorder.record(
+            "model",
+            (time.perf_counter() - start) * 1000,
+            agent=self.agent_name,
+            input_tokens=response.usage.input_tokens,
+            output_tokens=response.usage.output_tokens,
+        )
+        return response
+
+    async def stream_response(self, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        start = time.perf_counter()
+        usage = None
+        async for event in self.model.stream_response(*args, **kwargs):
+            if getattr(event, "type", None) == "response.completed":
+                usage = event.response.usage
+            yield event
+        self.recorder.record(
+            "model",
+            (time.perf_counter() - start) * 1000,
+            agent=self.agent_name,
+            input_tokens=usage.input_tokens if usage else None,
+            output_tokens=usage.output_tokens if usage else None,
+        )
+
+
+@cache
+def get_metrics() -> MetricsRecorder:
+    """Return the process-wide recorder, writing to ``METRICS_PATH`` if enabled."""
+    return MetricsRecorder(METRICS_PATH if METRICS_ENABLED else None)
+
+
+def read_events(filepath: Path) -> list[dict[str, Any]]:
+    with filepath.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def flame_rows(events: list[dict[str, Any]]) -> list[tuple[int, str, float]]:
+    """
+    Break the runs' wall time down by agent, model and tool.
+
+    A tool named after an agent (``<agent>_tool``) runs that agent nested, so
+    the agent's model and tool time is shown under the tool. Whatever a node's
+    children do not account for (framework overhead, sessions, handoffs) is
+    shown as ``other``.
+
+    Returns:
+        list[tuple[int, str, float]]: (depth, label, milliseconds) rows.
+    """
+    model_ms: Counter[str] = Counter()
+    tool_ms: defaultdict[str, Counter[str]] = defaultdict(Counter)
+    for event in events:
+        if event["kind"] == "model" and event["ms"] is not None:
+            model_ms[event["agent"]] += event["ms"]
+        elif event["kind"] == "tool" and event["ms"] is not None:
+            tool_ms[event["agent"]][event["name"]] += event["ms"]
+    agents = set(model_ms) | set(tool_ms)
+    nested = {f"{agent}_tool": agent for agent in agents}
+    called = {
+        nested[tool] for tools in tool_ms.values() for tool in tools if tool in nested
+    }
+    top_level = sorted(agents - called)
+
+    def agent_rows(
+        agent: str, depth: int
+    ) -> tuple[list[tuple[int, str, float]], float]:
+        rows = [(depth, f"{agent} model", model_ms[agent])]
+        for tool, ms in tool_ms[agent].most_common():
+            rows.append((depth, f"{agent} tool {tool}", ms))
+            if tool in nested:
+                children, covered = agent_rows(nested[tool], depth + 1)
+                rows.extend(children)
+                rows.append((depth + 1, "other", max(0.0, ms - covered)))
+        return rows, model_ms[agent] + sum(tool_ms[agent].values())
+
+    total = sum(e["ms"] for e in events if e["kind"] == "run" and e["ms"] is not None)
+    rows: list[tuple[int, str, float]] = [(0, "run", total)]
+    covered = 0.0
+    for agent in top_level:
+        children, agent_ms = agent_rows(agent, 1)
+        rows.extend(children)
+        covered += agent_ms
+    rows.append((1, "other", max(0.0, total - covered)))
+    return rows
+
+
+def format_flame(rows: list[tuple[int, str, float]], width: int = 30) -> str:
+    total = rows[0][2] or 1.0
+    lines = []
+    for depth, label, ms in rows:
+        bar = "#" * round(width * ms / total)
+        lines.append(
+            f"{'  ' * depth + label:<48} {ms:>11.1f} ms {100 * ms / total:>6.1f}%  {bar}"
+        )
+    return "\n".join(lines)
+
+
+def summarise_events(events: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Per agent/tool/stage latency percentiles, token totals and result sizes."""
+    groups: defaultdict[tuple[str, str, str], list[dict[str, Any]]] = defaultdict(list)
+    for event in events:
+        groups[(event["kind"], event["agent"] or "", event["name"] or "")].append(event)
+    rows = []
+    for (kind, agent, name), group in sorted(groups.items()):
+        durations = sorted(e["ms"] for e in group if e["ms"] is not None)
+        row: dict[str, Any] = {
+            "kind": kind,
+            "agent": agent,
+            "name": name,
+            "calls": len(group),
+        }
+        if durations:
+            row.update(
+                total_ms=round(sum(durations), 3),
+                p50_ms=round(durations[len(durations) // 2], 3),
+                p95_ms=round(durations[int(0.95 * (len(durations) - 1))], 3),
+                max_ms=round(durations[-1], 3),
+            )
+        for field in ("input_tokens", "output_tokens"):
+            if any(e.get(field) for e in group):
+                row[field] = sum(e.get(field) or 0 for e in group)
+        sizes = [e["result_bytes"] for e in group if e.get("result_bytes") is not None]
+        if sizes:
+            row["mean_result_bytes"] = round(statistics.fmean(sizes))
+        rows.append(row)
+    return rows
+
+
+def format_table(rows: list[dict[str, Any]]) -> str:
+    columns = [
+        "kind",
+        "agent",
+        "name",
+        "calls",
+        "p50_ms",
+        "p95_ms",
+        "max_ms",
+        "total_ms",
+        "input_tokens",
+        "output_tokens",
+        "mean_result_bytes",
+    ]
+    cells = [columns] + [[str(row.get(c, "")) for c in columns] for row in rows]
+    widths = [max(len(line[i]) for line in cells) for i in range(len(columns))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip()
+        for line in cells
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("events", type=Path, nargs="?", default=METRICS_PATH)
+    parser.add_argument("--run", default=None, help="only summarise this run id")
+    parser.add_argument(
+        "--prometheus", type=Path, default=None, help="also write Prometheus text here"
+    )
+    args = parser.parse_args()
+
+    events = read_events(args.events)
+    if args.run:
+        events = [e for e in events if e["run_id"] == args.run]
+    runs = {e["run_id"] for e in events if e["kind"] == "run"}
+    print(f"{len(events)} events, {len(runs)} runs\n")
+    print(format_flame(flame_rows([e for e in events if e["run_id"] is not None])))
+    print()
+    print(format_table(summarise_events(events)))
+    if args.prometheus:
+        recorder = MetricsRecorder()
+        for event in events:
+            recorder.apply(event)
+        args.prometheus.write_text(recorder.prometheus_text())
+
+
+if __name__ == "__main__":
+    main()
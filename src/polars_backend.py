@@ -0,0 +1,155 @@
+import time
+from pathlib import Path
+from typing import Optional
+
+import polars as pl
+import pyarrow as pa
+
+from configs.config import TRANSACTIONS_TABLE
+from src.data_models import InputTransactions
+
+# Polars' streaming engine processes the scan in morsels, so aggregations over
+# the whole store run in bounded memory instead of materialising full columns
+POLARS_ENGINE = "streaming"
+# polling interval bounds, in seconds, while waiting on a query with a deadline
+POLL_MIN_S = 0.0001
+POLL_MAX_S = 0.01
+
+
+class PolarsTimeoutError(TimeoutError):
+    """Raised when a Polars query is still running at its deadline."""
+
+
+def _kind(dtype: pl.DataType) -> pl.DataType:
+    """Type class of a column; values of the same kind cast losslessly enough."""
+    if dtype.is_integer():
+        return pl.Int64
+    if dtype.is_float():
+        return pl.Float64
+    return dtype.base_type()
+
+
+def conform(lazy: pl.LazyFrame, schema: pa.Schema) -> pl.LazyFrame:
+    """
+    Rename and cast a plan's columns to the schema DuckDB returns for the query.
+
+    Raises:
+        polars.exceptions.SchemaError: If the plan has other columns than
+            ``schema``, or a column of another kind.
+    """
+    planned = lazy.collect_schema()
+    expected = pl.from_arrow(schema.empty_table()).schema
+    if len(planned) != len(expected):
+        raise pl.exceptions.SchemaError(
+            f"Polars returns {len(planned)} columns, DuckDB {len(expected)}"
+        )
+    columns = []
+    for i, ((name, dtype), (duckdb_name, duckdb_dtype)) in enumerate(
+        zip(planned.items(), expected.items())
+    ):
+        if _kind(dtype) != _kind(duckdb_dtype):
+            raise pl.exceptions.SchemaError(
+                f"Polars computes {name} as {dtype}, DuckDB as {duckdb_dtype}"
+            )
+        columns.append(pl.nth(i).cast(duckdb_dtype).alias(duckdb_name))
+    return lazy.select(columns)
+
+
+class PolarsBackend:
+    """
+    Runs transaction queries on Polars LazyFrames over the Parquet store.
+
+    The table is a lazy ``scan_parquet`` of the year/month partitioned store,
+    so Polars' optimiser pushes the query's column projections and filters
+    (including the account filter and ``year``/``month`` partition pruning)
+    down into the scan, runs the plan on its own thread pool with the
+    streaming engine and returns the result as Arrow without going through
+    pandas. Polars SQL is not DuckDB SQL: the same query can name its columns
+    differently or compute other types (``COUNT(*) / 7`` divides integers).
+    Given the schema DuckDB binds the query to, the plan's columns are
+    renamed to DuckDB's names and cast to its types, and a query with a
+    column of another kind (an integer where DuckDB has a float) is refused,
+    so the engine falls back to DuckDB for it as for SQL Polars cannot plan.
+
+    Args:
+        root (Path): Root of the ``PartitionedStore``.
+        table_name (str): Name queries refer to the table by.
+    """
+
+    def __init__(self, root: Path, table_name: str = TRANSACTIONS_TABLE):
+        self.root = root
+        self.table_name = table_name
+        self._frame: Optional[pl.LazyFrame] = None
+
+    def refresh(self) -> None:
+        """Re-scan the store, after it has been rewritten."""
+        columns = list(InputTransactions.to_schema().columns)
+        self._frame = pl.scan_parquet(
+            str(self.root / "*" / "*" / "*.parquet"),
+            hive_partitioning=True,
+            hive_schema={"year": pl.Int64, "month": pl.Int64},
+        ).select(columns)
+
+    def plan(
+        self,
+        sql_query: str,
+        account_id: Optional[int] = None,
+        schema: Optional[pa.Schema] = None,
+    ) -> pl.LazyFrame:
+        """
+        Build the lazy plan of a query, filtered to one account if given.
+
+        Args:
+            sql_query (str): The query.
+            account_id (Optional[int]): Only scan this account's rows.
+            schema (Optional[pa.Schema]): Result schema DuckDB binds the query
+                to, which the plan is conformed to (see ``conform``).
+
+        Raises:
+            polars.exceptions.PolarsError: If Polars cannot plan the SQL, or
+                its result would not match ``schema``.
+        """
+        if self._frame is None:
+            self.refresh()
+        frame = self._frame
+        if account_id is not None:
+            frame = frame.filter(pl.col("account_id") == account_id)
+        lazy = pl.SQLContext({self.table_name: frame}).execute(sql_query, eager=False)
+        return lazy if schema is None else conform(lazy, schema)
+
+    def collect(
+        self,
+        sql_query: str,
+        account_id: Optional[int] = None,
+        offset: int = 0,
+        timeout: Optional[float] = None,
+        schema: Optional[pa.Schema] = None,
+    ) -> pa.Table:
+        """
+        Run a query and return its rows from ``offset`` on as an Arrow table.
+
+        Polars cannot interrupt a running query, so with a ``timeout`` the
+        query runs in the background and is abandoned, rather than stopped,
+        once the deadline passes.
+
+        Raises:
+            polars.exceptions.PolarsError: If Polars cannot plan or run the
+                SQL, or its result would not match ``schema``.
+            PolarsTimeoutError: If the query runs past ``timeout`` seconds.
+        """
+        lazy = self.plan(sql_query, account_id, schema)
+        if offset:
+            lazy = lazy.slice(offset)
+        if not timeout:
+            return lazy.collect(engine=POLARS_ENGINE).to_arrow()
+
+        deadline = time.monotonic() + timeout
+        query = lazy.collect(background=True, engine=POLARS_ENGINE)
+        wait = POLL_MIN_S
+        while (result := query.fetch()) is None:
+            if time.monotonic() >= deadline:
+                query.cancel()
+                raise PolarsTimeoutError(f"query still running after {timeout:g}s")
+            time.sleep(wait)
+            wait = min(wait * 2, POLL_MAX_S)
+        return result.to_arrow()
@@ -26,6 +26,10 @@ WORKFLOW
 3. Query Execution
 - Use the `execute_sql` tool to run queries.
 - If the query fails due to any error dont make up answer.
+- Large results are truncated; prefer aggregations, and use `fetch_more_rows`
+  with the returned cursor id only if more raw rows are really needed.
+- The `transactions` table only holds the current customer's account, so
+  never filter on `account_id`; run a single SELECT query per call.
 - Handle query failures gracefully and provide suggestions if needed.
 
 OUTPUT FORMAT
@@ -36,6 +40,32 @@ OUTPUT FORMAT
 """
 
 
+def build_query_transaction_prompt(schema: str | None = None) -> str:
+    """
+    Return the SQL agent prompt, optionally with the table schema inlined.
+
+    When the schema summary is included the agent already knows the columns
+    and distinct values, so it can skip the schema discovery tool calls.
+    """
+    if not schema:
+        return QUERY_TRANSACTION_PROMPT
+    return f"""{QUERY_TRANSACTION_PROMPT}
+KNOWN SCHEMA
+The schema below is current. Skip Schema Discovery and query directly unless
+a query fails because of a missing column or value.
+
+{schema}
+"""
+
+
+CALCULATION_GUIDANCE = """CALCULATIONS
+- Use the `calculate` tool for all arithmetic, never compute figures yourself.
+- Put every step of a calculation in ONE `calculate` call, naming intermediate
+  results and referring to them (e.g. "total = sum(spend)", "share = spend / total * 100").
+- Pass series of values as arrays, e.g. "spend = [120.5, 98.2, 143.0]".
+"""
+
+
 FINANCIAL_AGENT_PROMPT = f"""
 {RECOMMENDED_PROMPT_PREFIX}
 
@@ -56,6 +86,7 @@ RESPONSE FORMAT
 - Use bullet points for multiple insights.
 - Include percentages and totals when relevant.
 
+{CALCULATION_GUIDANCE}
 HANDOFF TRIGGERS
 - Transaction-level data (amounts, counts, filters, groupings).
 - Missing required data in the current context.
@@ -83,6 +114,7 @@ RESPONSE FORMAT
 - Include recent news or economic indicators when relevant.
 - Avoid speculation or personalized advice.
 
+{CALCULATION_GUIDANCE}
 HANDOFF LOGIC
 - Strategy/planning → WEALTH_AGENT
 - Data access or history → SQL_QUERY_AGENT
@@ -166,6 +198,7 @@ RESPONSE FORMAT
 - Use bullet points for clarity
 - Summarize with key takeaways that align with Pat Dorsey's long-term investment philosophy
 
+{CALCULATION_GUIDANCE}
 HANDOFF TRIGGERS
 - Requests for stock/fund price, performance, or comparisons → INVESTMENT_AGENT
 - Questions about spending, budgeting, or transactions → SQL_QUERY_AGENT or FINANCIAL_AGENT
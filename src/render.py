@@ -0,0 +1,175 @@
+import math
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from configs.config import RESULT_MAX_BYTES, RESULT_MAX_ROWS, RESULT_MAX_TOKENS
+
+
+@dataclass(frozen=True)
+class ResultBudget:
+    """Limits on how much of a query result is rendered for the model."""
+
+    max_rows: int = RESULT_MAX_ROWS
+    max_bytes: int = RESULT_MAX_BYTES
+    max_tokens: int = RESULT_MAX_TOKENS
+
+
+def format_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return "" if math.isnan(value) else str(round(value, 4))
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def markdown_row(values: list[str]) -> str:
+    return "| " + " | ".join(values) + " |"
+
+
+class ColumnStats:
+    """Streaming min/max/mean and null counts over record batches."""
+
+    def __init__(self, schema: pa.Schema):
+        self.schema = schema
+        self.stats: dict[str, dict[str, Any]] = {
+            f.name: {"nulls": 0, "count": 0, "min": None, "max": None, "sum": 0.0}
+            for f in schema
+        }
+
+    def update(self, batch: pa.RecordBatch) -> None:
+        for f, column in zip(self.schema, batch.columns):
+            stats = self.stats[f.name]
+            stats["nulls"] += column.null_count
+            if not (pa.types.is_integer(f.type) or pa.types.is_floating(f.type)):
+                continue
+            valid = len(column) - column.null_count
+            if not valid:
+                continue
+            min_max = pc.min_max(column).as_py()
+            stats["count"] += valid
+            stats["sum"] += pc.sum(column).as_py()
+            if stats["min"] is None or min_max["min"] < stats["min"]:
+                stats["min"] = min_max["min"]
+            if stats["max"] is None or min_max["max"] > stats["max"]:
+                stats["max"] = min_max["max"]
+
+    def summary(self) -> str:
+        parts = []
+        for name, stats in self.stats.items():
+            if stats["count"]:
+                mean = stats["sum"] / stats["count"]
+                parts.append(
+                    f"{name} min {format_value(stats['min'])}, "
+                    f"max {format_value(stats['max'])}, mean {format_value(mean)}"
+                )
+            if stats["nulls"]:
+                parts.append(f"{name} nulls {stats['nulls']}")
+        return "; ".join(parts)
+
+
+@dataclass
+class RenderedResult:
+    """A query result rendered within a budget."""
+
+    columns: list[str]
+    lines: list[str] = field(default_factory=list)
+    first_row: int = 0
+    rows_shown: int = 0
+    total_rows: int = 0
+    truncated_by: Optional[str] = None
+    stats: str = ""
+
+    @property
+    def truncated(self) -> bool:
+        return self.truncated_by is not None
+
+    def to_text(self, cursor_id: Optional[str] = None) -> str:
+        if not self.total_rows:
+            return f"Query returned no rows. Columns: {', '.join(self.columns)}"
+        header = [markdown_row(self.columns), markdown_row(["---"] * len(self.columns))]
+        text = "\n".join(header + self.lines)
+        if not self.truncated:
+            return f"{text}\n\n({self.total_rows} rows)"
+
+        last_row = self.first_row + self.rows_shown
+        text += (
+            f"\n\nShowing rows {self.first_row + 1}-{last_row} of {self.total_rows} "
+            f"(truncated by {self.truncated_by} budget)."
+        )
+        if self.stats:
+            text += f"\nColumn stats over all rows: {self.stats}."
+        if cursor_id is not None and last_row < self.total_rows:
+            text += (
+                f'\nMore rows: call fetch_more_rows with cursor_id "{cursor_id}" '
+                f"and offset {last_row}."
+            )
+        else:
+            text += "\nUse aggregation or LIMIT to narrow the result."
+        return text
+
+
+def render_result(
+    reader: pa.RecordBatchReader,
+    budget: Optional[ResultBudget] = None,
+    first_row: int = 0,
+    total_rows: Optional[int] = None,
+) -> RenderedResult:
+    """
+    Render a streamed query result as a markdown table within a budget.
+
+    Record batches are read one at a time and rows are added until the row,
+    byte or (approximate) token budget is reached. The remaining batches are
+    still streamed, without being formatted, to count the total rows and
+    collect per-column stats, so memory stays bounded by the batch size.
+    When ``total_rows`` is already known (paging through an earlier result),
+    reading stops as soon as the budget is reached.
+
+    Args:
+        reader (pa.RecordBatchReader): The query result.
+        budget (Optional[ResultBudget]): Limits for the rendered table.
+        first_row (int): Offset of the first row of ``reader`` in the full result.
+        total_rows (Optional[int]): Size of the full result, if already known.
+
+    Returns:
+        RenderedResult: The rendered rows plus truncation details.
+    """
+    budget = budget or ResultBudget()
+    rendered = RenderedResult(columns=reader.schema.names, first_row=first_row)
+    stats = ColumnStats(reader.schema) if total_rows is None else None
+    used_bytes = len(markdown_row(rendered.columns)) * 2
+    rows_seen = 0
+
+    for batch in reader:
+        rows_seen += batch.num_rows
+        if stats is not None:
+            stats.update(batch)
+        if rendered.truncated:
+            if stats is None:
+                break
+            continue
+        for row in batch.to_pylist():
+            line = markdown_row([format_value(v) for v in row.values()])
+            used_bytes += len(line.encode()) + 1
+            if rendered.rows_shown >= budget.max_rows:
+                rendered.truncated_by = "row"
+            elif used_bytes > budget.max_bytes:
+                rendered.truncated_by = "byte"
+            elif used_bytes / 4 > budget.max_tokens:
+                rendered.truncated_by = "token"
+            if rendered.truncated:
+                break
+            rendered.lines.append(line)
+            rendered.rows_shown += 1
+
+    if total_rows is None:
+        rendered.total_rows = first_row + rows_seen
+        if rendered.truncated:
+            rendered.stats = stats.summary()
+    else:
+        rendered.total_rows = total_rows
+        if first_row + rendered.rows_shown < total_rows:
+            rendered.truncated_by = rendered.truncated_by or "row"
+    return rendered
@@ -0,0 +1,314 @@
+"""
+Local BM25 retrieval over PDFs, an offline alternative to the hosted file search.
+
+The PDFs are extracted and split into overlapping word windows once, and the
+BM25 weight of every (term, chunk) pair is precomputed into a compressed
+sparse index saved as NumPy arrays next to the chunk texts. Later loads
+memory-map the arrays, so a query only touches the postings of its own terms
+and is answered in well under a millisecond. The index is rebuilt when a PDF
+changes or the chunking settings do.
+
+    uv run python -m src.retrieval "why does a brand make a moat"
+    uv run python -m src.retrieval "switching costs of banks" --top-k 3 --rebuild
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+from pypdf import PdfReader
+
+from configs.config import (
+    PDF_PATH,
+    RETRIEVAL_CHUNK_OVERLAP,
+    RETRIEVAL_CHUNK_WORDS,
+    RETRIEVAL_DIR,
+    RETRIEVAL_TOP_K,
+)
+from utils.cache import file_digest
+
+# bump whenever the on-disk layout of the index changes
+INDEX_FORMAT_VERSION = 1
+# BM25 term frequency saturation and document length normalisation
+BM25_K1 = 1.2
+BM25_B = 0.75
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# a word hyphenated across a line break, e.g. "rea-\nsons"
+LINE_BREAK_HYPHEN = re.compile(r"(\w)-\s*\n\s*(\w)")
+STOPWORDS = frozenset(
+    "a about after all also an and any are as at be because been but by can "
+    "could did do does doing for from had has have how i if in into is it its "
+    "just may me more most my no not of on one or other our out over own so "
+    "some such than that the their them then there these they this those to "
+    "too up us very was we were what when where which while who why will with "
+    "would you your".split()
+)
+ARRAYS = ("offsets", "chunk_ids", "weights")
+
+
+def extract_pages(pdf_path: Path) -> list[str]:
+    """Return the text of every page of a PDF, in page order."""
+    # pypdf logs a warning for every glyph it cannot map, which is noise here
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+    return [
+        LINE_BREAK_HYPHEN.sub(r"\1\2", page.extract_text() or "")
+        for page in PdfReader(pdf_path).pages
+    ]
+
+
+def chunk_pages(
+    pages: list[str],
+    chunk_words: int = RETRIEVAL_CHUNK_WORDS,
+    overlap: int = RETRIEVAL_CHUNK_OVERLAP,
+) -> list[tuple[int, str]]:
+    """
+    Split pages into windows of ``chunk_words`` words sharing ``overlap`` words.
+
+    Windows never cross a page, so every chunk can be cited by its page.
+
+    Returns:
+        list[tuple[int, str]]: (1-based page number, text) of each chunk.
+    """
+    step = max(1, chunk_words - overlap)
+    chunks = []
+    for page_number, text in enumerate(pages, start=1):
+        words = text.split()
+        for start in range(0, max(1, len(words) - overlap), step):
+            window = words[start : start + chunk_words]
+            if window:
+                chunks.append((page_number, " ".join(window)))
+    return chunks
+
+
+def stem(word: str) -> str:
+    """Fold simple English plurals, e.g. ``companies`` -> ``company``."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased, stemmed words of ``text`` without stopwords."""
+    return [
+        stem(word)
+        for word in TOKEN_PATTERN.findall(text.lower())
+        if word not in STOPWORDS
+    ]
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    """One retrieved chunk."""
+
+    source: str
+    page: int
+    score: float
+    text: str
+
+
+class DocumentIndex:
+    """
+    BM25 index of document chunks, stored as a compressed sparse matrix.
+
+    ``offsets[t]:offsets[t + 1]`` delimits the postings of term ``t`` in
+    ``chunk_ids`` and ``weights``, where each weight is the term's full BM25
+    contribution to the chunk's score, so scoring a query is a sum of slices.
+
+    Args:
+        vocabulary (dict[str, int]): Term to term id.
+        offsets (np.ndarray): Start of each term's postings, plus the end.
+        chunk_ids (np.ndarray): Chunk of each posting.
+        weights (np.ndarray): BM25 weight of each posting.
+        chunks (list[dict[str, Any]]): ``source``, ``page`` and ``text`` of
+            each chunk.
+    """
+
+    def __init__(
+        self,
+        vocabulary: dict[str, int],
+        offsets: np.ndarray,
+        chunk_ids: np.ndarray,
+        weights: np.ndarray,
+        chunks: list[dict[str, Any]],
+    ):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.chunk_ids = chunk_ids
+        self.weights = weights
+        self.chunks = chunks
+
+    @classmethod
+    def from_chunks(cls, chunks: list[dict[str, Any]]) -> "DocumentIndex":
+        """Build the index of chunks with ``source``, ``page`` and ``text``."""
+        term_counts = [Counter(tokenize(chunk["text"])) for chunk in chunks]
+        lengths = np.array([sum(counts.values()) for counts in term_counts])
+        average_length = max(float(lengths.mean()), 1.0) if len(chunks) else 1.0
+        norms = BM25_K1 * (1 - BM25_B + BM25_B * lengths / average_length)
+
+        postings: dict[str, list[tuple[int, int]]] = {}
+        for chunk_id, counts in enumerate(term_counts):
+            for term, count in counts.items():
+                postings.setdefault(term, []).append((chunk_id, count))
+        vocabulary = {term: i for i, term in enumerate(sorted(postings))}
+
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        chunk_ids = np.empty(sum(map(len, postings.values())), dtype=np.int32)
+        weights = np.empty(len(chunk_ids), dtype=np.float32)
+        position = 0
+        for term, term_id in vocabulary.items():
+            ids, counts = map(np.array, zip(*postings[term]))
+            idf = math.log(1 + (len(chunks) - len(ids) + 0.5) / (len(ids) + 0.5))
+            end = position + len(ids)
+            chunk_ids[position:end] = ids
+            weights[position:end] = idf * counts * (BM25_K1 + 1) / (counts + norms[ids])
+            offsets[term_id + 1] = position = end
+        return cls(vocabulary, offsets, chunk_ids, weights, chunks)
+
+    def save(self, index_dir: Path) -> None:
+        """Write the arrays as ``.npy`` files and the chunks as JSON."""
+        index_dir.mkdir(parents=True, exist_ok=True)
+        for name in ARRAYS:
+            np.save(index_dir / f"{name}.npy", getattr(self, name))
+        (index_dir / "vocabulary.json").write_text(json.dumps(list(self.vocabulary)))
+        (index_dir / "chunks.json").write_text(json.dumps(self.chunks))
+
+    @classmethod
+    def load(cls, index_dir: Path) -> "DocumentIndex":
+        """Load a saved index, memory-mapping its arrays."""
+        arrays = [np.load(index_dir / f"{name}.npy", mmap_mode="r") for name in ARRAYS]
+        terms = json.loads((index_dir / "vocabulary.json").read_text())
+        chunks = json.loads((index_dir / "chunks.json").read_text())
+        return cls({term: i for i, term in enumerate(terms)}, *arrays, chunks)
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K) -> list[SearchHit]:
+        """
+        Return the ``k`` chunks with the highest BM25 score for ``query``.
+
+        Chunks sharing no term with the query are never returned, so fewer
+        than ``k`` hits come back for queries with rare words.
+        """
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is not None:
+                start, end = self.offsets[term_id], self.offsets[term_id + 1]
+                # a term has at most one posting per chunk, so ids are unique
+                scores[self.chunk_ids[start:end]] += self.weights[start:end]
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [
+            SearchHit(
+                source=self.chunks[i]["source"],
+                page=self.chunks[i]["page"],
+                score=round(float(scores[i]), 4),
+                text=self.chunks[i]["text"],
+            )
+            for i in top
+        ]
+
+
+def build_index(
+    pdf_paths: Iterable[Path],
+    chunk_words: int = RETRIEVAL_CHUNK_WORDS,
+    overlap: int = RETRIEVAL_CHUNK_OVERLAP,
+) -> DocumentIndex:
+    """Extract, chunk and index PDFs."""
+    chunks = [
+        {"source": path.name, "page": page, "text": text}
+        for path in pdf_paths
+        for page, text in chunk_pages(extract_pages(path), chunk_words, overlap)
+    ]
+    return DocumentIndex.from_chunks(chunks)
+
+
+def load_or_build_index(
+    pdf_paths: Iterable[Path] = (PDF_PATH,),
+    index_dir: Path = RETRIEVAL_DIR,
+    chunk_words: int = RETRIEVAL_CHUNK_WORDS,
+    overlap: int = RETRIEVAL_CHUNK_OVERLAP,
+    rebuild: bool = False,
+) -> DocumentIndex:
+    """
+    Load the index of ``pdf_paths`` from ``index_dir``, building it if needed.
+
+    The manifest records the sha256 of every PDF and the chunking settings;
+    the index is rebuilt when any of them changed. The manifest is written
+    last, so an interrupted build is redone on the next load.
+
+    Args:
+        pdf_paths (Iterable[Path]): PDFs to index.
+        index_dir (Path): Directory the index is kept in.
+        chunk_words (int): Words per chunk.
+        overlap (int): Words shared by consecutive chunks of a page.
+        rebuild (bool): Rebuild even if the saved index is current.
+
+    Returns:
+        DocumentIndex: The index, its arrays memory-mapped.
+    """
+    pdf_paths = list(pdf_paths)
+    manifest = {
+        "format_version": INDEX_FORMAT_VERSION,
+        "sources": {str(path.resolve()): file_digest(path) for path in pdf_paths},
+        "chunk_words": chunk_words,
+        "overlap": overlap,
+    }
+    manifest_path = index_dir / "manifest.json"
+    try:
+        current = json.loads(manifest_path.read_text()) == manifest
+    except (FileNotFoundError, json.JSONDecodeError):
+        current = False
+    if rebuild or not current:
+        manifest_path.unlink(missing_ok=True)
+        build_index(pdf_paths, chunk_words, overlap).save(index_dir)
+        tmp_path = manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(manifest, indent=2))
+        os.replace(tmp_path, manifest_path)
+    return DocumentIndex.load(index_dir)
+
+
+def format_hits(hits: list[SearchHit]) -> str:
+    """Render hits for the model, each headed by its source and page."""
+    if not hits:
+        return "No matching passages found."
+    return "\n\n".join(
+        f"[{hit.source}, page {hit.page}, score {hit.score}]\n{hit.text}"
+        for hit in hits
+    )
+
+
+@cache
+def get_document_index() -> DocumentIndex:
+    """Return the process-wide index of the wealth PDF, built on first use."""
+    return load_or_build_index()
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("query")
+    parser.add_argument("--pdf", type=Path, nargs="+", default=[PDF_PATH])
+    parser.add_argument("--top-k", type=int, default=RETRIEVAL_TOP_K)
+    parser.add_argument("--index-dir", type=Path, default=RETRIEVAL_DIR)
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args(argv)
+
+    index = load_or_build_index(args.pdf, args.index_dir, rebuild=args.rebuild)
+    print(format_hits(index.search(args.query, args.top_k)))
+
+
+if __name__ == "__main__":
+    main()
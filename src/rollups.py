@@ -0,0 +1,261 @@
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Optional
+
+import duckdb
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+
+from src.sql_cache import strip_markdown
+
+# the column rolled up; every other rollup column is a dimension
+MEASURE = "amount"
+
+
+@dataclass(frozen=True)
+class Rollup:
+    """A pre-aggregated copy of the transactions table grouped by ``dimensions``."""
+
+    suffix: str
+    dimensions: tuple[str, ...]
+
+    def table_name(self, table_name: str) -> str:
+        return f"{table_name}_{self.suffix}_rollup"
+
+
+# smallest first, a query is served by the first rollup that covers it
+ROLLUPS = (
+    Rollup("yearly", ("account_id", "year", "type", "category")),
+    Rollup("monthly", ("account_id", "year", "month", "type", "category")),
+)
+
+
+def create_rollups(conn: duckdb.DuckDBPyConnection, table_name: str) -> None:
+    """
+    (Re)build the rollup tables of ``table_name``.
+
+    Each rollup keeps, per combination of its dimensions, the row count and
+    the count, sum, min and max of ``amount``, which is enough to answer
+    COUNT, SUM, MIN and MAX over any coarser grouping. Rows are sorted
+    by the dimensions, account first, so a query scoped to one account only
+    reads that account's row groups.
+    """
+    for rollup in ROLLUPS:
+        dimensions = ", ".join(rollup.dimensions)
+        conn.execute(
+            f"CREATE OR REPLACE TABLE {rollup.table_name(table_name)} AS "
+            f"SELECT {dimensions}, "
+            "COUNT(*) AS rollup_rows, "
+            f"COUNT({MEASURE}) AS rollup_count, "
+            f"SUM({MEASURE}) AS rollup_sum, "
+            f"MIN({MEASURE}) AS rollup_min, "
+            f"MAX({MEASURE}) AS rollup_max "
+            f"FROM {table_name} GROUP BY {dimensions} ORDER BY {dimensions}"
+        )
+
+
+def _in_scope(node: exp.Expression, select: exp.Select) -> bool:
+    return node.find_ancestor(exp.Select) is select
+
+
+def _aggregate(name: str, filter_: Optional[exp.Where]) -> exp.Expression:
+    aggregate = exp.Sum(this=exp.column(name))
+    if name == "rollup_min":
+        aggregate = exp.Min(this=exp.column(name))
+    elif name == "rollup_max":
+        aggregate = exp.Max(this=exp.column(name))
+    if filter_ is None:
+        return aggregate
+    return exp.Filter(this=aggregate, expression=filter_.copy())
+
+
+def _count(name: str, filter_: Optional[exp.Where]) -> exp.Expression:
+    summed = exp.func("COALESCE", _aggregate(name, filter_), exp.Literal.number(0))
+    return exp.cast(summed, "BIGINT")
+
+
+def _rewrite_aggregate(aggregate: exp.AggFunc) -> Optional[exp.Expression]:
+    """Return the rollup equivalent of one aggregate, or None if there is none."""
+    parent = aggregate.parent
+    filter_ = parent.expression if isinstance(parent, exp.Filter) else None
+    argument = aggregate.this
+    is_measure = isinstance(argument, exp.Column) and argument.name.lower() == MEASURE
+
+    if isinstance(aggregate, exp.Count):
+        if isinstance(argument, exp.Star) or (
+            isinstance(argument, exp.Literal) and not argument.is_string
+        ):
+            return _count("rollup_rows", filter_)
+        return _count("rollup_count", filter_) if is_measure else None
+    if not is_measure:
+        return None
+    if isinstance(aggregate, exp.Sum):
+        return _aggregate("rollup_sum", filter_)
+    if isinstance(aggregate, exp.Min):
+        return _aggregate("rollup_min", filter_)
+    if isinstance(aggregate, exp.Max):
+        return _aggregate("rollup_max", filter_)
+    # AVG rebuilt as SUM / COUNT rounds differently from the table's AVG, so
+    # it stays on the table
+    return None
+
+
+def _clause(node: exp.Expression, select: exp.Select) -> str:
+    """Name the clause of ``select`` a node is in, e.g. ``"where"``."""
+    while node.parent is not select:
+        node = node.parent
+    return node.arg_key
+
+
+def _rewrite_select(
+    select: exp.Select,
+    table_name: str,
+    output_names: Optional[list[str]],
+    columns: set[str],
+) -> bool:
+    """Point one SELECT at a rollup, in place, if it qualifies."""
+    from_ = select.args.get("from")
+    table = from_.this if from_ else None
+    if (
+        not isinstance(table, exp.Table)
+        or table.name.lower() != table_name
+        or table.args.get("db")
+        or select.args.get("joins")
+        or select.args.get("laterals")
+        or select.args.get("distinct")
+    ):
+        return False
+    if any(_in_scope(node, select) for node in select.find_all(exp.Window)):
+        return False
+    if any(node is not select for node in select.find_all(exp.Select)):
+        return False
+
+    aggregates = [a for a in select.find_all(exp.AggFunc) if _in_scope(a, select)]
+    if not aggregates:
+        return False
+
+    # columns outside the aggregated arguments must be dimensions, or aliases
+    # where an alias can stand for a projection
+    aliases = {e.alias.lower() for e in select.expressions if e.alias}
+    if aliases & columns:
+        # an alias shadowing a column means different things in different
+        # clauses, leave the query as written
+        return False
+    qualifiers = {table.name.lower(), table.alias_or_name.lower()}
+    aggregated = {
+        id(column) for a in aggregates for column in a.this.find_all(exp.Column)
+    }
+    used = set()
+    for column in select.find_all(exp.Column):
+        if column.table and column.table.lower() not in qualifiers:
+            return False
+        if id(column) in aggregated:
+            continue
+        name = column.name.lower()
+        if name in aliases and _clause(column, select) in ("group", "order", "having"):
+            continue
+        used.add(name)
+    if any(
+        isinstance(star, exp.Star) and not isinstance(star.parent, exp.Count)
+        for star in select.find_all(exp.Star)
+    ):
+        return False
+
+    rollup = next((r for r in ROLLUPS if used <= set(r.dimensions)), None)
+    if rollup is None:
+        return False
+    replacements = []
+    for aggregate in aggregates:
+        replacement = _rewrite_aggregate(aggregate)
+        if replacement is None:
+            return False
+        target = (
+            aggregate.parent if isinstance(aggregate.parent, exp.Filter) else aggregate
+        )
+        replacements.append((target, replacement))
+
+    # unaliased aggregates are named after their text, keep the original names
+    renamed = [
+        i
+        for i, projection in enumerate(select.expressions)
+        if not projection.alias and projection.find(exp.AggFunc)
+    ]
+    if renamed and (
+        output_names is None or len(output_names) != len(select.expressions)
+    ):
+        return False
+
+    for target, replacement in replacements:
+        target.replace(replacement)
+    for i in renamed:
+        projection = select.expressions[i]
+        projection.replace(exp.alias_(projection.copy(), output_names[i], quoted=True))
+    table.set("this", exp.to_identifier(rollup.table_name(table_name)))
+    return True
+
+
+def rewrite_for_rollups(
+    sql_query: str,
+    table_name: str,
+    output_names: Optional[list[str]] = None,
+    columns: Optional[Iterable[str]] = None,
+    dialect: str = "duckdb",
+) -> Optional[str]:
+    """
+    Rewrite a query to read from the rollup tables where it can.
+
+    A SELECT over ``table_name`` (in the outer query or any subquery)
+    qualifies when it has no joins or window functions, groups and filters
+    only on rollup dimensions (``year``, ``month``, ``type``, ``category``)
+    and only aggregates ``amount`` with SUM, COUNT, MIN or MAX (plain or with
+    a FILTER clause) or counts rows. Output aliases are only resolved in
+    GROUP BY, HAVING and ORDER BY, and a SELECT with an alias named like a
+    column of the table is left alone. Such a SELECT is pointed at the
+    smallest rollup that covers its dimensions, with each aggregate replaced
+    by its re-aggregation over the pre-aggregated rows, so it returns the same
+    result from a table that is orders of magnitude smaller. Unaliased
+    aggregates of the outer query are aliased to ``output_names``, the column
+    names of the original query, so the result keeps its column names; nested
+    queries with unaliased aggregates are left alone.
+
+    Example:
+        >>> rewrite_for_rollups(
+        ...     "SELECT month, SUM(amount) AS spend FROM transactions GROUP BY month",
+        ...     "transactions",
+        ... )
+        'SELECT month, SUM(rollup_sum) AS spend FROM transactions_monthly_rollup GROUP BY month'
+
+    Args:
+        sql_query (str): The SQL query to rewrite.
+        table_name (str): Name of the table the rollups were built from.
+        output_names (Optional[list[str]]): Column names of the original query.
+        columns (Optional[Iterable[str]]): Columns of ``table_name``, the
+            rollup dimensions and ``amount`` if None.
+        dialect (str): SQL dialect the query is written in.
+
+    Returns:
+        Optional[str]: The rewritten query, or None if no part of it qualifies.
+    """
+    try:
+        statements = sqlglot.parse(strip_markdown(sql_query), read=dialect)
+    except SqlglotError:
+        return None
+    statements = [s for s in statements if s is not None]
+    if len(statements) != 1 or not isinstance(statements[0], exp.Query):
+        return None
+    expression = statements[0]
+    table_name = table_name.lower()
+    if any(cte.alias.lower() == table_name for cte in expression.find_all(exp.CTE)):
+        # the name refers to the CTE, not the table the rollups describe
+        return None
+
+    known_columns = {MEASURE, *(d for rollup in ROLLUPS for d in rollup.dimensions)}
+    known_columns |= {column.lower() for column in columns or ()}
+    rewritten = False
+    for select in list(expression.find_all(exp.Select)):
+        names = output_names if select is expression else None
+        rewritten = (
+            _rewrite_select(select, table_name, names, known_columns) or rewritten
+        )
+    return expression.sql(dialect=dialect) if rewritten else None
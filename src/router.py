@@ -0,0 +1,131 @@
+import json
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from agents import Agent
+
+from configs.config import ROUTER_MIN_CONFIDENCE, ROUTING_EXAMPLES_PATH
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9&]+")
+
+
+def load_examples(filepath: Path = ROUTING_EXAMPLES_PATH) -> list[tuple[str, str]]:
+    """Read ``{"query", "agent"}`` JSONL records as (query, agent name) pairs."""
+    with filepath.open(encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return [(record["query"], record["agent"]) for record in records]
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased word unigrams and bigrams."""
+    words = TOKEN_PATTERN.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+@dataclass(frozen=True)
+class Route:
+    """The router's decision for one query."""
+
+    agent_name: Optional[str]
+    confidence: float
+    scores: dict[str, float]
+
+
+class QueryRouter:
+    """
+    TF-IDF nearest-centroid classifier that picks the specialist for a query.
+
+    Each labelled example is turned into an L2-normalised TF-IDF vector of its
+    word unigrams and bigrams, and each agent is represented by the normalised
+    mean of its examples. A query is scored by cosine similarity against every
+    agent; the confidence is the relative margin between the best and the
+    runner-up score, so queries that match no agent, or several equally, get
+    a low confidence and are left to the LLM triage agent.
+
+    Args:
+        examples (list[tuple[str, str]]): Labelled (query, agent name) pairs.
+        min_confidence (float): Confidence needed to dispatch directly.
+    """
+
+    def __init__(
+        self,
+        examples: list[tuple[str, str]],
+        min_confidence: float = ROUTER_MIN_CONFIDENCE,
+    ):
+        self.min_confidence = min_confidence
+        self.labels = sorted({agent for _, agent in examples})
+        documents = [Counter(tokenize(query)) for query, _ in examples]
+        document_frequency = Counter(term for doc in documents for term in doc)
+        self.vocabulary = {term: i for i, term in enumerate(sorted(document_frequency))}
+        n_documents = len(documents)
+        self.idf = np.array(
+            [
+                math.log((1 + n_documents) / (1 + document_frequency[term])) + 1
+                for term in self.vocabulary
+            ]
+        )
+
+        centroids = np.zeros((len(self.labels), len(self.vocabulary)))
+        for doc, (_, agent) in zip(documents, examples):
+            centroids[self.labels.index(agent)] += self._vectorize(doc)
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        self.centroids = centroids / np.where(norms == 0, 1, norms)
+
+    def _vectorize(self, terms: Counter[str]) -> np.ndarray:
+        vector = np.zeros(len(self.vocabulary))
+        for term, count in terms.items():
+            index = self.vocabulary.get(term)
+            if index is not None:
+                vector[index] = 1 + math.log(count)
+        vector *= self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def predict(self, query: str) -> Route:
+        """
+        Score a query against every agent.
+
+        Returns:
+            Route: The best agent and the confidence in it; ``agent_name`` is
+                None when the confidence is below ``min_confidence``.
+        """
+        scores = self.centroids @ self._vectorize(Counter(tokenize(query)))
+        ranked = np.argsort(scores)[::-1]
+        best, runner_up = scores[ranked[0]], scores[ranked[1]]
+        confidence = float((best - runner_up) / best) if best > 0 else 0.0
+        agent_name = (
+            self.labels[ranked[0]] if confidence >= self.min_confidence else None
+        )
+        return Route(
+            agent_name=agent_name,
+            confidence=round(confidence, 4),
+            scores={label: round(float(s), 4) for label, s in zip(self.labels, scores)},
+        )
+
+    def route(self, query: str, agents: dict[str, Agent], fallback: Agent) -> Agent:
+        """
+        Return the agent that should answer ``query``.
+
+        Args:
+            query (str): The user message.
+            agents (dict[str, Agent]): Agents the router may dispatch to, by name.
+            fallback (Agent): Agent used when the router is not confident,
+                normally the triage agent or the agent the conversation is with.
+
+        Returns:
+            Agent: The specialist for confident predictions, else ``fallback``.
+        """
+        route = self.predict(query)
+        return agents.get(route.agent_name, fallback) if route.agent_name else fallback
+
+
+@cache
+def get_router() -> QueryRouter:
+    """Return the process-wide router, trained on the shipped routing examples."""
+    return QueryRouter(load_examples())
@@ -0,0 +1,334 @@
+"""
+Serve the agent graph to many clients over WebSocket.
+
+Each connection is one conversation: it gets its own session and keeps the
+agent that answered last, as the interactive loop does, while the agent
+graph, the data engine and the model client are shared by every connection.
+A connection is bound to the account named in its URL, e.g.
+``ws://localhost:8765/?account_id=42`` (``DEFAULT_ACCOUNT_ID`` if omitted),
+and its data tools only see that account's transactions. The server does not
+authenticate clients; put it behind a proxy that checks the account.
+Queries of a connection are answered in order; queries of different
+connections run concurrently, at most ``SERVER_MAX_RUNS`` at a time. When
+``SERVER_MAX_QUEUED_RUNS`` queries are already waiting for a slot new ones
+are answered with a ``busy`` error, and connections beyond
+``SERVER_MAX_SESSIONS`` are refused with HTTP 503, so clients back off
+instead of piling up latency.
+
+Messages are JSON. On connect the server sends ``{"session_id", "account_id"}``, then
+answers every ``{"query": ..., "id": ...}`` with ``{"id", "agent", "output",
+"queue_ms", "latency_ms"}`` or ``{"id", "error"}``. A query sent with
+``"stream": true`` is run with the streamed runner: the answer's tokens, tool
+calls and handoffs are sent as they happen, as ``{"id", "type", ...}``
+messages (see ``src.streaming``), before the usual reply, which then also
+carries ``ttft_ms``. ``GET /health`` returns the server's counters.
+
+    uv run python -m src.server
+    uv run python -m src.server --fake-model --fake-latency 0.5 --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from agents import Agent, RunConfig, set_default_openai_client
+from dotenv import load_dotenv
+from websockets.asyncio.server import Server, ServerConnection, serve
+from websockets.exceptions import ConnectionClosed
+from websockets.http11 import Request, Response
+
+from configs.config import (
+    DEFAULT_ACCOUNT_ID,
+    METRICS_ENABLED,
+    SERVER_HOST,
+    SERVER_MAX_QUEUED_RUNS,
+    SERVER_MAX_RUNS,
+    SERVER_MAX_SESSIONS,
+    SERVER_PORT,
+    USE_LOCAL_ROUTER,
+    get_async_client,
+)
+from src.accounts import AccountContext
+from src.agent import (
+    OFFLINE_VECTOR_STORE_ID,
+    AgentGraph,
+    agent_execution,
+    build_agent_graph,
+    create_session,
+    get_agent_graph,
+    instrument_graph,
+)
+from src.engine import get_engine
+from src.fake_model import FakeModel, FakeModelProvider
+from src.metrics import get_metrics
+from src.router import QueryRouter, get_router
+from src.streaming import StreamedRun
+
+
+def account_from_path(path: str) -> int:
+    """
+    Return the account a connection asks for with ``?account_id=``.
+
+    Raises:
+        ValueError: If the account id is not a positive integer.
+    """
+    values = parse_qs(urlsplit(path).query).get("account_id")
+    if not values:
+        return DEFAULT_ACCOUNT_ID
+    account_id = int(values[0])
+    if account_id < 1:
+        raise ValueError(f"invalid account id {account_id}")
+    return account_id
+
+
+class AgentServer:
+    """
+    WebSocket front end running one conversation per connection.
+
+    Args:
+        graph (AgentGraph): Agents shared by every connection.
+        run_config (Optional[RunConfig]): Run configuration for every query.
+        router (Optional[QueryRouter]): Local router tried before the agent
+            the conversation is with, as in ``src/main.py``.
+        session_db (Optional[Path]): SQLite file for sessions, in-memory if None.
+        max_sessions (int): Connections served at once.
+        max_runs (int): Agent runs in flight at once.
+        max_queued_runs (int): Queries allowed to wait for a free run slot.
+    """
+
+    def __init__(
+        self,
+        graph: AgentGraph,
+        run_config: Optional[RunConfig] = None,
+        router: Optional[QueryRouter] = None,
+        session_db: Optional[Path] = None,
+        max_sessions: int = SERVER_MAX_SESSIONS,
+        max_runs: int = SERVER_MAX_RUNS,
+        max_queued_runs: int = SERVER_MAX_QUEUED_RUNS,
+    ):
+        self.graph = graph
+        self.agents = {agent.name: agent for agent in graph.agents()}
+        self.run_config = run_config
+        self.router = router
+        self.session_db = session_db
+        self.max_sessions = max_sessions
+        self.max_queued_runs = max_queued_runs
+        self.sessions = 0
+        self.queued_runs = 0
+        self.counters: Counter[str] = Counter()
+        self._run_slots = asyncio.Semaphore(max_runs)
+
+    def status(self) -> dict[str, Any]:
+        """Current load and lifetime counters of the server."""
+        return {
+            "sessions": self.sessions,
+            "queued_runs": self.queued_runs,
+            **self.counters,
+        }
+
+    def process_request(
+        self, connection: ServerConnection, request: Request
+    ) -> Optional[Response]:
+        """Answer health checks, refuse bad accounts and connections over capacity."""
+        if request.path == "/health":
+            return connection.respond(HTTPStatus.OK, json.dumps(self.status()) + "\n")
+        try:
+            account_from_path(request.path)
+        except ValueError:
+            return connection.respond(
+                HTTPStatus.BAD_REQUEST, "account_id must be a positive integer\n"
+            )
+        if self.sessions >= self.max_sessions:
+            self.counters["refused_sessions"] += 1
+            return connection.respond(
+                HTTPStatus.SERVICE_UNAVAILABLE, "server at capacity, retry later\n"
+            )
+        return None
+
+    async def answer(
+        self,
+        agent: Agent,
+        query: str,
+        session: Any,
+        account: AccountContext,
+        send: Optional[Callable[[dict[str, Any]], Awaitable[None]]] = None,
+    ) -> tuple[Agent, dict[str, Any]]:
+        """
+        Run one query of a conversation once a run slot is free.
+
+        Args:
+            agent (Agent): Agent the conversation is currently with.
+            query (str): The user message.
+            session: The conversation's session.
+            account (AccountContext): The account the conversation is bound to.
+            send (Optional[Callable]): Stream the run, passing each token, tool
+                and handoff event to ``send`` as it happens.
+
+        Returns:
+            tuple[Agent, dict]: The agent to continue with and the reply.
+        """
+        if self._run_slots.locked() and self.queued_runs >= self.max_queued_runs:
+            self.counters["busy_queries"] += 1
+            return agent, {"error": "server busy, retry later", "busy": True}
+
+        queued_at = time.perf_counter()
+        self.queued_runs += 1
+        try:
+            await self._run_slots.acquire()
+        finally:
+            self.queued_runs -= 1
+        try:
+            started_at = time.perf_counter()
+            if self.router is not None:
+                agent = self.router.route(query, self.agents, fallback=agent)
+            try:
+                if send is None:
+                    response = await agent_execution(
+                        agent,
+                        query,
+                        session=session,
+                        run_config=self.run_config,
+                        context=account,
+                    )
+                    last_agent, output = response.last_agent, response.final_output
+                else:
+                    run = StreamedRun(
+                        agent,
+                        query,
+                        session=session,
+                        run_config=self.run_config,
+                        context=account,
+                    )
+                    async for event in run.events():
+                        if event["type"] != "done":
+                            await send(event)
+                    last_agent, output = run.last_agent, run.final_output
+            except Exception as e:
+                self.counters["failed_queries"] += 1
+                return agent, {"agent": agent.name, "error": repr(e)}
+            self.counters["answered_queries"] += 1
+            reply = {
+                "agent": last_agent.name,
+                "output": str(output),
+                "queue_ms": round((started_at - queued_at) * 1000, 3),
+                "latency_ms": round((time.perf_counter() - started_at) * 1000, 3),
+            }
+            if send is not None:
+                self.counters["streamed_queries"] += 1
+                reply["ttft_ms"] = (
+                    None if run.ttft_ms is None else round(run.ttft_ms, 3)
+                )
+            return last_agent, reply
+        finally:
+            self._run_slots.release()
+
+    async def handle(self, connection: ServerConnection) -> None:
+        """Serve one conversation until the client disconnects."""
+        session_id = uuid.uuid4().hex
+        session_kwargs = {"db_path": self.session_db} if self.session_db else {}
+        session = create_session(session_id, **session_kwargs)
+        account = AccountContext(account_from_path(connection.request.path))
+        cur_agent = self.graph.triage_agent
+        self.sessions += 1
+        self.counters["sessions_opened"] += 1
+        try:
+            await connection.send(
+                json.dumps({"session_id": session_id, "account_id": account.account_id})
+            )
+            async for message in connection:
+                try:
+                    request = json.loads(message)
+                    query = request["query"]
+                except (ValueError, KeyError, TypeError):
+                    await connection.send(
+                        json.dumps({"error": 'expected {"query": "...", "id": ...}'})
+                    )
+                    continue
+                send = None
+                if request.get("stream"):
+
+                    async def send(event: dict[str, Any], id=request.get("id")) -> None:
+                        await connection.send(json.dumps({"id": id, **event}))
+
+                cur_agent, reply = await self.answer(
+                    cur_agent, str(query), session, account, send
+                )
+                await connection.send(json.dumps({"id": request.get("id"), **reply}))
+        except ConnectionClosed:
+            pass
+        finally:
+            self.sessions -= 1
+            session.close()
+
+    def serve(self, host: str = SERVER_HOST, port: int = SERVER_PORT) -> serve:
+        """
+        Return the WebSocket server, to be used as an async context manager.
+
+        Example:
+            >>> async with AgentServer(graph).serve("localhost", 8765) as server:
+            ...     await server.serve_forever()
+        """
+        return serve(self.handle, host, port, process_request=self.process_request)
+
+
+def listening_port(server: Server) -> int:
+    """Return the port a started server listens on, e.g. when started on port 0."""
+    return server.sockets[0].getsockname()[1]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--session-db", type=Path, default=None)
+    parser.add_argument(
+        "--fake-model", action="store_true", help="use the local fake model provider"
+    )
+    parser.add_argument(
+        "--fake-latency", type=float, default=0.0, help="seconds per fake model call"
+    )
+    args = parser.parse_args()
+
+    run_config = None
+    if args.fake_model:
+        run_config = RunConfig(tracing_disabled=True)
+        graph = build_agent_graph(
+            OFFLINE_VECTOR_STORE_ID,
+            model_provider=FakeModelProvider(FakeModel(latency=args.fake_latency)),
+        )
+        if METRICS_ENABLED:
+            instrument_graph(graph)
+    else:
+        # every run's model provider picks up this pooled client
+        set_default_openai_client(get_async_client())
+        graph = get_agent_graph()
+    # load the transactions once up front so the first tool call is fast
+    get_engine()
+
+    agent_server = AgentServer(
+        graph,
+        run_config=run_config,
+        router=get_router() if USE_LOCAL_ROUTER else None,
+        session_db=args.session_db,
+    )
+    try:
+        async with agent_server.serve(args.host, args.port) as server:
+            print(
+                f"serving the agent graph on ws://{args.host}:{listening_port(server)}"
+            )
+            await server.serve_forever()
+    finally:
+        get_metrics().flush()
+
+
+if __name__ == "__main__":
+    _ = load_dotenv(override=True)
+    asyncio.run(main())
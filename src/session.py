@@ -0,0 +1,243 @@
+import asyncio
+import copy
+import json
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+from agents import SQLiteSession, TResponseInputItem
+
+from configs.config import (
+    SESSION_FLUSH_TURNS,
+    SESSION_KEEP_TURNS,
+    SESSION_MAX_TOKENS,
+    SESSION_TOOL_OUTPUT_CHARS,
+)
+
+
+def item_tokens(item: TResponseInputItem) -> int:
+    """Rough token count (~4 characters per token) of a stored item."""
+    return max(1, len(json.dumps(item)) // 4)
+
+
+def is_user_message(item: TResponseInputItem) -> bool:
+    return isinstance(item, dict) and item.get("role") == "user"
+
+
+def compact_item(
+    item: TResponseInputItem, max_chars: int
+) -> Optional[TResponseInputItem]:
+    """
+    Return a shortened copy of a bulky tool item, or None if it is small enough.
+
+    Function outputs (SQL tables, sub-agent answers) keep their first
+    ``max_chars`` characters, which hold the table header and first rows,
+    followed by a note of how much was dropped. File search results are
+    dropped, keeping the queries that produced them.
+    """
+    if not isinstance(item, dict):
+        return None
+    if item.get("type") == "function_call_output":
+        output = item.get("output")
+        if not isinstance(output, str) or len(output) <= max_chars:
+            return None
+        compacted = dict(item)
+        compacted["output"] = (
+            f"{output[:max_chars]}\n[... {len(output) - max_chars} more characters "
+            "of this earlier tool output were compacted]"
+        )
+        return compacted
+    if item.get("type") == "file_search_call" and item.get("results"):
+        compacted = copy.deepcopy(item)
+        compacted["results"] = None
+        return compacted
+    return None
+
+
+class CompactingSession(SQLiteSession):
+    """
+    SQLite session that keeps the conversation history within a token budget.
+
+    After every turn the history is compacted: tool outputs older than the
+    last ``keep_turns`` user turns are cut down to a short preview, and the
+    oldest whole turns (a user message and everything up to the next one) are
+    dropped until the history fits in ``max_tokens``. Whole turns are dropped
+    so function calls always stay paired with their outputs. The compacted
+    history is what is stored, so the database stays bounded too.
+
+    The history is kept in memory after the first read, and writes (new
+    items, compactions and deletions) are queued and committed in a single
+    transaction every ``flush_turns`` turns, on ``flush`` and on
+    ``close``. The file database runs in WAL mode with ``synchronous=NORMAL``,
+    so commits do not wait for a full fsync. Only one live session object
+    should use a given session id at a time.
+
+    Args:
+        session_id (str): Unique identifier of the conversation.
+        db_path (str | Path): SQLite file, in-memory by default.
+        max_tokens (int): Approximate token budget of the stored history.
+        keep_turns (int): Most recent turns whose tool outputs are kept whole.
+        tool_output_chars (int): Characters kept of older tool outputs.
+        flush_turns (int): Turns whose changes are written together.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        db_path: str | Path = ":memory:",
+        max_tokens: int = SESSION_MAX_TOKENS,
+        keep_turns: int = SESSION_KEEP_TURNS,
+        tool_output_chars: int = SESSION_TOOL_OUTPUT_CHARS,
+        flush_turns: int = SESSION_FLUSH_TURNS,
+        **kwargs: Any,
+    ):
+        super().__init__(session_id, db_path=db_path, **kwargs)
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.tool_output_chars = tool_output_chars
+        self.flush_turns = flush_turns
+        self._unflushed_turns = 0
+        self.flushes = 0
+        # [row id (None until written), item] of the stored history
+        self._items: Optional[list[list[Any]]] = None
+        self._pending_updates: dict[int, TResponseInputItem] = {}
+        self._pending_deletes: set[int] = set()
+        self._state_lock = threading.Lock()
+
+    def _get_connection(self):
+        conn = super()._get_connection()
+        if not getattr(self._local, "tuned", False):
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.tuned = True
+        return conn
+
+    def _load_sync(self) -> list[list[Any]]:
+        if self._items is None:
+            conn = self._get_connection()
+            with self._lock:
+                rows = conn.execute(
+                    f"SELECT id, message_data FROM {self.messages_table} "
+                    "WHERE session_id = ? ORDER BY id ASC",
+                    (self.session_id,),
+                ).fetchall()
+            self._items = [[row_id, json.loads(data)] for row_id, data in rows]
+        return self._items
+
+    def _pending(self) -> int:
+        new = sum(row_id is None for row_id, _ in self._items or [])
+        return new + len(self._pending_updates) + len(self._pending_deletes)
+
+    def _compact(self) -> None:
+        """Compact the in-memory history and queue the resulting writes."""
+        items = self._items
+        turn_starts = [i for i, (_, item) in enumerate(items) if is_user_message(item)]
+        if not turn_starts or turn_starts[0] != 0:
+            turn_starts.insert(0, 0)
+
+        # shorten tool outputs of all but the most recent turns
+        recent_start = turn_starts[max(0, len(turn_starts) - max(1, self.keep_turns))]
+        for row in items[:recent_start]:
+            compacted = compact_item(row[1], self.tool_output_chars)
+            if compacted is not None:
+                row[1] = compacted
+                if row[0] is not None:
+                    self._pending_updates[row[0]] = compacted
+
+        # drop the oldest turns until the history fits, always keeping the last
+        total = sum(item_tokens(item) for _, item in items)
+        drop_until = 0
+        for start, end in zip(turn_starts, turn_starts[1:]):
+            if total <= self.max_tokens:
+                break
+            total -= sum(item_tokens(item) for _, item in items[start:end])
+            drop_until = end
+        for row_id, _ in items[:drop_until]:
+            if row_id is not None:
+                self._pending_updates.pop(row_id, None)
+                self._pending_deletes.add(row_id)
+        del items[:drop_until]
+
+    def _flush_sync(self) -> None:
+        with self._state_lock:
+            if self._items is None or not self._pending():
+                return
+            conn = self._get_connection()
+            with self._lock:
+                conn.execute(
+                    f"INSERT OR IGNORE INTO {self.sessions_table} (session_id) VALUES (?)",
+                    (self.session_id,),
+                )
+                conn.executemany(
+                    f"DELETE FROM {self.messages_table} WHERE id = ?",
+                    [(row_id,) for row_id in self._pending_deletes],
+                )
+                conn.executemany(
+                    f"UPDATE {self.messages_table} SET message_data = ? WHERE id = ?",
+                    [
+                        (json.dumps(item), row_id)
+                        for row_id, item in self._pending_updates.items()
+                    ],
+                )
+                for row in self._items:
+                    if row[0] is None:
+                        row[0] = conn.execute(
+                            f"INSERT INTO {self.messages_table} "
+                            "(session_id, message_data) VALUES (?, ?)",
+                            (self.session_id, json.dumps(row[1])),
+                        ).lastrowid
+                conn.execute(
+                    f"UPDATE {self.sessions_table} SET updated_at = CURRENT_TIMESTAMP "
+                    "WHERE session_id = ?",
+                    (self.session_id,),
+                )
+                conn.commit()
+            self._pending_updates.clear()
+            self._pending_deletes.clear()
+            self._unflushed_turns = 0
+            self.flushes += 1
+
+    async def get_items(self, limit: int | None = None) -> list[TResponseInputItem]:
+        if self._items is None:
+            await asyncio.to_thread(self._load_sync)
+        with self._state_lock:
+            items = [item for _, item in self._items]
+        return items if limit is None else items[-limit:] if limit > 0 else []
+
+    async def add_items(self, items: list[TResponseInputItem]) -> None:
+        if not items:
+            return
+        if self._items is None:
+            await asyncio.to_thread(self._load_sync)
+        with self._state_lock:
+            self._items.extend([None, item] for item in items)
+            self._compact()
+            self._unflushed_turns += 1
+            should_flush = self._unflushed_turns >= self.flush_turns
+        if should_flush:
+            await asyncio.to_thread(self._flush_sync)
+
+    async def flush(self) -> None:
+        """Write every pending change to the database."""
+        await asyncio.to_thread(self._flush_sync)
+
+    async def pop_item(self) -> TResponseInputItem | None:
+        await self.flush()
+        item = await super().pop_item()
+        self._items = None
+        return item
+
+    async def clear_session(self) -> None:
+        with self._state_lock:
+            self._items = []
+            self._pending_updates.clear()
+            self._pending_deletes.clear()
+        await super().clear_session()
+
+    def token_count(self) -> int:
+        """Approximate tokens of the history that is sent with the next turn."""
+        with self._state_lock:
+            return sum(item_tokens(item) for _, item in self._items or [])
+
+    def close(self) -> None:
+        self._flush_sync()
+        super().close()
@@ -0,0 +1,130 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+from sqlglot.optimizer.normalize_identifiers import normalize_identifiers
+
+from configs.config import SQL_CACHE_MAX_BYTES, SQL_CACHE_MAX_ENTRIES
+
+
+def strip_markdown(sql_query: str) -> str:
+    """Remove markdown code fences the model sometimes wraps SQL in."""
+    return sql_query.strip().replace("```sql", "").replace("```", "").strip()
+
+
+def normalize_sql(sql_query: str, dialect: str = "duckdb") -> Optional[str]:
+    """
+    Return the canonical form of a read-only query, or None if it is not one.
+
+    The query is parsed with sqlglot, identifiers (including aliases) are
+    normalized to DuckDB's case-insensitive form, comments are dropped and the
+    query is re-rendered, so whitespace, casing and markdown fences do not
+    change the result. Statements that are not a single query (DDL, DML,
+    multiple statements) and unparseable SQL return None and are never cached.
+
+    Example:
+        >>> normalize_sql("```sql\\nselect SUM(Amount) as Total from transactions\\n```")
+        'SELECT SUM(amount) AS total FROM transactions'
+    """
+    try:
+        statements = sqlglot.parse(strip_markdown(sql_query), read=dialect)
+    except SqlglotError:
+        return None
+    statements = [s for s in statements if s is not None]
+    if len(statements) != 1 or not isinstance(statements[0], exp.Query):
+        return None
+    expression = normalize_identifiers(statements[0], dialect=dialect)
+    return expression.sql(dialect=dialect, normalize=True, comments=False)
+
+
+class SQLResultCache:
+    """
+    LRU cache of rendered query results keyed on their canonical SQL.
+
+    Entries are evicted least-recently-used first once either the entry count
+    or the total size of the cached results exceeds its limit. The cache is
+    tied to a data version: looking up a newer version drops every entry, so
+    results never outlive the data they were computed from.
+
+    Args:
+        max_entries (int): Maximum number of cached results.
+        max_bytes (int): Maximum total size of the cached results.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SQL_CACHE_MAX_ENTRIES,
+        max_bytes: int = SQL_CACHE_MAX_BYTES,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # canonical SQL -> (rendered result, size in bytes)
+        self._entries: OrderedDict[str, tuple[str, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _check_version(self, version: int) -> None:
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self.version = version
+
+    def get(self, sql_query: str, version: int) -> Optional[str]:
+        """Return the cached result of ``sql_query`` on data ``version``, if any."""
+        key = normalize_sql(sql_query)
+        with self._lock:
+            self._check_version(version)
+            if key is None or key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def put(self, sql_query: str, version: int, result: str) -> None:
+        """Cache the result of ``sql_query`` computed on data ``version``."""
+        key = normalize_sql(sql_query)
+        size = len(result.encode())
+        if key is None or size > self.max_bytes:
+            return
+        with self._lock:
+            if version != self.version:
+                # computed on data that has since been replaced
+                return
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (result, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def stats(self) -> dict[str, int | float]:
+        """Return the hit/miss counters and current size, for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
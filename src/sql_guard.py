@@ -0,0 +1,404 @@
+import json
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import duckdb
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+
+from configs.config import (
+    SQL_AUTO_LIMIT,
+    SQL_MAX_JOIN_ROWS,
+    SQL_MAX_PLAN_ROWS,
+    SQL_READ_ONLY,
+)
+from src.sql_cache import strip_markdown
+
+# DuckDB operators pairing every row of one input with every row of the other
+CROSS_OPERATORS = frozenset({"CROSS_PRODUCT", "NESTED_LOOP_JOIN", "BLOCKWISE_NL_JOIN"})
+# table functions a read-only query may use: they generate rows and read nothing
+TABLE_FUNCTIONS = frozenset({"range", "generate_series", "unnest"})
+
+
+class QueryRejectedError(ValueError):
+    """
+    Raised when a query is refused before it runs, or stopped by a limit.
+
+    The message is one line the agent can act on: the ``code`` of the check
+    that failed, what it found and how to fix the query.
+    """
+
+    def __init__(self, code: str, reason: str, fix: str):
+        self.code = code
+        self.reason = reason
+        self.fix = fix
+        super().__init__(f"query rejected ({code}): {reason}. Fix: {fix}.")
+
+
+@dataclass(frozen=True)
+class PlanEstimate:
+    """DuckDB's estimates for a query plan, in rows."""
+
+    # rows the query returns
+    rows: int
+    # rows produced by all of the plan's operators together
+    total_rows: int
+    # rows produced by the largest join
+    join_rows: int
+    # whether that join pairs every row of its inputs
+    cross_join: bool
+
+
+@dataclass(frozen=True)
+class GuardedQuery:
+    """A query that passed the guard, with the LIMIT it added, if any."""
+
+    sql: str
+    limit: Optional[int] = None
+    estimate: Optional[PlanEstimate] = None
+
+    def note(self) -> str:
+        """Tell the agent its result was cut short by an added LIMIT."""
+        if self.limit is None:
+            return ""
+        return (
+            f"\nNote: the query had no LIMIT and would return about "
+            f"{self.estimate.rows:,} rows, so LIMIT {self.limit} was added."
+        )
+
+
+def _join_rows(
+    conditions: str | list[str], inputs: list[int], distinct_counts: dict[str, int]
+) -> Optional[int]:
+    """
+    Estimate an equi-join's rows from the distinct counts of its keys.
+
+    Each equality between columns whose distinct count is known divides the
+    product of the inputs by the larger count, as if keys were uniformly
+    spread; None if no condition names a known column.
+    """
+    if isinstance(conditions, str):
+        conditions = [conditions]
+    rows = 1
+    for child in inputs:
+        rows *= child
+    known = False
+    for condition in conditions:
+        left, op, right = condition.partition(" = ")
+        counts = [distinct_counts[c] for c in (left, right) if c in distinct_counts]
+        if op and counts:
+            rows //= max(1, *counts)
+            known = True
+    return max(rows, 1) if known else None
+
+
+def _node_rows(
+    node: dict[str, Any], inputs: list[int], distinct_counts: dict[str, int]
+) -> int:
+    info = node.get("extra_info", {})
+    estimate = info.get("Estimated Cardinality")
+    if node["name"].strip() == "PROJECTION" and inputs and not int(estimate or 0):
+        # a projection keeps its input's rows, but the one DuckDB adds to
+        # decompress columns after an ORDER BY is estimated at 0
+        return inputs[0]
+    if "Conditions" in info and distinct_counts:
+        # DuckDB has no column statistics for Parquet views and estimates a
+        # join as no larger than its inputs, missing key fan-out
+        join_rows = _join_rows(info["Conditions"], inputs, distinct_counts)
+        if join_rows is not None:
+            return max(join_rows, int(estimate or 0))
+    if estimate is not None:
+        return int(estimate)
+    if node["name"].strip() in CROSS_OPERATORS:
+        rows = 1
+        for child in inputs:
+            rows *= child
+        return rows
+    return max(inputs, default=0)
+
+
+def estimate_plan(
+    cursor: duckdb.DuckDBPyConnection,
+    sql_query: str,
+    distinct_counts: Optional[dict[str, int]] = None,
+) -> PlanEstimate:
+    """
+    Estimate the rows a query returns and produces, without running it.
+
+    Reads DuckDB's ``EXPLAIN (FORMAT JSON)`` plan, which carries the
+    optimiser's cardinality estimate of most operators; a cross product has
+    none and is taken to produce the product of its inputs. Equi-joins on
+    columns in ``distinct_counts`` are estimated from the key counts when
+    that gives more rows than DuckDB's estimate.
+
+    Raises:
+        duckdb.Error: If DuckDB cannot plan the query.
+    """
+    plan = json.loads(
+        cursor.execute(f"EXPLAIN (FORMAT JSON)\n{sql_query}").fetchall()[0][1]
+    )
+    total_rows = 0
+    join_rows = 0
+    cross_join = False
+
+    def walk(node: dict[str, Any]) -> int:
+        nonlocal total_rows, join_rows, cross_join
+        inputs = [walk(child) for child in node["children"]]
+        rows = _node_rows(node, inputs, distinct_counts or {})
+        total_rows += rows
+        name = node["name"].strip()
+        if (name in CROSS_OPERATORS or "JOIN" in name) and rows > join_rows:
+            join_rows = rows
+            cross_join = name in CROSS_OPERATORS
+        return rows
+
+    rows = sum(walk(node) for node in plan)
+    return PlanEstimate(rows, total_rows, join_rows, cross_join)
+
+
+def table_sources(cursor: duckdb.DuckDBPyConnection, sql_query: str) -> list[str]:
+    """
+    List the table functions and file paths a query reads from.
+
+    Walks the statement tree of DuckDB's own parser (``json_serialize_sql``),
+    so sources nested in subqueries, CTEs and joins are found too; a quoted
+    table name holding a ``.``, ``/`` or ``*`` is a file DuckDB would scan.
+
+    Example:
+        >>> table_sources(cursor, "SELECT * FROM read_csv('a.csv'), 'b.json'")
+        ['read_csv', 'b.json']
+    """
+    tree = json.loads(
+        cursor.execute("SELECT json_serialize_sql(?)", [sql_query]).fetchone()[0]
+    )
+    sources = []
+
+    def walk(node: Any) -> None:
+        if isinstance(node, list):
+            for child in node:
+                walk(child)
+        elif isinstance(node, dict):
+            if node.get("type") == "TABLE_FUNCTION":
+                sources.append(node["function"]["function_name"])
+            elif node.get("type") == "BASE_TABLE" and any(
+                c in node["table_name"] for c in "./*"
+            ):
+                sources.append(node["table_name"])
+            for child in node.values():
+                walk(child)
+
+    walk(tree.get("statements", []))
+    return sources
+
+
+def add_limit(sql_query: str, limit: int, dialect: str = "duckdb") -> str:
+    """
+    Add a LIMIT to the outer query.
+
+    Example:
+        >>> add_limit("SELECT * FROM transactions ORDER BY date", 100)
+        'SELECT * FROM transactions ORDER BY date LIMIT 100'
+    """
+    query = sqlglot.parse_one(strip_markdown(sql_query), read=dialect)
+    return query.limit(limit).sql(dialect=dialect)
+
+
+def _is_bounded(query: exp.Query) -> bool:
+    """Whether a query returns few rows whatever the data, without planning it."""
+    if query.find(exp.Join, exp.Unnest) is not None or any(
+        # a table function such as range() can produce any number of rows
+        not isinstance(table.this, exp.Identifier)
+        for table in query.find_all(exp.Table)
+    ):
+        return False
+    if query.args.get("limit") is not None:
+        return True
+    return (
+        isinstance(query, exp.Select)
+        and query.args.get("group") is None
+        and any(e.find(exp.AggFunc) for e in query.expressions)
+    )
+
+
+class SQLGuard:
+    """
+    Checks agent-written SQL before it runs, rewriting or rejecting it.
+
+    A query has to be a single SELECT, as DuckDB's own parser reads it, when
+    ``read_only`` is set, and may not read files: table functions other than
+    ``TABLE_FUNCTIONS`` (``read_csv``, ``read_json``, ``read_parquet``,
+    ``glob``, ``query``, ...) and quoted file paths are rejected. Unless
+    sqlglot shows it cannot return many rows (no joins or table functions,
+    and a LIMIT or a single aggregate row), the query is then planned with
+    ``EXPLAIN``, which binds it without reading any data, and rejected when
+    the optimiser's estimates (with equi-joins re-estimated from the table's
+    distinct counts) exceed a limit: a join producing more than
+    ``max_join_rows`` rows (typically a missing join condition) or a plan
+    producing more than ``max_plan_rows`` rows across its operators, a proxy
+    for the CPU time it would take. DuckDB has no per-query CPU limit,
+    so that estimate is the CPU budget; the engine running the query adds a
+    wall-clock timeout and a memory limit. A query without a LIMIT that is
+    estimated to return more than ``auto_limit`` rows gets that LIMIT. Each
+    rejection is a ``QueryRejectedError`` naming the check and the fix, so
+    the agent can correct the query without running it again.
+
+    Args:
+        read_only (bool): Reject anything but a single SELECT.
+        auto_limit (Optional[int]): LIMIT added to large unbounded results,
+            None to leave them alone.
+        max_join_rows (Optional[int]): Estimated rows a join may produce,
+            None for no limit.
+        max_plan_rows (Optional[int]): Estimated rows all operators may
+            produce together, None for no limit.
+    """
+
+    def __init__(
+        self,
+        read_only: bool = SQL_READ_ONLY,
+        auto_limit: Optional[int] = SQL_AUTO_LIMIT,
+        max_join_rows: Optional[int] = SQL_MAX_JOIN_ROWS,
+        max_plan_rows: Optional[int] = SQL_MAX_PLAN_ROWS,
+    ):
+        self.read_only = read_only
+        self.auto_limit = auto_limit
+        self.max_join_rows = max_join_rows
+        self.max_plan_rows = max_plan_rows
+        self.checks = 0
+        self.explained = 0
+        self.limits_added = 0
+        self.rejections: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def _reject(self, code: str, reason: str, fix: str) -> QueryRejectedError:
+        with self._lock:
+            self.rejections[code] += 1
+        return QueryRejectedError(code, reason, fix)
+
+    def check(
+        self,
+        cursor: duckdb.DuckDBPyConnection,
+        sql_query: str,
+        planned_sql: Optional[str] = None,
+        distinct_counts: Optional[dict[str, int]] = None,
+        dialect: str = "duckdb",
+    ) -> GuardedQuery:
+        """
+        Check a query and return the SQL to run.
+
+        Args:
+            cursor (duckdb.DuckDBPyConnection): Cursor on the database the
+                query runs against, used to parse and plan it.
+            sql_query (str): The query, markdown fences allowed.
+            planned_sql (Optional[str]): What actually runs, e.g. the query
+                scoped to an account, if it differs from ``sql_query``.
+            distinct_counts (Optional[dict[str, int]]): Distinct values per
+                column of the table, to estimate joins with.
+            dialect (str): SQL dialect of the query.
+
+        Returns:
+            GuardedQuery: ``sql_query``, with a LIMIT added if it needed one.
+
+        Raises:
+            QueryRejectedError: If the query fails a check.
+            duckdb.Error: If DuckDB cannot parse or plan the query.
+        """
+        with self._lock:
+            self.checks += 1
+        sql_query = strip_markdown(sql_query)
+        statements = cursor.extract_statements(sql_query)
+        if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+            if not self.read_only:
+                # only queries have a plan to check
+                return GuardedQuery(sql_query)
+            if len(statements) != 1:
+                raise self._reject(
+                    "read_only",
+                    f"got {len(statements)} statements, only one SELECT can run",
+                    "send a single SELECT query per call",
+                )
+            raise self._reject(
+                "read_only",
+                f"got a {statements[0].type.name} statement, the data is read-only",
+                "query the data with a single SELECT",
+            )
+        if self.read_only:
+            sources = [
+                source
+                for source in table_sources(cursor, sql_query)
+                if source.lower() not in TABLE_FUNCTIONS
+            ]
+            if sources:
+                raise self._reject(
+                    "table_function",
+                    f"the query reads {', '.join(sources)}, only tables can be read",
+                    "select from the transactions table or its rollups",
+                )
+
+        if (
+            self.auto_limit is None
+            and self.max_join_rows is None
+            and self.max_plan_rows is None
+        ):
+            return GuardedQuery(sql_query)
+        try:
+            query = sqlglot.parse_one(sql_query, read=dialect)
+        except SqlglotError:
+            query = None
+        if not isinstance(query, exp.Query):
+            query = None
+        elif _is_bounded(query):
+            return GuardedQuery(sql_query)
+
+        with self._lock:
+            self.explained += 1
+        estimate = estimate_plan(cursor, planned_sql or sql_query, distinct_counts)
+        if self.max_join_rows is not None and estimate.join_rows > self.max_join_rows:
+            if estimate.cross_join:
+                raise self._reject(
+                    "cross_join",
+                    f"a join without a usable condition would produce about "
+                    f"{estimate.join_rows:,} rows (limit {self.max_join_rows:,})",
+                    "join on a key with JOIN ... ON, or aggregate each side first",
+                )
+            raise self._reject(
+                "join_too_large",
+                f"a join would produce about {estimate.join_rows:,} rows "
+                f"(limit {self.max_join_rows:,})",
+                "filter or aggregate each side before joining, or join on a "
+                "more selective key",
+            )
+        if self.max_plan_rows is not None and estimate.total_rows > self.max_plan_rows:
+            raise self._reject(
+                "too_expensive",
+                f"the plan would process about {estimate.total_rows:,} rows "
+                f"(limit {self.max_plan_rows:,})",
+                "filter on year, month or category, or aggregate instead of "
+                "listing rows",
+            )
+        if (
+            self.auto_limit is not None
+            and query is not None
+            and query.args.get("limit") is None
+            and estimate.rows > self.auto_limit
+        ):
+            with self._lock:
+                self.limits_added += 1
+            return GuardedQuery(
+                add_limit(sql_query, self.auto_limit, dialect),
+                self.auto_limit,
+                estimate,
+            )
+        return GuardedQuery(sql_query, estimate=estimate)
+
+    def stats(self) -> dict[str, Any]:
+        """Queries checked, planned, limited and rejected (by check)."""
+        with self._lock:
+            return {
+                "checks": self.checks,
+                "explained": self.explained,
+                "limits_added": self.limits_added,
+                "rejections": dict(self.rejections),
+            }
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import shutil
+from collections.abc import Iterable, Iterator
+from itertools import groupby
+from pathlib import Path
+from typing import Any, Optional
+
+import duckdb
+import pandas as pd
+
+from configs.config import DEFAULT_ACCOUNT_ID
+from src.data_models import InputTransactions
+from utils.cache import file_digest
+
+# bump whenever the on-disk layout of the store changes
+STORE_FORMAT_VERSION = 2
+PARTITION_COLUMNS = ("year", "month")
+# rows within a partition are sorted by these, and the Parquet row group
+# statistics on them let a single account's query skip the other row groups
+SORT_COLUMNS = ("account_id", "date")
+ROW_GROUP_SIZE = 16_384
+MANIFEST_NAME = "_manifest.json"
+
+
+def source_files(path: Path) -> list[Path]:
+    """Return the files of a transactions source: a JSON file or a Parquet dataset."""
+    if path.is_dir():
+        return sorted(path.glob("**/*.parquet"))
+    return [path]
+
+
+def source_signature(path: Path) -> tuple[int, int]:
+    """Return the total size and latest modification time of a source's files."""
+    stats = [f.stat() for f in source_files(path)]
+    return sum(s.st_size for s in stats), max((s.st_mtime_ns for s in stats), default=0)
+
+
+def source_digest(path: Path) -> str:
+    """Return the sha256 of a source, covering every file's path and content."""
+    if not path.is_dir():
+        return file_digest(path)
+    digest = hashlib.sha256()
+    for f in source_files(path):
+        digest.update(f"{f.relative_to(path)}:{file_digest(f)}\n".encode())
+    return digest.hexdigest()
+
+
+def read_source(path: Path) -> Iterator[pd.DataFrame]:
+    """
+    Read a transactions source in chunks.
+
+    A JSON file is read whole. A directory is read as a Parquet dataset, such
+    as the one ``utils/generate_data.py --format parquet`` writes, one
+    ``year=YYYY/month=M`` partition at a time so memory stays bounded.
+    """
+    if not path.is_dir():
+        with path.open(encoding="utf-8") as f:
+            yield pd.read_json(f)
+        return
+    with duckdb.connect() as conn:
+        for _, files in groupby(source_files(path), key=lambda f: f.parent):
+            paths = ", ".join(f"'{f}'" for f in files)
+            yield conn.execute(
+                f"SELECT * FROM read_parquet([{paths}], hive_partitioning = true)"
+            ).df()
+
+
+class PartitionedStore:
+    """
+    Transactions stored as Parquet files partitioned by year and month.
+
+    Files are laid out as ``root/year=YYYY/month=M/*.parquet`` and read through
+    DuckDB's ``read_parquet`` with Hive partitioning, so a query filtering on
+    ``year`` or ``month`` only opens the matching partitions and only the
+    columns it uses are read. Within a partition rows are sorted by account
+    and date in small row groups, so a query for one account skips the row
+    groups of every other account. Data is validated against
+    ``InputTransactions`` once, when it is written; reads trust the store.
+    Writes go to a staging directory that replaces the store when complete,
+    and a manifest records the content hash of the source the store was
+    built from.
+
+    Args:
+        root (Path): Directory holding the partitions and the manifest.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def manifest(self) -> Optional[dict[str, Any]]:
+        """Return the store's manifest, or None if the store is missing or stale."""
+        try:
+            manifest = json.loads((self.root / MANIFEST_NAME).read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if manifest.get("format_version") != STORE_FORMAT_VERSION:
+            return None
+        return manifest
+
+    def write(
+        self,
+        data: pd.DataFrame | Iterable[pd.DataFrame],
+        source: Optional[dict[str, Any]] = None,
+    ) -> dict[str, Any]:
+        """
+        Validate transactions and replace the store's contents with them.
+
+        Data without an ``account_id`` column is assigned to
+        ``DEFAULT_ACCOUNT_ID``.
+
+        Args:
+            data (pd.DataFrame | Iterable[pd.DataFrame]): Transactions in the
+                ``InputTransactions`` layout, whole or in chunks; chunks are
+                validated and written one at a time.
+            source (Optional[dict]): Size, mtime and sha256 of the source,
+                kept in the manifest.
+
+        Returns:
+            dict: The new manifest.
+
+        Raises:
+            pandera.errors.SchemaErrors: If the data does not match
+                ``InputTransactions``; the store is left unchanged.
+        """
+        chunks = [data] if isinstance(data, pd.DataFrame) else data
+        staging = self.root.with_name(f"{self.root.name}.staging")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+
+        columns = list(InputTransactions.to_schema().columns)
+        rows = 0
+        with duckdb.connect() as conn:
+            for chunk in chunks:
+                if "account_id" not in chunk.columns:
+                    chunk = chunk.assign(account_id=DEFAULT_ACCOUNT_ID)
+                chunk = InputTransactions.validate(chunk, lazy=True)
+                conn.register("incoming_transactions", chunk[columns])
+                conn.execute(
+                    "COPY (SELECT * FROM incoming_transactions "
+                    f"ORDER BY {', '.join(SORT_COLUMNS)}) "
+                    f"TO '{staging}' (FORMAT parquet, "
+                    f"PARTITION_BY ({', '.join(PARTITION_COLUMNS)}), "
+                    f"ROW_GROUP_SIZE {ROW_GROUP_SIZE}, APPEND)"
+                )
+                conn.unregister("incoming_transactions")
+                rows += len(chunk)
+        manifest = {
+            "format_version": STORE_FORMAT_VERSION,
+            **(source or {}),
+            "rows": rows,
+            "partitions": len(list(staging.glob("*/*"))),
+        }
+        (staging / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+
+        retired = self.root.with_name(f"{self.root.name}.retired")
+        shutil.rmtree(retired, ignore_errors=True)
+        if self.root.exists():
+            os.replace(self.root, retired)
+        os.replace(staging, self.root)
+        shutil.rmtree(retired, ignore_errors=True)
+        return manifest
+
+    def sync(self, filepath: Path) -> dict[str, Any]:
+        """
+        Rebuild the store from a transactions source if its content changed.
+
+        As with the columnar cache, the source is only hashed when its size or
+        modification time changed, and only re-read when its hash changed.
+
+        Args:
+            filepath (Path): Source JSON file, or directory of Parquet files.
+
+        Returns:
+            dict: The manifest of the up-to-date store.
+        """
+        size, mtime_ns = source_signature(filepath)
+        source = {"size": size, "mtime_ns": mtime_ns}
+        manifest = self.manifest()
+        if manifest is not None and all(
+            manifest.get(k) == v for k, v in source.items()
+        ):
+            return manifest
+        source["sha256"] = source_digest(filepath)
+        if manifest is not None and manifest.get("sha256") == source["sha256"]:
+            manifest.update(source)
+            (self.root / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+            return manifest
+        return self.write(read_source(filepath), source=source)
+
+    def scan_sql(self) -> str:
+        """SQL selecting every transaction in ``InputTransactions`` column order."""
+        columns = ", ".join(InputTransactions.to_schema().columns)
+        types = ", ".join(f"'{column}': BIGINT" for column in PARTITION_COLUMNS)
+        return (
+            f"SELECT {columns} FROM read_parquet('{self.root}/*/*/*.parquet', "
+            f"hive_partitioning = true, hive_types = {{{types}}})"
+        )
@@ -0,0 +1,198 @@
+"""
+Stream agent runs: answer tokens, tool calls and handoffs as they happen.
+
+``StreamedRun`` runs a query with the SDK's streamed runner and turns its
+events into small JSON-ready dicts, the same for the interactive loop and the
+server:
+
+- ``{"type": "token", "agent", "delta"}``: a chunk of an agent's message,
+- ``{"type": "tool_started", "agent", "tool"}``, and
+  ``{"type": "tool_finished", "agent", "tool", "ms"}`` once its output is in,
+- ``{"type": "handoff", "source", "target"}``,
+- ``{"type": "done", "agent", "output", "ttft_ms", "latency_ms"}`` last.
+
+Time to first token is measured from the start of the run to the first
+message chunk, whichever agent writes it, and recorded as the
+``first_token`` stage of the run's metrics. Tool events come from run hooks,
+so they cover function tools when they actually start and finish; hosted
+tools (web and file search) run inside the model call. The inner run of an
+agent used as a tool (``sql_query_agent_tool``) is not streamed; the tool
+itself is.
+"""
+
+import asyncio
+import time
+from collections import defaultdict
+from collections.abc import AsyncIterator
+from typing import Any, Optional
+
+from agents import (
+    Agent,
+    AgentUpdatedStreamEvent,
+    RawResponsesStreamEvent,
+    RunConfig,
+    RunContextWrapper,
+    RunHooks,
+    Runner,
+    SQLiteSession,
+    Tool,
+)
+
+from src.accounts import AccountContext
+from src.metrics import get_metrics
+
+
+class StreamHooks(RunHooks):
+    """
+    Run hooks putting tool and handoff events on a queue as they happen.
+
+    The streamed runner only emits a turn's tool call items once all of its
+    tools have finished, so tool starts come from the hooks instead.
+    """
+
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+        self._tool_started: defaultdict[str, list[float]] = defaultdict(list)
+
+    async def on_tool_start(
+        self, context: RunContextWrapper, agent: Agent, tool: Tool
+    ) -> None:
+        self._tool_started[tool.name].append(time.perf_counter())
+        self.queue.put_nowait(
+            {"type": "tool_started", "agent": agent.name, "tool": tool.name}
+        )
+
+    async def on_tool_end(
+        self, context: RunContextWrapper, agent: Agent, tool: Tool, result: str
+    ) -> None:
+        started = self._tool_started[tool.name].pop()
+        self.queue.put_nowait(
+            {
+                "type": "tool_finished",
+                "agent": agent.name,
+                "tool": tool.name,
+                "ms": round((time.perf_counter() - started) * 1000, 3),
+            }
+        )
+
+    async def on_handoff(
+        self, context: RunContextWrapper, from_agent: Agent, to_agent: Agent
+    ) -> None:
+        self.queue.put_nowait(
+            {"type": "handoff", "source": from_agent.name, "target": to_agent.name}
+        )
+
+
+class StreamedRun:
+    """
+    One streamed agent run over a conversation.
+
+    Iterate ``events()`` to drive the run; afterwards ``last_agent`` is the
+    agent the conversation continues with and ``final_output``, ``ttft_ms``
+    and ``latency_ms`` describe the answer.
+
+    Args:
+        agent (Agent): Agent the run starts with.
+        query (str): The user message.
+        session (Optional[SQLiteSession]): Conversation history, updated
+            once the run completes.
+        run_config (Optional[RunConfig]): Run configuration.
+        context (Optional[AccountContext]): Account the data tools are bound to.
+
+    Example:
+        >>> run = StreamedRun(graph.triage_agent, "How much did I spend?")
+        >>> async for event in run.events():
+        ...     if event["type"] == "token":
+        ...         print(event["delta"], end="")
+        >>> cur_agent = run.last_agent
+    """
+
+    def __init__(
+        self,
+        agent: Agent,
+        query: str,
+        session: Optional[SQLiteSession] = None,
+        run_config: Optional[RunConfig] = None,
+        context: Optional[AccountContext] = None,
+    ):
+        self.agent = agent
+        self.query = query
+        self.session = session
+        self.run_config = run_config
+        self.context = context
+        self.last_agent = agent
+        self.final_output: Any = None
+        self.ttft_ms: Optional[float] = None
+        self.latency_ms: Optional[float] = None
+
+    async def events(self) -> AsyncIterator[dict[str, Any]]:
+        """
+        Run the query, yielding its events as they happen.
+
+        Raises:
+            Exception: Whatever the run raises, e.g. ``MaxTurnsExceeded``.
+        """
+        metrics = get_metrics()
+        queue: asyncio.Queue = asyncio.Queue()
+        # the run id must be set before the runner starts its background task
+        with metrics.run(self.agent.name):
+            start = time.perf_counter()
+            result = Runner.run_streamed(
+                starting_agent=self.agent,
+                input=self.query,
+                session=self.session,
+                run_config=self.run_config,
+                context=self.context,
+                hooks=StreamHooks(queue),
+            )
+
+            async def pump() -> None:
+                try:
+                    async for event in result.stream_events():
+                        queue.put_nowait(event)
+                    queue.put_nowait(None)
+                except Exception as e:
+                    queue.put_nowait(e)
+
+            pump_task = asyncio.create_task(pump())
+            agent_name = self.agent.name
+            try:
+                while (event := await queue.get()) is not None:
+                    if isinstance(event, Exception):
+                        raise event
+                    if isinstance(event, dict):
+                        yield event
+                    elif isinstance(event, AgentUpdatedStreamEvent):
+                        agent_name = event.new_agent.name
+                    elif (
+                        isinstance(event, RawResponsesStreamEvent)
+                        and event.data.type == "response.output_text.delta"
+                    ):
+                        if self.ttft_ms is None:
+                            self.ttft_ms = (time.perf_counter() - start) * 1000
+                            metrics.record(
+                                "stage",
+                                self.ttft_ms,
+                                agent=agent_name,
+                                name="first_token",
+                            )
+                        yield {
+                            "type": "token",
+                            "agent": agent_name,
+                            "delta": event.data.delta,
+                        }
+            finally:
+                if not pump_task.done():
+                    # the caller stopped listening, stop the run too
+                    result.cancel()
+                    pump_task.cancel()
+            self.latency_ms = (time.perf_counter() - start) * 1000
+        self.last_agent = result.last_agent
+        self.final_output = result.final_output
+        yield {
+            "type": "done",
+            "agent": self.last_agent.name,
+            "output": str(self.final_output),
+            "ttft_ms": None if self.ttft_ms is None else round(self.ttft_ms, 3),
+            "latency_ms": round(self.latency_ms, 3),
+        }
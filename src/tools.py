@@ -1,16 +1,28 @@
-from agents import function_tool
-import duckdb
-from utils.utils import load_data
-from configs.config import TRANSACTIONS_PATH
+from typing import Any, Optional
+
+from agents import RunContextWrapper, function_tool
+from src.accounts import AccountContext
+from src.calculator import CalculationError, evaluate, format_results
+from src.engine import get_engine
+from src.retrieval import format_hits, get_document_index
+from src.workers import run_blocking
+
+
+def _account_id(ctx: RunContextWrapper[Any]) -> Optional[int]:
+    """Return the account the run is bound to, None for an unscoped run."""
+    context = ctx.context
+    return context.account_id if isinstance(context, AccountContext) else None
 
 
 @function_tool
-def get_metadata_from_table() -> tuple[list[str], list[str]]:
+async def get_metadata_from_table(
+    ctx: RunContextWrapper[Any],
+) -> tuple[list[str], list[str]]:
     """
     Retrieve unique values from the 'types' and 'category' columns of the transactions dataset.
 
-    This function loads the transactions data from the configured path and extracts
-    all unique values from both the 'types' and 'category' columns. This metadata
+    The values are served from the transaction engine's precomputed metadata
+    index, which is built once per version of the transactions data. This metadata
     is useful for understanding the available transaction types and categories
     before performing analysis or filtering operations.
 
@@ -28,22 +40,24 @@ def get_metadata_from_table() -> tuple[list[str], list[str]]:
 
     Note:
         - The function assumes the dataset contains 'types' and 'category' columns
-        - Returns all values including duplicates as they appear in the dataset
+        - Values are unique and ordered from most to least frequent
         - Useful for understanding the data structure before writing SQL queries
+        - When the run is bound to an account, only that account's values are listed
     """
-    data = load_data(TRANSACTIONS_PATH)
-    types = data["type"].unique().tolist()
-    categories = data["category"].unique().tolist()
+    account_id = _account_id(ctx)
+    types, categories = await run_blocking(
+        lambda: get_engine().metadata(account_id=account_id)
+    )
     return types, categories
 
 
 @function_tool
-def get_table_columns() -> list[str]:
+async def get_table_columns() -> list[str]:
     """
     Retrieve the column names from the transactions dataset.
 
-    This function loads the transactions data from the configured path and
-    returns a list of all column names available in the dataset. This is
+    This function returns a list of all column names available in the
+    transactions table, read from the engine's precomputed metadata index. This is
     useful for understanding the structure of the data before writing SQL queries.
 
     Returns:
@@ -54,19 +68,18 @@ def get_table_columns() -> list[str]:
         >>> print(columns)
         ['transaction_id', 'amount', 'date', 'category', ...]
     """
-    data = load_data(TRANSACTIONS_PATH)
-    columns = data.columns.to_list()
+    columns = await run_blocking(lambda: get_engine().columns())
     return columns
 
 
 @function_tool
-def execute_sql(sql_query: str, table_name: str = "transactions") -> str:
+async def execute_sql(ctx: RunContextWrapper[Any], sql_query: str) -> str:
     """
     Execute a SQL query against the transactions dataset making sure its compatible with DuckDB SQL.
 
     This function takes a SQL query string, cleans it by removing any markdown
-    code block formatting, and executes it against the loaded transactions data
-    using DuckDB. The result is returned as a formatted string representation
+    code block formatting, and executes it against the transactions table held
+    by the long-lived DuckDB transaction engine. The result is returned as a formatted string representation
     of the resulting DataFrame.
 
     Args:
@@ -75,115 +88,130 @@ def execute_sql(sql_query: str, table_name: str = "transactions") -> str:
                         stripped before execution.
 
     Returns:
-        str: The query result formatted as a string table, or an error message
-             if the query execution fails.
+        str: The query result formatted as a markdown table, or an error message
+             if the query execution fails. Large results are truncated to a row,
+             byte and token budget and end with the total row count, column
+             stats and a cursor id for `fetch_more_rows`.
 
     Example:
-        >>> result = execute_sql("SELECT COUNT(*) FROM transactions")
+        >>> result = await execute_sql("SELECT COUNT(*) FROM transactions")
         >>> print(result)
-        "   COUNT(*)\n0     1000"
+        "| count_star() |\n| --- |\n| 1000 |\n\n(1 rows)"
 
-        >>> result = execute_sql("```sql\nSELECT * FROM transactions LIMIT 5\n```")
+        >>> result = await execute_sql("```sql\nSELECT * FROM transactions LIMIT 5\n```")
         >>> print(result)  # Returns first 5 rows as formatted string
 
     Note:
-        - The function automatically loads the transactions data from the configured path
+        - The data is loaded once by the transaction engine and reloaded only when
+          the transactions file changes
         - SQL queries should reference the table as 'transactions'
+        - When the run is bound to an account (an ``AccountContext``), the
+          table and its rollups only show that account's rows and only a
+          single SELECT query is accepted
         - Any SQL formatting from markdown code blocks is automatically removed
+        - Queries are checked before they run: only a single SELECT is accepted,
+          joins or scans estimated to be too large are rejected with a hint on
+          how to fix them, and large results without a LIMIT are limited
+        - Results of repeated queries (ignoring whitespace, casing and comments)
+          are served from a cache until the transactions data changes
+        - Queries run on the tool worker pool, so a slow query does not block
+          other sessions, and are cancelled once they exceed the query timeout
         - Errors in query execution are caught and returned as descriptive error messages
     """
     try:
-        data = load_data(TRANSACTIONS_PATH)  # noqa: F841
-
-        # we use duckdb to create a table
-        duckdb.sql(f"CREATE TABLE IF NOT EXISTS {table_name} AS SELECT * FROM data")
         sql_query = sql_query.strip()
         sql_query = sql_query.replace("```sql", "").replace("```", "")
 
-        # execute the SQL query
-        result = duckdb.sql(sql_query).df()
-
-        # return the result as string
-        return result.to_string()
+        # execute the SQL query on the shared engine, repeats come from its cache
+        account_id = _account_id(ctx)
+        return await run_blocking(
+            lambda: get_engine().execute(sql_query, account_id=account_id)
+        )
     except Exception as e:
         return f"Error accessing data: {str(e)}"
 
 
 @function_tool
-def addition(x: float, y: float) -> float:
+async def fetch_more_rows(
+    ctx: RunContextWrapper[Any], cursor_id: str, offset: int
+) -> str:
     """
-    Add two numbers.
+    Fetch the next page of a truncated `execute_sql` result.
 
     Args:
-        x (float): The first number.
-        y (float): The second number.
+        cursor_id (str): The cursor id given at the end of the truncated result.
+        offset (int): Index of the first row to return, as given with the cursor id.
 
     Returns:
-        float: The sum of the two numbers.
+        str: The requested rows formatted as a markdown table, or an error message
+             if the cursor has expired.
     """
-    return float(x) + float(y)
+    try:
+        account_id = _account_id(ctx)
+        return await run_blocking(
+            lambda: get_engine().fetch_more(cursor_id, offset, account_id=account_id)
+        )
+    except Exception as e:
+        return f"Error accessing data: {str(e)}"
 
 
 @function_tool
-def subtraction(x: float, y: float) -> float:
+async def search_documents(query: str) -> str:
     """
-    Subtract the second number from the first.
+    Search *The Little Book That Builds Wealth* for passages answering a question.
 
-    Args:
-        x (float): The number to subtract from.
-        y (float): The number to be subtracted.
-
-    Returns:
-        float: The result of the subtraction.
-    """
-    return float(x) - float(y)
-
-
-@function_tool
-def division(x: float, y: float) -> float:
-    """
-    Divide the first number by the second.
+    The book is indexed locally once (BM25 over page-sized chunks), so searches
+    take milliseconds and need no network. Phrase the query with the words the
+    book would use, e.g. "switching costs banks" rather than "sticky customers".
 
     Args:
-        x (float): Numerator.
-        y (float): Denominator.
+        query (str): What to look for in the book.
 
     Returns:
-        float: The quotient.
+        str: The best matching passages, each headed by the PDF file, page
+             number and score, or a message saying nothing matched.
 
-    Raises:
-        ZeroDivisionError: If y is zero.
+    Example:
+        >>> result = await search_documents("brand pricing power")
+        >>> print(result)
+        "[build-wealth.pdf, page 56, score 9.8]\nIf a company can charge more for the same product ..."
     """
-    return float(x) / float(y)
+    try:
+        hits = await run_blocking(lambda: get_document_index().search(query))
+        return format_hits(hits)
+    except Exception as e:
+        return f"Error searching documents: {str(e)}"
 
 
 @function_tool
-def multiplication(x: float, y: float) -> float:
-    """
-        Multiply two numbers.
-
-        Args:
-            x (float): The first number.
-            y (float): The second number.
-    ,ModelSettings
-        Returns:
-            float: The product of the two numbers.
+def calculate(expressions: list[str]) -> str:
     """
-    return float(x) * float(y)
+    Evaluate a batch of arithmetic expressions in a single call.
 
+    Put every step of a calculation in one call instead of calling the tool once
+    per operation. Each expression is `name = expression` and may use the names
+    defined before it. Arrays such as `[120.5, 98.2, 143.0]` work element-wise.
 
-@function_tool
-def percent_change(x: float, y: float) -> float:
-    """
-    Calculate the percent change between two values.
+    Supported: numbers, arrays, `+ - * / % **`, parentheses, indexing
+    (`values[0]`, `values[-1]`) and the functions abs, count, cumsum, diff, exp,
+    log, max, mean, median, min, pct_change(old, new), prod, round(x, digits),
+    sqrt, std and sum.
 
     Args:
-        x (float): The initial value.
-        y (float): The new/final value.
+        expressions (list[str]): The expressions to evaluate, in order.
 
     Returns:
-        float: The percent change from x to y.
+        str: One `name = value` line per expression, or an error message naming
+             the expression that failed.
+
+    Example:
+        >>> calculate(["saved = 13500", "income = 36000", "saved_pct = saved / income * 100"])
+        "saved = 13500\nincome = 36000\nsaved_pct = 37.5"
+
+        >>> calculate(["spend = [2450, 2610]", "change = pct_change(spend[0], spend[1])"])
+        "spend = [2450, 2610]\nchange = 6.530612"
     """
-    if x == 0:
-        raise ValueError("Initial value x cannot be zero for percent change.")
-    return ((float(y) - float(x)) / abs(float(x))) * 100
+    try:
+        return format_results(evaluate(expressions))
+    except CalculationError as e:
+        return f"Error in calculation: {str(e)}"
@@ -1,11 +1,17 @@
-from configs.config import CLIENT
+import json
+import os
+from configs.config import DOCUMENTS_MANIFEST, VECTOR_STORE_MANIFEST, get_client
 from pathlib import Path
 from typing import Any
 
+import openai
+
+from utils.cache import file_digest
+
 
 def create_vector_store(store_name: str) -> dict[str, Any]:
     # NOTE: chunking strategy : https://platform.openai.com/docs/api-reference/vector-stores
-    vector_store = CLIENT.vector_stores.create(name=store_name)
+    vector_store = get_client().vector_stores.create(name=store_name)
     return {
         "vector_store_id": vector_store.id,
         "vector_store_name": vector_store.name,
@@ -17,18 +23,138 @@ def create_vector_store(store_name: str) -> dict[str, Any]:
 # Individual files can be up to 512 MB, and the size of all files uploaded by one organization
 # can be up to 100 GB.
 def upload_pdf_to_vector_store(pdf_filepath: Path, vector_store_id: str):
-    file_name = pdf_filepath.stem
+    """
+    Upload a PDF and attach it to a vector store.
+
+    Raises:
+        OSError: If the PDF cannot be read.
+        openai.OpenAIError: If the upload or the attachment fails.
+    """
+    client = get_client()
+    with pdf_filepath.open("rb") as f:
+        file_response = client.files.create(file=f, purpose="assistants")
+    _ = client.vector_stores.files.create(
+        vector_store_id=vector_store_id, file_id=file_response.id
+    )
+    return {
+        "file": pdf_filepath.stem,
+        "file_id": file_response.id,
+        "status": "success",
+    }
+
+
+def read_manifest(manifest_path: Path = VECTOR_STORE_MANIFEST) -> dict[str, Any]:
+    """Read the vector store manifest, returning an empty one if it is missing."""
     try:
-        file_response = CLIENT.files.create(
-            file=pdf_filepath.open("rb"), purpose="assistants"
-        )
-        _ = CLIENT.vector_stores.files.create(
-            vector_store_id=vector_store_id, file_id=file_response.id
+        return json.loads(manifest_path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_manifest(
+    manifest: dict[str, Any], manifest_path: Path = VECTOR_STORE_MANIFEST
+) -> None:
+    """Atomically write the vector store manifest."""
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp_path, manifest_path)
+
+
+def vector_store_exists(vector_store_id: str) -> bool:
+    try:
+        get_client().vector_stores.retrieve(vector_store_id)
+    except openai.NotFoundError:
+        return False
+    return True
+
+
+def record_document(
+    vector_store_id: str,
+    sha256: str,
+    file_name: str,
+    file_id: str,
+    manifest_path: Path = DOCUMENTS_MANIFEST,
+) -> None:
+    """
+    Record a document attached to a vector store in the documents manifest.
+
+    This is the manifest ``src.ingest.DocumentIngestor`` keeps, so ingesting a
+    directory into the store skips the document instead of uploading it again.
+    """
+    manifest = read_manifest(manifest_path)
+    documents = manifest.setdefault(vector_store_id, {})
+    if documents.get(sha256, {}).get("status") == "completed":
+        return
+    documents[sha256] = {"file": file_name, "file_id": file_id, "status": "completed"}
+    write_manifest(manifest, manifest_path)
+
+
+def resolve_vector_store(
+    store_name: str,
+    pdf_filepath: Path,
+    manifest_path: Path = VECTOR_STORE_MANIFEST,
+    documents_manifest_path: Path = DOCUMENTS_MANIFEST,
+) -> str:
+    """
+    Return the id of a vector store holding ``pdf_filepath``, creating it if needed.
+
+    Stores are recorded in a manifest keyed on the PDF content hash, so restarts
+    reuse the store created earlier instead of creating and uploading a new one.
+    A recorded store that no longer exists remotely is recreated. The PDF is
+    also recorded as a document of the store in the documents manifest (see
+    ``record_document``), which tracks what every store holds.
+
+    Args:
+        store_name (str): Name given to a newly created vector store.
+        pdf_filepath (Path): PDF the vector store should contain.
+        manifest_path (Path): Where the manifest is persisted.
+        documents_manifest_path (Path): Where the documents manifest is
+            persisted.
+
+    Returns:
+        str: The vector store id.
+
+    Raises:
+        RuntimeError: If the PDF could not be uploaded to a new store.
+    """
+    pdf_hash = file_digest(pdf_filepath)
+    manifest = read_manifest(manifest_path)
+    entry = manifest.get(pdf_hash)
+    if entry is not None and vector_store_exists(entry["vector_store_id"]):
+        record_document(
+            entry["vector_store_id"],
+            pdf_hash,
+            pdf_filepath.name,
+            entry["file_id"],
+            documents_manifest_path,
         )
-        return {"file": file_name, "file_id": file_response.id, "status": "success"}
+        return entry["vector_store_id"]
 
-    except Exception as e:
-        print(
-            f"Error occured while uploading file with name {file_name} to the vector store {e}"
+    vector_store = create_vector_store(store_name=store_name)
+    try:
+        file_upload = upload_pdf_to_vector_store(
+            pdf_filepath=pdf_filepath, vector_store_id=vector_store["vector_store_id"]
         )
-        return {"file": file_name, "status": "failed", "error": e}
+    except (OSError, openai.OpenAIError) as e:
+        raise RuntimeError(
+            f"Could not upload {pdf_filepath.name} to vector store "
+            f"{vector_store['vector_store_id']}: {e}"
+        ) from e
+
+    manifest[pdf_hash] = {
+        "file": pdf_filepath.name,
+        "file_id": file_upload["file_id"],
+        "vector_store_id": vector_store["vector_store_id"],
+        "vector_store_name": vector_store["vector_store_name"],
+        "created_at": vector_store["created_at"],
+    }
+    write_manifest(manifest, manifest_path)
+    record_document(
+        vector_store["vector_store_id"],
+        pdf_hash,
+        pdf_filepath.name,
+        file_upload["file_id"],
+        documents_manifest_path,
+    )
+    return vector_store["vector_store_id"]
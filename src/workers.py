@@ -0,0 +1,32 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from typing import Any, Callable, TypeVar
+
+from configs.config import TOOL_WORKERS
+
+T = TypeVar("T")
+
+
+@cache
+def get_tool_executor() -> ThreadPoolExecutor:
+    """Return the process-wide pool the blocking tools run on."""
+    return ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking call on the tool worker pool without blocking the event loop.
+
+    At most ``TOOL_WORKERS`` calls run at once; further calls wait for a free
+    worker, so a burst of slow queries cannot starve the process of threads.
+    The call runs in a copy of the caller's context, as with
+    ``asyncio.to_thread``, so events it records keep the run id.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_tool_executor(), functools.partial(context.run, fn, *args, **kwargs)
+    )
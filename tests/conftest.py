@@ -0,0 +1,32 @@
+from pathlib import Path
+
+import pytest
+
+from src.engine import TransactionEngine
+from utils.cache import ColumnarCache
+from utils.generate_data import generate_transactions, write_transactions
+
+ACCOUNTS = 3
+
+
+@pytest.fixture(scope="session")
+def transactions_dir(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """A small generated Parquet dataset of ``ACCOUNTS`` accounts over two years."""
+    source = tmp_path_factory.mktemp("data") / "transactions"
+    write_transactions(
+        generate_transactions(2024, 2025, 5, ACCOUNTS), source, "parquet"
+    )
+    return source
+
+
+@pytest.fixture(scope="session")
+def engine(
+    transactions_dir: Path, tmp_path_factory: pytest.TempPathFactory
+) -> TransactionEngine:
+    engine = TransactionEngine(
+        transactions_dir,
+        cache=ColumnarCache(tmp_path_factory.mktemp("cache")),
+        storage="parquet",
+    )
+    yield engine
+    engine.close()
@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from src.accounts import AccountScopeError, scope_to_account
+from src.engine import TransactionEngine
+
+
+def test_scoped_query_only_sees_the_account(engine: TransactionEngine):
+    counts = engine.query(
+        "SELECT account_id, COUNT(*) AS n FROM transactions GROUP BY account_id"
+    )
+    rows = dict(zip(counts["account_id"], counts["n"]))
+
+    assert engine.query("SELECT COUNT(*) FROM transactions", 2).iloc[0, 0] == rows[2]
+    assert engine.query("SELECT COUNT(*) FROM transactions", 999).iloc[0, 0] == 0
+
+
+@pytest.mark.parametrize(
+    "sql_query",
+    [
+        "SELECT COUNT(*) FROM query_table('transactions')",
+        "SELECT COUNT(*) FROM query('SELECT * FROM transactions')",
+        "SELECT COUNT(*) FROM read_json('{source}')",
+        "SELECT COUNT(*) FROM '{source}'",
+        "SELECT COUNT(*) FROM read_parquet('{parquet}')",
+        "SELECT * FROM glob('{parquet}')",
+        "SELECT COUNT(*) FROM main.transactions",
+        "SELECT COUNT(*) FROM information_schema.tables",
+        "WITH t AS (SELECT 1) SELECT COUNT(*) FROM transactions, other",
+    ],
+)
+def test_scoped_query_cannot_read_around_the_account(
+    engine: TransactionEngine, tmp_path: Path, sql_query: str
+):
+    source = tmp_path / "transactions.json"
+    source.write_text('[{"account_id": 1}]')
+    sql_query = sql_query.format(
+        source=source, parquet=f"{engine.store.root}/*/*/*.parquet"
+    )
+
+    with pytest.raises(AccountScopeError):
+        engine.query(sql_query, 999)
+    with pytest.raises(AccountScopeError):
+        engine.execute(sql_query, 999)
+
+
+def test_scoped_query_may_read_its_own_ctes():
+    scoped = scope_to_account(
+        "WITH spend AS (SELECT amount FROM transactions) SELECT SUM(amount) FROM spend",
+        7,
+        ["transactions"],
+    )
+
+    assert "WHERE account_id = 7" in scoped
+
+
+def test_engine_cannot_read_files_outside_its_store(
+    engine: TransactionEngine, tmp_path: Path
+):
+    source = tmp_path / "transactions.json"
+    source.write_text('[{"account_id": 1}]')
+
+    with pytest.raises(duckdb.PermissionException):
+        engine.query(f"SELECT COUNT(*) FROM read_json('{source}')")
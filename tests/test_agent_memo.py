@@ -0,0 +1,63 @@
+from datetime import date
+
+import pytest
+from agents import Agent
+
+from src.agent_memo import AgentMemo, memo_key, normalize_request
+
+AGENT = Agent(name="sql_query_agent")
+
+
+def key(request: str, **kwargs) -> str:
+    return memo_key(AGENT, request, "data-v1", **kwargs)
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("transactions with amount > 500", "transactions with amount < 500"),
+        ("transactions with amount >= 500", "transactions with amount > 500"),
+        ("transactions with amount = 500", "transactions with amount != 500"),
+        ("refunds of -500", "refunds of 500"),
+        ("refunds of -$500", "refunds of $500"),
+    ],
+)
+def test_requests_asking_different_things_get_different_keys(first, second):
+    assert key(first) != key(second)
+
+
+def test_rewording_keeps_the_key():
+    request = "How much did I spend on groceries in 2024-03?"
+
+    assert key(request) == key(f"  {request.upper().rstrip('?')}, please!")
+    assert normalize_request(request) == "how much did i spend on groceries in 2024-03"
+
+
+def test_key_depends_on_account_data_and_relative_dates():
+    assert key("spend in 2024", account_id=1) != key("spend in 2024", account_id=2)
+    assert key("spend in 2024") != memo_key(AGENT, "spend in 2024", "data-v2")
+    assert key("spend this month", today=date(2024, 3, 1)) != key(
+        "spend this month", today=date(2024, 4, 1)
+    )
+    assert key("spend in 2024", today=date(2024, 3, 1)) == key(
+        "spend in 2024", today=date(2024, 4, 1)
+    )
+
+
+def test_memo_expires_and_evicts_least_recently_used():
+    memo = AgentMemo(":memory:", ttl_s=None, max_entries=2)
+    memo.put("a", AGENT.name, "a", "answer a")
+    memo.put("b", AGENT.name, "b", "answer b")
+    assert memo.get("a") == "answer a"
+    memo.put("c", AGENT.name, "c", "answer c")
+
+    assert (memo.get("a"), memo.get("b"), memo.get("c")) == (
+        "answer a",
+        None,
+        "answer c",
+    )
+    assert memo.stats()["evictions"] == 1
+
+    expiring = AgentMemo(":memory:", ttl_s=-1)
+    expiring.put("a", AGENT.name, "a", "answer a")
+    assert expiring.get("a") is None
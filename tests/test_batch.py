@@ -0,0 +1,56 @@
+import asyncio
+
+from agents import RunConfig
+
+from src.agent import OFFLINE_VECTOR_STORE_ID, build_agent_graph
+from src.batch import run_batch
+from src.fake_model import FakeModel, FakeModelProvider
+
+
+def run(queries: list[dict]) -> list[dict]:
+    graph = build_agent_graph(
+        OFFLINE_VECTOR_STORE_ID, model_provider=FakeModelProvider(FakeModel())
+    )
+    return asyncio.run(
+        run_batch(
+            queries,
+            graph.triage_agent,
+            concurrency=4,
+            run_config=RunConfig(tracing_disabled=True),
+        )
+    )
+
+
+def query(id: str, text: str, conversation_id: str) -> dict:
+    return {
+        "id": id,
+        "query": text,
+        "conversation_id": conversation_id,
+        "account_id": 1,
+    }
+
+
+def test_results_keep_input_order_across_conversations():
+    queries = [query(str(i), f"question {i}", f"c{i % 3}") for i in range(9)]
+
+    results = run(queries)
+
+    assert [r["query"] for r in results] == [q["query"] for q in queries]
+    assert all(r["error"] is None for r in results)
+
+
+def test_duplicate_ids_keep_every_result():
+    queries = [
+        query("same", "first question", "a"),
+        query("same", "second question", "b"),
+        query("same", "third question", "a"),
+    ]
+
+    results = run(queries)
+
+    assert [r["query"] for r in results] == [
+        "first question",
+        "second question",
+        "third question",
+    ]
+    assert [r["conversation_id"] for r in results] == ["a", "b", "a"]
@@ -0,0 +1,44 @@
+import asyncio
+import json
+
+import pytest
+
+from src.calculator import CalculationError, evaluate, format_results
+from src.tools import calculate
+
+
+def test_expressions_refer_to_earlier_names():
+    results = evaluate(
+        ["spend = [2450, 2610]", "change = pct_change(spend[0], spend[1])"]
+    )
+
+    assert format_results(results) == "spend = [2450, 2610]\nchange = 6.530612"
+
+
+@pytest.mark.parametrize(
+    "expressions",
+    [
+        ["max([])"],
+        ["diff(5)"],
+        ["x = 2.5", "round(x, 1e400)"],
+        ["round(1.5, sqrt(-1))"],
+        ["v = [1, 2]", "v[1e400]"],
+        ["v = [1, 2]", "v[sqrt(-1)]"],
+        ["[1, 2] + [1, 2, 3]"],
+        ["sum()"],
+        ["1 / 0"],
+        ["unknown + 1"],
+        ["__import__('os')"],
+    ],
+)
+def test_invalid_input_raises_calculation_error(expressions: list[str]):
+    with pytest.raises(CalculationError):
+        evaluate(expressions)
+
+
+def test_calculate_tool_reports_errors_as_text():
+    output = asyncio.run(
+        calculate.on_invoke_tool(None, json.dumps({"expressions": ["max([])"]}))
+    )
+
+    assert output.startswith("Error in calculation: result_1: max():")
@@ -0,0 +1,25 @@
+from src.engine import TransactionEngine
+
+
+def test_account_index_only_counts_the_accounts_rows(engine: TransactionEngine):
+    (rows,) = engine.query(
+        "SELECT COUNT(*) FROM transactions WHERE account_id = 2"
+    ).iloc[0]
+    index = engine.account_index(2)
+
+    assert index["row_count"] == rows < engine.index["row_count"]
+    assert sum(index["rows_per_year"].values()) == rows
+    assert sum(index["distinct_values"]["type"].values()) == rows
+
+
+def test_schema_summary_of_an_account_hides_other_accounts(engine: TransactionEngine):
+    summary = engine.schema_summary(account_id=2)
+
+    assert f"({engine.account_index(2)['row_count']} rows" in summary
+    assert f"({engine.index['row_count']} rows" not in summary
+
+
+def test_account_without_rows_has_no_values(engine: TransactionEngine):
+    assert engine.account_index(999)["row_count"] == 0
+    assert engine.metadata(account_id=999) == ([], [])
+    assert engine.metadata() == engine.metadata(account_id=None)
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import pytest
+
+from src.engine import TransactionEngine
+from utils.cache import ColumnarCache
+
+
+@pytest.fixture(scope="module")
+def polars_engine(
+    transactions_dir: Path, tmp_path_factory: pytest.TempPathFactory
+) -> TransactionEngine:
+    engine = TransactionEngine(
+        transactions_dir,
+        cache=ColumnarCache(tmp_path_factory.mktemp("polars")),
+        storage="parquet",
+        backend="polars",
+        use_rollups=False,
+    )
+    yield engine
+    engine.close()
+
+
+@pytest.mark.parametrize(
+    "sql_query, on_polars",
+    [
+        ("SELECT COUNT(*) FROM transactions", True),
+        ("SELECT COUNT(*) / 7 FROM transactions", False),
+        ("SELECT ROUND(AVG(amount), 2) FROM transactions", True),
+        (
+            "SELECT category, ROUND(SUM(amount), 2) AS spend FROM transactions "
+            "WHERE type = 'debit' GROUP BY category ORDER BY category",
+            True,
+        ),
+        (
+            "SELECT year, month, COUNT(*) AS n FROM transactions "
+            "GROUP BY year, month ORDER BY year, month",
+            True,
+        ),
+        (
+            "SELECT date, description, amount FROM transactions "
+            "ORDER BY date, description, amount LIMIT 20",
+            True,
+        ),
+    ],
+)
+@pytest.mark.parametrize("account_id", [None, 2])
+def test_polars_answers_like_duckdb(
+    engine: TransactionEngine,
+    polars_engine: TransactionEngine,
+    sql_query: str,
+    on_polars: bool,
+    account_id,
+):
+    fallbacks = polars_engine.polars_fallbacks
+
+    assert polars_engine.execute(sql_query, account_id) == engine.execute(
+        sql_query, account_id
+    )
+    assert polars_engine.polars_fallbacks == fallbacks + (not on_polars)
@@ -0,0 +1,97 @@
+from pathlib import Path
+
+import pytest
+
+from src.engine import TransactionEngine
+from src.rollups import rewrite_for_rollups
+from utils.cache import ColumnarCache
+
+COLUMNS = ["account_id", "date", "type", "category", "amount", "year", "month"]
+
+
+@pytest.fixture(scope="module")
+def raw_engine(
+    transactions_dir: Path, tmp_path_factory: pytest.TempPathFactory
+) -> TransactionEngine:
+    """The same data as ``engine``, with every query run on the table itself."""
+    engine = TransactionEngine(
+        transactions_dir,
+        cache=ColumnarCache(tmp_path_factory.mktemp("raw")),
+        storage="parquet",
+        use_rollups=False,
+    )
+    yield engine
+    engine.close()
+
+
+def test_qualifying_aggregate_is_rewritten():
+    rewritten = rewrite_for_rollups(
+        "SELECT month, SUM(amount) AS spend FROM transactions GROUP BY month",
+        "transactions",
+        columns=COLUMNS,
+    )
+
+    assert rewritten == (
+        "SELECT month, SUM(rollup_sum) AS spend "
+        "FROM transactions_monthly_rollup GROUP BY month"
+    )
+
+
+def test_group_by_alias_resolves_to_its_projection():
+    rewritten = rewrite_for_rollups(
+        "SELECT category AS c, SUM(amount) AS s FROM transactions GROUP BY c",
+        "transactions",
+        columns=COLUMNS,
+    )
+
+    assert rewritten is not None
+    assert "transactions_yearly_rollup" in rewritten
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        # the WHERE refers to the amount column, not the SUM aliased to it
+        "SELECT category, SUM(amount) AS amount FROM transactions "
+        "WHERE amount < 0 GROUP BY category ORDER BY category",
+        # the WHERE refers to the month column, not the type aliased to it
+        "SELECT type AS month, SUM(amount) s FROM transactions "
+        "WHERE month = 1 GROUP BY 1 ORDER BY 1",
+    ],
+)
+def test_alias_named_like_a_column_is_left_alone(
+    sql: str, engine: TransactionEngine, raw_engine: TransactionEngine
+):
+    assert rewrite_for_rollups(sql, "transactions", columns=COLUMNS) is None
+    assert engine.execute(sql) == raw_engine.execute(sql)
+
+
+def test_where_column_that_is_not_a_dimension_is_left_alone():
+    sql = (
+        "SELECT category AS c, SUM(amount) AS s FROM transactions "
+        "WHERE c = 'groceries' GROUP BY c"
+    )
+
+    assert rewrite_for_rollups(sql, "transactions", columns=COLUMNS) is None
+
+
+def test_avg_stays_on_the_table(
+    engine: TransactionEngine, raw_engine: TransactionEngine
+):
+    sql = "SELECT category, AVG(amount) AS mean FROM transactions GROUP BY 1 ORDER BY 1"
+
+    assert rewrite_for_rollups(sql, "transactions", columns=COLUMNS) is None
+    assert engine.execute(sql) == raw_engine.execute(sql)
+
+
+def test_rewritten_query_matches_the_table(
+    engine: TransactionEngine, raw_engine: TransactionEngine
+):
+    sql = (
+        "SELECT year, category, COUNT(*) AS n, MIN(amount) AS low, MAX(amount) AS high "
+        "FROM transactions WHERE type = 'debit' GROUP BY 1, 2 ORDER BY 1, 2"
+    )
+    rewrites = engine.rollup_rewrites
+
+    assert engine.execute(sql) == raw_engine.execute(sql)
+    assert engine.rollup_rewrites == rewrites + 1
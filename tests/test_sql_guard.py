@@ -0,0 +1,103 @@
+import duckdb
+import pytest
+
+from src.sql_guard import QueryRejectedError, SQLGuard
+
+
+@pytest.fixture
+def cursor() -> duckdb.DuckDBPyConnection:
+    conn = duckdb.connect()
+    conn.execute(
+        "CREATE TABLE transactions AS "
+        "SELECT i AS id, i % 10 AS category, i * 1.5 AS amount FROM range(5000) t(i)"
+    )
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def guard() -> SQLGuard:
+    return SQLGuard(auto_limit=100, max_join_rows=100_000, max_plan_rows=None)
+
+
+@pytest.mark.parametrize(
+    "sql_query",
+    [
+        "DROP TABLE transactions",
+        "INSERT INTO transactions VALUES (1, 1, 1.0)",
+        "COPY transactions TO 'out.csv'",
+        "SELECT 1; SELECT 2",
+    ],
+)
+def test_only_a_single_select_runs(guard, cursor, sql_query):
+    with pytest.raises(QueryRejectedError) as e:
+        guard.check(cursor, sql_query)
+
+    assert e.value.code == "read_only"
+
+
+@pytest.mark.parametrize(
+    "sql_query",
+    [
+        "SELECT * FROM read_csv('/etc/passwd')",
+        "SELECT * FROM read_json('data/financial_transactions.json')",
+        "SELECT * FROM read_parquet('data/*.parquet') LIMIT 1",
+        "SELECT * FROM glob('/root/*')",
+        "SELECT * FROM 'data/financial_transactions.json'",
+        "SELECT * FROM query_table('transactions')",
+        "WITH t AS (SELECT * FROM read_text('/etc/hosts')) SELECT * FROM t",
+        "SELECT id FROM transactions WHERE id IN (SELECT 1 FROM glob('*'))",
+    ],
+)
+def test_files_cannot_be_read(guard, cursor, sql_query):
+    with pytest.raises(QueryRejectedError) as e:
+        guard.check(cursor, sql_query)
+
+    assert e.value.code == "table_function"
+
+
+def test_generating_table_functions_are_allowed(guard, cursor):
+    sql_query = "SELECT i FROM range(3) t(i) CROSS JOIN unnest([1, 2]) u(j) LIMIT 6"
+
+    assert guard.check(cursor, sql_query).sql == sql_query
+
+
+def test_cross_join_is_rejected(guard, cursor):
+    with pytest.raises(QueryRejectedError) as e:
+        guard.check(cursor, "SELECT * FROM transactions a, transactions b")
+
+    assert e.value.code == "cross_join"
+
+
+def test_large_result_gets_a_limit(guard, cursor):
+    guarded = guard.check(cursor, "SELECT * FROM transactions ORDER BY amount")
+
+    assert guarded.limit == 100
+    assert guarded.sql.endswith("LIMIT 100")
+    assert len(cursor.execute(guarded.sql).fetchall()) == 100
+
+
+def test_small_result_is_left_alone(guard, cursor):
+    sql_query = "SELECT category, SUM(amount) FROM transactions GROUP BY category"
+
+    guarded = guard.check(cursor, sql_query)
+
+    assert (guarded.sql, guarded.limit) == (sql_query, None)
+
+
+@pytest.mark.parametrize(
+    "sql_query",
+    [
+        "SELECT COUNT(*) FROM range(1000000000000)",
+        "SELECT SUM(i) FROM generate_series(1, 1000000000000) t(i)",
+        "SELECT COUNT(*) FROM (SELECT * FROM range(1000000000000))",
+    ],
+)
+def test_aggregate_over_a_table_function_is_planned(cursor, sql_query):
+    guard = SQLGuard(max_plan_rows=1_000_000)
+
+    with pytest.raises(QueryRejectedError) as e:
+        guard.check(cursor, sql_query)
+
+    assert e.value.code == "too_expensive"
+    assert guard.explained == 1
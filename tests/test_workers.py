@@ -0,0 +1,24 @@
+import asyncio
+from pathlib import Path
+
+from src.metrics import MetricsRecorder, read_events
+from src.workers import run_blocking
+
+
+def test_stage_recorded_on_a_worker_keeps_the_run_id(tmp_path: Path):
+    metrics = MetricsRecorder(tmp_path / "metrics.jsonl")
+
+    def load_data():
+        with metrics.timer("stage", name="load_data"):
+            pass
+
+    async def tool_call() -> str:
+        with metrics.run("sql_query_agent") as run_id:
+            await run_blocking(load_data)
+        return run_id
+
+    run_id = asyncio.run(tool_call())
+    metrics.flush()
+
+    stages = [e for e in read_events(metrics.events_path) if e["kind"] == "stage"]
+    assert [(e["name"], e["run_id"]) for e in stages] == [("load_data", run_id)]
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable
+
+import pandas as pd
+import pyarrow as pa
+
+from configs.config import CACHE_DIR
+
+# bump whenever the on-disk layout of cached files changes
+CACHE_FORMAT_VERSION = 1
+
+
+def file_digest(filepath: Path, chunk_size: int = 1 << 20) -> str:
+    """Return the sha256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with filepath.open("rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ColumnarCache:
+    """
+    On-disk Arrow IPC cache for row-oriented source files.
+
+    A source file is converted once with ``build`` and written as an
+    uncompressed Arrow IPC file next to a JSON manifest recording the
+    source's size, mtime and sha256. Later loads memory-map the Arrow file.
+    The source is only re-hashed when its size or mtime changed, and only
+    rebuilt (and re-validated) when its content hash changed.
+
+    Args:
+        cache_dir (Path): Directory holding the cached files and manifests.
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def sidecar(self, filepath: Path, suffix: str) -> Path:
+        """Return the path of a cached artifact derived from ``filepath``."""
+        key = hashlib.sha1(str(filepath.resolve()).encode()).hexdigest()[:8]
+        return self.cache_dir / f"{filepath.stem}-{key}.{suffix}"
+
+    def paths(self, filepath: Path) -> tuple[Path, Path]:
+        """Return the (arrow, manifest) paths used to cache ``filepath``."""
+        return self.sidecar(filepath, "arrow"), self.sidecar(filepath, "manifest.json")
+
+    def read_manifest(self, filepath: Path) -> dict[str, Any] | None:
+        _, manifest_path = self.paths(filepath)
+        try:
+            manifest = json.loads(manifest_path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if manifest.get("format_version") != CACHE_FORMAT_VERSION:
+            return None
+        return manifest
+
+    def _write_manifest(self, filepath: Path, manifest: dict[str, Any]) -> None:
+        _, manifest_path = self.paths(filepath)
+        tmp_path = manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(manifest, indent=2))
+        os.replace(tmp_path, manifest_path)
+
+    def _write_table(self, filepath: Path, table: pa.Table) -> None:
+        arrow_path, _ = self.paths(filepath)
+        tmp_path = arrow_path.with_suffix(".tmp")
+        with pa.OSFile(str(tmp_path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, arrow_path)
+
+    def _read_table(self, filepath: Path) -> pa.Table:
+        arrow_path, _ = self.paths(filepath)
+        with pa.memory_map(str(arrow_path), "r") as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def load(
+        self,
+        filepath: Path,
+        build: Callable[[Path], tuple[pd.DataFrame, bool]],
+    ) -> tuple[pa.Table, dict[str, Any]]:
+        """
+        Load ``filepath`` through the cache.
+
+        Args:
+            filepath (Path): Source file to load.
+            build (Callable): Reads and validates the source file, returning
+                the DataFrame and whether it passed validation. Only called
+                when the cached copy is missing or stale.
+
+        Returns:
+            tuple[pa.Table, dict]: The cached Arrow table and its manifest.
+        """
+        stat = filepath.stat()
+        arrow_path, _ = self.paths(filepath)
+        manifest = self.read_manifest(filepath)
+
+        if manifest is not None and arrow_path.exists():
+            if (manifest["size"], manifest["mtime_ns"]) == (
+                stat.st_size,
+                stat.st_mtime_ns,
+            ):
+                return self._read_table(filepath), manifest
+
+            # metadata changed, the content may not have (e.g. touch, git checkout)
+            sha256 = file_digest(filepath)
+            if sha256 == manifest["sha256"]:
+                manifest.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                self._write_manifest(filepath, manifest)
+                return self._read_table(filepath), manifest
+        else:
+            sha256 = file_digest(filepath)
+
+        data, valid = build(filepath)
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        manifest = {
+            "format_version": CACHE_FORMAT_VERSION,
+            "source": str(filepath),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+            "valid": valid,
+            "rows": table.num_rows,
+        }
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._write_table(filepath, table)
+        self._write_manifest(filepath, manifest)
+        return table, manifest
+
+    def clear(self, filepath: Path) -> None:
+        """Remove the cached copy of ``filepath``, if any."""
+        for path in self.paths(filepath):
+            path.unlink(missing_ok=True)
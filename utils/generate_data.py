@@ -1,17 +1,36 @@
-import json
-import random
-from datetime import datetime
-from faker import Faker
-from typing import Literal, Any
+"""
+Generate synthetic transactions for the finance assistant and for load tests.
+
+Rows are generated a month at a time with NumPy and Polars: every account
+gets ``monthly_count`` transactions per month on a random day (1-28), with a
+uniformly chosen category, an amount drawn from the category's range
+(negative for debits) and a description naming a merchant from a pool
+generated once with Faker. Output is streamed month by month as a JSON
+array (the format of the shipped data), NDJSON, or Parquet partitioned into
+``year=YYYY/month=M`` directories, so tens of millions of rows never need
+to be in memory at once. The same seed always produces the same data.
+
+    uv run python -m utils.generate_data
+    uv run python -m utils.generate_data --accounts 20000 --format parquet --output data/transactions
+"""
+
+import argparse
+import time
+from collections.abc import Iterator
 from pathlib import Path
+from typing import Literal
 
-fake = Faker()
-random.seed(42)
+import numpy as np
+import polars as pl
+from faker import Faker
 
 # Configuration
 START_YEAR = 2020
 END_YEAR = 2025
 MONTHLY_TXN_COUNT = 50
+SEED = 42
+MERCHANT_POOL_SIZE = 2000
+OUTPUT_FORMATS = ("json", "ndjson", "parquet")
 
 # Categories list
 CATEGORIES: list[str] = [
@@ -62,56 +81,186 @@ CATEGORY_AMOUNT_RANGES: dict[str, tuple[float, float]] = {
 }
 
 
-def generate_transaction(date: datetime, category: str) -> dict[str, Any]:
-    """Generate a single transaction dictionary."""
-    txn_type = CATEGORY_TO_TYPE[category]
-    low, high = CATEGORY_AMOUNT_RANGES[category]
-    amount = round(random.uniform(low, high), 2)
+def merchant_pool(size: int = MERCHANT_POOL_SIZE, seed: int = SEED) -> list[str]:
+    """Generate ``size`` merchant names once, instead of a Faker call per row."""
+    fake = Faker()
+    fake.seed_instance(seed)
+    return [fake.company() for _ in range(size)]
+
+
+def generate_month(
+    rng: np.random.Generator,
+    year: int,
+    month: int,
+    accounts: int,
+    monthly_count: int,
+    merchants: pl.Series,
+) -> pl.DataFrame:
+    """
+    Generate one month of transactions for every account, sorted by date.
+
+    Args:
+        rng (np.random.Generator): Source of randomness, advanced in place.
+        year (int): Year of the transactions.
+        month (int): Month of the transactions.
+        accounts (int): Number of accounts, numbered from 1 in ``account_id``.
+        monthly_count (int): Transactions per account in the month.
+        merchants (pl.Series): Merchant names descriptions are drawn from.
 
+    Returns:
+        pl.DataFrame: Rows in the ``InputTransactions`` layout.
+    """
+    n_rows = accounts * monthly_count
+    picked = rng.integers(0, len(CATEGORIES), n_rows)
+    days = rng.integers(1, 29, n_rows)  # safe for all months
+    low = np.array([CATEGORY_AMOUNT_RANGES[c][0] for c in CATEGORIES])[picked]
+    high = np.array([CATEGORY_AMOUNT_RANGES[c][1] for c in CATEGORIES])[picked]
+    is_debit = np.array([CATEGORY_TO_TYPE[c] == "debit" for c in CATEGORIES])[picked]
+    amount = np.round(rng.uniform(low, high), 2)
     # Debits are negative (money out)
-    if txn_type == "debit":
-        amount = -abs(amount)
+    amount = np.where(is_debit, -amount, amount)
+    merchant = rng.integers(0, len(merchants), n_rows)
 
-    return {
-        "date": date.strftime("%Y-%m-%d"),
-        "year": date.year,
-        "month": date.month,
-        "type": txn_type,
-        "category": category,
-        "amount": amount,
-        "description": f"{category.title()} payment at {fake.company()}",
-    }
+    # rows are generated account by account, so a stable sort on the day
+    # orders them by date and then account
+    order = np.argsort(days, kind="stable")
+    picked, days, amount, merchant = (
+        picked[order],
+        days[order],
+        amount[order],
+        merchant[order],
+    )
+    # strings are gathered from small lookup series rather than built per row
+    types = pl.Series([CATEGORY_TO_TYPE[c] for c in CATEGORIES])
+    titles = pl.Series([c.title() for c in CATEGORIES])
+    data = pl.DataFrame(
+        {
+            "date": pl.date_range(
+                pl.date(year, month, 1), pl.date(year, month, 28), eager=True
+            ).gather(days - 1),
+            "year": np.full(n_rows, year, dtype=np.int64),
+            "month": np.full(n_rows, month, dtype=np.int64),
+            "type": types.gather(picked),
+            "category": pl.Series(CATEGORIES).gather(picked),
+            "amount": amount,
+            "description": titles.gather(picked)
+            + " payment at "
+            + merchants.gather(merchant),
+        }
+    )
+    account_ids = np.repeat(np.arange(1, accounts + 1), monthly_count)[order]
+    return data.insert_column(0, pl.Series("account_id", account_ids))
 
 
 def generate_transactions(
-    start_year: int, end_year: int, monthly_count: int
-) -> list[dict[str, Any]]:
-    """Generate transactions for each month between the given years."""
-    transactions = []
+    start_year: int = START_YEAR,
+    end_year: int = END_YEAR,
+    monthly_count: int = MONTHLY_TXN_COUNT,
+    accounts: int = 1,
+    seed: int = SEED,
+    merchant_count: int = MERCHANT_POOL_SIZE,
+) -> Iterator[pl.DataFrame]:
+    """
+    Generate transactions month by month, in date order.
+
+    Args:
+        start_year (int): First year to generate.
+        end_year (int): Last year to generate (inclusive).
+        monthly_count (int): Transactions per account per month.
+        accounts (int): Number of accounts.
+        seed (int): Seed of the random generator and the merchant pool.
+        merchant_count (int): Size of the merchant name pool.
+
+    Returns:
+        Iterator[pl.DataFrame]: One frame per month, see ``generate_month``.
+
+    Example:
+        >>> rows = sum(len(df) for df in generate_transactions(2024, 2024, 10))
+        >>> rows
+        120
+    """
+    rng = np.random.default_rng(seed)
+    merchants = pl.Series(merchant_pool(merchant_count, seed))
     for year in range(start_year, end_year + 1):
         for month in range(1, 13):
-            for _ in range(monthly_count):
-                day = random.randint(1, 28)  # safe for all months
-                date = datetime(year, month, day)
-                category = random.choice(CATEGORIES)
-                txn = generate_transaction(date, category)
-                transactions.append(txn)
-    return sorted(transactions, key=lambda x: x["date"])
+            yield generate_month(rng, year, month, accounts, monthly_count, merchants)
+
 
+def write_transactions(
+    months: Iterator[pl.DataFrame],
+    output: Path,
+    output_format: Literal["json", "ndjson", "parquet"] = "json",
+) -> int:
+    """
+    Stream generated months to disk.
 
-def save_transactions_to_json(
-    transactions: list[dict[str, Any]], filename: Path
-) -> None:
-    """Save transactions to a JSON file."""
-    with open(filename, "w") as f:
-        json.dump(transactions, f, indent=2)
-    print(f"Saved {len(transactions)} transactions to '{filename}'")
+    ``json`` writes one JSON array of records, ``ndjson`` one record per
+    line, and ``parquet`` one file per month under
+    ``output/year=YYYY/month=M/``, leaving the partition columns out of the
+    files as Hive partitioning expects.
+
+    Returns:
+        int: Number of rows written.
+    """
+    rows = 0
+    if output_format == "parquet":
+        for data in months:
+            year, month = data["year"][0], data["month"][0]
+            partition = output / f"year={year}" / f"month={month}"
+            partition.mkdir(parents=True, exist_ok=True)
+            data.drop("year", "month").write_parquet(partition / "part-0.parquet")
+            rows += len(data)
+        return rows
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with output.open("w", encoding="utf-8") as f:
+        if output_format == "json":
+            f.write("[")
+        for data in months:
+            if output_format == "json":
+                records = data.write_json()[1:-1]
+                if rows and records:
+                    f.write(",")
+                f.write(records)
+            else:
+                f.write(data.write_ndjson())
+            rows += len(data)
+        if output_format == "json":
+            f.write("]")
+    return rows
 
 
 def main():
-    filepath = Path(__file__).parents[1] / "data" / "financial_transactions.json"
-    transactions = generate_transactions(START_YEAR, END_YEAR, MONTHLY_TXN_COUNT)
-    save_transactions_to_json(transactions, filepath)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--start-year", type=int, default=START_YEAR)
+    parser.add_argument("--end-year", type=int, default=END_YEAR)
+    parser.add_argument(
+        "--monthly-count",
+        type=int,
+        default=MONTHLY_TXN_COUNT,
+        help="transactions per account per month",
+    )
+    parser.add_argument("--accounts", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="json")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path(__file__).parents[1] / "data" / "financial_transactions.json",
+        help="output file, or directory for parquet",
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    months = generate_transactions(
+        args.start_year, args.end_year, args.monthly_count, args.accounts, args.seed
+    )
+    rows = write_transactions(months, args.output, args.format)
+    elapsed = time.perf_counter() - start
+    print(
+        f"Saved {rows} transactions to '{args.output}' "
+        f"in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)"
+    )
 
 
 if __name__ == "__main__":
@@ -1,19 +1,22 @@
 from src.data_models import InputTransactions
+from src.metrics import get_metrics
 from pathlib import Path
 import pandas as pd
+import pyarrow as pa
 from typing import Optional
 import httpx
+from utils.cache import ColumnarCache
 
 
-def load_data(filepath: Path):
+def read_transactions(filepath: Path) -> tuple[pd.DataFrame, bool]:
     """
-    Load JSON data from a file and validate it against InputTransactions schema.
+    Read a transactions JSON file and validate it against InputTransactions schema.
 
     Args:
         filepath (Path): Path to the JSON file to load
 
     Returns:
-        pandas.DataFrame: The loaded and validated transaction data
+        tuple[pandas.DataFrame, bool]: The loaded data and whether it passed validation
 
     Raises:
         Exception: If data validation fails, prints error message but continues
@@ -21,9 +24,53 @@ def load_data(filepath: Path):
     with filepath.open("+r", encoding="utf-8") as f:
         data = pd.read_json(f)
     try:
-        InputTransactions.validate(data)
+        with get_metrics().timer("stage", name="validate_transactions"):
+            InputTransactions.validate(data)
     except Exception as e:
         print(f"Error raised during dataframe validation {e}")
+        return data, False
+    return data, True
+
+
+def load_table(filepath: Path, cache: Optional[ColumnarCache] = None) -> pa.Table:
+    """
+    Load transactions as an Arrow table through the columnar cache.
+
+    The JSON file is parsed and validated only when its content changed since
+    the cached copy was written; otherwise the cached Arrow file is memory-mapped.
+
+    Args:
+        filepath (Path): Path to the JSON file to load
+        cache (Optional[ColumnarCache]): Cache to use, defaults to the project cache
+
+    Returns:
+        pyarrow.Table: The loaded transaction data
+    """
+    cache = cache or ColumnarCache()
+    table, manifest = cache.load(filepath, build=read_transactions)
+    if not manifest["valid"]:
+        print(f"Cached data for {filepath.name} failed validation when it was built")
+    return table
+
+
+def load_data(filepath: Path, use_cache: bool = True):
+    """
+    Load JSON data from a file and validate it against InputTransactions schema.
+
+    Args:
+        filepath (Path): Path to the JSON file to load
+        use_cache (bool): Serve the data from the columnar cache, re-reading and
+            re-validating the JSON only when the file content changed
+
+    Returns:
+        pandas.DataFrame: The loaded and validated transaction data
+
+    Raises:
+        Exception: If data validation fails, prints error message but continues
+    """
+    if use_cache:
+        return load_table(filepath).to_pandas()
+    data, _ = read_transactions(filepath)
     return data
 
 